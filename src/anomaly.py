@@ -0,0 +1,171 @@
+import logging
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FORECAST_FIELDS = ('yhat', 'yhat_lower', 'yhat_upper')
+ANOMALY_COLUMNS = ['ds', 'sku', 'y', 'yhat', 'yhat_lower', 'yhat_upper', 'error', 'uncertainty',
+                   'normalized_error', 'zscore']
+
+
+def wide_forecasts(forecasts):
+    """Align forecasts into one (ds x sku) frame per field.
+
+    Accepts a dict of per-SKU Prophet forecast frames or one long frame with
+    an ``sku`` column (as written by batch_forecast.py).
+    """
+    if isinstance(forecasts, dict):
+        long = pd.concat([forecast[['ds', *FORECAST_FIELDS]].assign(sku=sku) for sku, forecast in forecasts.items()],
+                         ignore_index=True) if forecasts else pd.DataFrame(columns=['ds', 'sku', *FORECAST_FIELDS])
+    else:
+        long = forecasts
+    wide = long.pivot_table(index='ds', columns='sku', values=list(FORECAST_FIELDS), aggfunc='first', dropna=False)
+    return {field: wide[field] for field in FORECAST_FIELDS}
+
+
+def normalized_errors(y, yhat, yhat_lower, yhat_upper, min_uncertainty=1e-9):
+    """(y - yhat) / (yhat_upper - yhat_lower) on aligned arrays.
+
+    Intervals narrower than ``min_uncertainty`` (flat or all-zero series)
+    are widened to it, so a miss on a zero-width interval scores as a very
+    large error instead of inf/nan and an exact hit scores zero.
+    """
+    error = y - yhat
+    uncertainty = np.maximum(yhat_upper - yhat_lower, min_uncertainty)
+    return error, uncertainty, error / uncertainty
+
+
+class RunningStats:
+    """Per-SKU count, mean and variance of normalized errors, merged batch by batch."""
+
+    def __init__(self, skus=()):
+        self.skus = pd.Index(skus, name='sku')
+        self.count = np.zeros(len(self.skus))
+        self.mean = np.zeros(len(self.skus))
+        self.m2 = np.zeros(len(self.skus))
+
+    def _align(self, skus):
+        new = pd.Index(skus).difference(self.skus)
+        if len(new):
+            self.skus = self.skus.append(pd.Index(new, name='sku'))
+            self.count = np.concatenate([self.count, np.zeros(len(new))])
+            self.mean = np.concatenate([self.mean, np.zeros(len(new))])
+            self.m2 = np.concatenate([self.m2, np.zeros(len(new))])
+        return self.skus.get_indexer(skus)
+
+    def std(self, skus=None):
+        positions = slice(None) if skus is None else self._align(skus)
+        count = self.count[positions]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 1, np.sqrt(self.m2[positions] / (count - 1)), np.nan)
+
+    def zscores(self, values, skus):
+        """Score a (days, skus) block against the statistics seen so far."""
+        positions = self._align(skus)
+        std = self.std(skus)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(std > 0, (values - self.mean[positions]) / std, np.nan)
+
+    def update(self, values, skus):
+        """Fold a (days, skus) block in with Chan's parallel mean/variance merge; NaNs are skipped."""
+        positions = self._align(skus)
+        valid = ~np.isnan(values)
+        n = valid.sum(axis=0).astype(np.float64)
+        batch_mean = np.divide(np.where(valid, values, 0).sum(axis=0), n, out=np.zeros_like(n), where=n > 0)
+        batch_m2 = (np.where(valid, values - batch_mean, 0) ** 2).sum(axis=0)
+
+        count = self.count[positions]
+        total = count + n
+        delta = batch_mean - self.mean[positions]
+        safe_total = np.where(total > 0, total, 1)
+        self.mean[positions] += delta * n / safe_total
+        self.m2[positions] += batch_m2 + delta ** 2 * count * n / safe_total
+        self.count[positions] = total
+
+    def to_frame(self):
+        return pd.DataFrame({'count': self.count, 'mean': self.mean, 'std': self.std()}, index=self.skus)
+
+
+class AnomalyDetector:
+    """Flags days whose demand falls far outside the forecast interval, for every SKU at once.
+
+    ``detect`` scores the whole aligned history. ``update`` is the daily
+    sweep: it scores only days after the last scored day, folds their
+    normalized errors into per-SKU running statistics and advances the
+    watermark. State can be saved between runs.
+    """
+
+    def __init__(self, threshold=0.05, min_uncertainty=1e-9):
+        self.threshold = threshold
+        self.min_uncertainty = min_uncertainty
+        self.stats = RunningStats()
+        self.last_scored = None
+
+    def _score(self, observed, forecasts):
+        yhat = forecasts['yhat']
+        days = observed.index.intersection(yhat.index)
+        skus = observed.columns.intersection(yhat.columns)
+        y = observed.loc[days, skus].to_numpy(dtype=np.float64)
+        fields = {field: forecasts[field].loc[days, skus].to_numpy(dtype=np.float64) for field in FORECAST_FIELDS}
+        error, uncertainty, normalized = normalized_errors(y, fields['yhat'], fields['yhat_lower'],
+                                                           fields['yhat_upper'], self.min_uncertainty)
+        return days, skus, y, fields, error, uncertainty, normalized
+
+    def _anomalies(self, days, skus, y, fields, error, uncertainty, normalized, zscore):
+        with np.errstate(invalid='ignore'):
+            rows, cols = np.nonzero(np.abs(normalized) > self.threshold)
+        return pd.DataFrame({
+            'ds': days[rows],
+            'sku': skus[cols],
+            'y': y[rows, cols],
+            **{field: values[rows, cols] for field, values in fields.items()},
+            'error': error[rows, cols],
+            'uncertainty': uncertainty[rows, cols],
+            'normalized_error': normalized[rows, cols],
+            'zscore': zscore[rows, cols],
+        }, columns=ANOMALY_COLUMNS)
+
+    def detect(self, observed, forecasts):
+        """Anomalies over the whole overlap of observed (ds x sku) demand and wide forecasts."""
+        days, skus, y, fields, error, uncertainty, normalized = self._score(observed, forecasts)
+        zscore = np.full_like(normalized, np.nan)
+        return self._anomalies(days, skus, y, fields, error, uncertainty, normalized, zscore)
+
+    def update(self, observed, forecasts):
+        """Score only days after the last scored one and advance the running statistics."""
+        if self.last_scored is not None:
+            observed = observed[observed.index > self.last_scored]
+        days, skus, y, fields, error, uncertainty, normalized = self._score(observed, forecasts)
+        if len(days) == 0:
+            return pd.DataFrame(columns=ANOMALY_COLUMNS)
+        zscore = self.stats.zscores(normalized, skus)
+        self.stats.update(normalized, skus)
+        self.last_scored = days.max()
+        anomalies = self._anomalies(days, skus, y, fields, error, uncertainty, normalized, zscore)
+        logger.info(f"Scored {len(days)} new days for {len(skus)} SKUs: {len(anomalies)} anomalies")
+        return anomalies
+
+    def save(self, path):
+        np.savez_compressed(
+            path,
+            skus=self.stats.skus.to_numpy(dtype=str),
+            count=self.stats.count,
+            mean=self.stats.mean,
+            m2=self.stats.m2,
+            last_scored=np.array([self.last_scored if self.last_scored is not None else 'NaT'],
+                                 dtype='datetime64[s]'),
+            settings=np.array([self.threshold, self.min_uncertainty]),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as stored:
+            detector = cls(*stored['settings'])
+            detector.stats = RunningStats(stored['skus'])
+            detector.stats.count = stored['count']
+            detector.stats.mean = stored['mean']
+            detector.stats.m2 = stored['m2']
+            last_scored = stored['last_scored'][0]
+        detector.last_scored = None if np.isnat(last_scored) else pd.Timestamp(last_scored)
+        return detector
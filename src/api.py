@@ -1,8 +1,17 @@
+import os
+import json
+import time
+import asyncio
 import logging
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response
+from pydantic import BaseModel, conint
 from datetime import datetime
-from predict import make_prediction
+from registry import get_registry
+from jobs import JobQueue
+from cache import get_forecast_cache
+from metrics import REGISTRY, CONTENT_TYPE, HTTP_REQUEST_SECONDS, profile, profiling_enabled, in_context
 
 # Configure logging
 logging.basicConfig(level=logging.INFO,
@@ -13,6 +22,17 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI()
 
+# Prediction work runs on a bounded pool so it never blocks the event loop.
+prediction_executor = ThreadPoolExecutor(max_workers=int(os.getenv('PREDICT_WORKERS', 4)),
+                                         thread_name_prefix="predict")
+# In-flight predictions keyed by (sku, days); concurrent identical requests share one.
+inflight_predictions = {}
+# Training runs in background workers, never inside a request; the queue is
+# opened at startup so importing the app does not create its database.
+job_queue = None
+# Upper bound on the worker processes a single training job may ask for.
+MAX_TRAIN_PROCS = int(os.getenv('MAX_TRAIN_PROCS', os.cpu_count() or 1))
+
 class PredictionRequest(BaseModel):
     sku: str
     days: int = 30
@@ -21,12 +41,86 @@ class PredictionResponse(BaseModel):
     sku: str
     predictions: list[float]
 
+class BatchPredictionRequest(BaseModel):
+    skus: list[str]
+    days: int = 30
+
+class BatchPredictionResponse(BaseModel):
+    results: list[PredictionResponse]
+    errors: dict[str, str]
+
+class TrainRequest(BaseModel):
+    sku: str | None = None
+    skus: list[str] | None = None
+    model: str = "lstm"
+    days: int = 90
+    workers: conint(ge=1, le=MAX_TRAIN_PROCS) = 1
+    # False forces a full refit instead of warm-starting from registered models.
+    incremental: bool = True
+
+class TrainResponse(BaseModel):
+    job_id: str
+    status: str
+
+class JobStatus(BaseModel):
+    id: str
+    model: str
+    skus: list[str] | None
+    days: int
+    incremental: bool
+    status: str
+    created_at: str
+    started_at: str | None
+    finished_at: str | None
+    progress_done: int
+    progress_total: int | None
+    result: dict | None
+    error: str | None
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Record request latency per route. With PROFILE_REQUESTS=1 or an
+    X-Profile request header, also log the request's per-stage breakdown and
+    return it in a Server-Timing header."""
+    start = time.perf_counter()
+    if profiling_enabled() or "x-profile" in request.headers:
+        with profile(f"{request.method} {request.url.path}") as current:
+            response = await call_next(request)
+        breakdown = current.breakdown()
+        logger.info(f"Request profile: {json.dumps(breakdown)}")
+        response.headers["Server-Timing"] = ", ".join(
+            f"{stage};dur={stats['seconds'] * 1000:.1f}" for stage, stats in breakdown["stages"].items()
+        )
+    else:
+        response = await call_next(request)
+    route = request.scope.get("route")
+    HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, method=request.method,
+                                 route=route.path if route is not None else "unmatched",
+                                 status=response.status_code)
+    return response
+
+async def run_prediction(sku, days):
+    key = (sku, days)
+    future = inflight_predictions.get(key)
+    if future is None:
+        loop = asyncio.get_running_loop()
+        from predict import make_prediction
+
+        # in_context carries the request's profile into the worker thread.
+        future = loop.run_in_executor(prediction_executor, in_context(make_prediction), sku, days)
+        inflight_predictions[key] = future
+        future.add_done_callback(lambda _: inflight_predictions.pop(key, None))
+    else:
+        logger.info(f"Joining in-flight prediction for SKU: {sku}, Days: {days}")
+    # Shield so a disconnecting client does not cancel work other clients await.
+    return await asyncio.shield(future)
+
 @app.post("/predict", response_model=PredictionResponse)
 async def predict(request: PredictionRequest):
     logger.info(f"Received prediction request for SKU: {request.sku}, Days: {request.days}")
     try:
         logger.info(f"Initiating prediction for SKU: {request.sku}")
-        prediction = make_prediction(request.sku, request.days)
+        prediction = await run_prediction(request.sku, request.days)
         logger.info(f"Prediction successful for SKU: {request.sku}")
         logger.debug(f"Prediction results for SKU {request.sku}: {prediction.tolist()}")
         return PredictionResponse(sku=request.sku, predictions=prediction.tolist())
@@ -34,13 +128,72 @@ async def predict(request: PredictionRequest):
         logger.error(f"Error during prediction for SKU {request.sku}: {str(e)}", exc_info=True)
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/predict/batch", response_model=BatchPredictionResponse)
+async def predict_batch(request: BatchPredictionRequest):
+    logger.info(f"Received batch prediction request for {len(request.skus)} SKUs, Days: {request.days}")
+    from predict import make_batch_prediction
+
+    loop = asyncio.get_running_loop()
+    predictions, errors = await loop.run_in_executor(prediction_executor, in_context(make_batch_prediction),
+                                                     request.skus, request.days)
+    results = [PredictionResponse(sku=sku, predictions=predictions[sku].tolist())
+               for sku in request.skus if sku in predictions]
+    return BatchPredictionResponse(results=results, errors=errors)
+
+@app.post("/train", response_model=TrainResponse, status_code=202)
+async def train(request: TrainRequest):
+    # Neither sku nor skus means the whole catalog.
+    skus = request.skus or ([request.sku] if request.sku else None)
+    try:
+        job_id = job_queue.submit(model=request.model, skus=skus, days=request.days, workers=request.workers,
+                                  incremental=request.incremental)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TrainResponse(job_id=job_id, status="queued")
+
+@app.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_job(job_id: str):
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+    return JobStatus(**job)
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return get_forecast_cache().stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint: stage histograms, counters and request latency."""
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+def warm_up():
+    """Import the model stack (torch, pandas, the ShipStation client) and
+    preload registered models. Module import stays light so that health
+    checks and tooling can import the app cheaply; serving pays here once."""
+    from predict import preload_models
+
+    started = time.perf_counter()
+    loaded = preload_models(get_registry(), limit=int(os.getenv('PRELOAD_MODELS', get_registry().cache_size)))
+    logger.info(f"Warm-up finished in {time.perf_counter() - started:.2f}s, {loaded} models preloaded")
+
 @app.on_event("startup")
 async def startup_event():
+    global job_queue
     logger.info("Starting up the API server")
+    registry = get_registry()
+    logger.info(f"Serving models from registry at {registry.root}")
+    job_queue = JobQueue(path=os.getenv('JOB_DB_PATH', 'jobs.db'), workers=int(os.getenv('TRAIN_WORKERS', 1)))
+    job_queue.start()
+    # Run before the server accepts requests, so the first request is not the slowest.
+    await asyncio.get_running_loop().run_in_executor(prediction_executor, warm_up)
 
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("Shutting down the API server")
+    prediction_executor.shutdown(wait=False)
+    if job_queue is not None:
+        job_queue.stop(timeout=5)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,189 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from tqdm import tqdm
+from forecaster import SKUForecaster, _prepared_prophet
+
+logger = logging.getLogger(__name__)
+
+RESULT_COLUMNS = ['model', 'sku', 'cutoff', 'ds', 'y', 'yhat']
+
+
+def shared_cutoffs(index, initial='365 days', period='30 days', horizon='90 days'):
+    """Cutoffs every `period` after `initial` days, leaving `horizon` days to score."""
+    first = index[0] + pd.Timedelta(initial)
+    last = index[-1] - pd.Timedelta(horizon)
+    if first > last:
+        raise ValueError(f"History from {index[0].date()} to {index[-1].date()} is too short "
+                         f"for initial={initial} and horizon={horizon}")
+    return list(pd.date_range(first, last, freq=pd.Timedelta(period)))
+
+
+def _backtest_prophet(sku, df, cutoffs, horizon):
+    # Runs in a worker process; reuses SKUForecaster so the backtest scores
+    # exactly the model configuration that is served. cross_validation fits
+    # its own model per cutoff, so the full history is never fitted.
+    forecaster = SKUForecaster(df)
+    if sku not in forecaster.trainable_skus():
+        return None
+    forecaster.models[sku] = _prepared_prophet(forecaster.prepare_data(sku))
+    forecaster.perform_cross_validation(sku, horizon=horizon, cutoffs=cutoffs)
+    cv = forecaster.cv_results[sku]
+    return cv[['cutoff', 'ds', 'y', 'yhat']].assign(model='prophet', sku=sku)
+
+
+def _backtest_lstm(sku, df, cutoffs, horizon, epochs=100):
+    from predict import fit_series_model, forecast_from_window, SEQUENCE_LENGTH
+
+    series = df[sku]
+    steps = pd.Timedelta(horizon).days
+    frames = []
+    for cutoff in cutoffs:
+        history = series[:cutoff].dropna().to_numpy()
+        actual = series[cutoff + pd.Timedelta(days=1):cutoff + pd.Timedelta(days=steps)]
+        if len(history) <= SEQUENCE_LENGTH + 1 or actual.empty:
+            continue
+        model, _ = fit_series_model(history, epochs=epochs)
+        prediction = forecast_from_window(model, history[-SEQUENCE_LENGTH:], len(actual))
+        frames.append(pd.DataFrame({'cutoff': cutoff, 'ds': actual.index, 'y': actual.to_numpy(),
+                                    'yhat': prediction, 'model': 'lstm', 'sku': sku}))
+    return pd.concat(frames) if frames else None
+
+
+BACKTESTS = {
+    'prophet': _backtest_prophet,
+    'lstm': _backtest_lstm,
+}
+
+
+class Backtester:
+    """Scores every SKU over one shared set of cutoffs, in a process pool.
+
+    Each (model, sku) pair is one task. Results are kept as one long frame
+    (model, sku, cutoff, ds, y, yhat) and can be saved as compressed
+    columnar arrays.
+    """
+
+    def __init__(self, data, models=('prophet',), initial='365 days', period='30 days',
+                 horizon='90 days', n_jobs=None, min_history=14):
+        unknown = set(models) - set(BACKTESTS)
+        if unknown:
+            raise ValueError(f"Unknown backtest models: {sorted(unknown)}")
+        self.data = data
+        self.models = models
+        self.horizon = horizon
+        self.n_jobs = n_jobs or os.cpu_count()
+        self.min_history = min_history
+        self.cutoffs = shared_cutoffs(data.index, initial, period, horizon)
+        self.results = pd.DataFrame(columns=RESULT_COLUMNS)
+        self.failed = {}
+
+    def run(self):
+        skus = SKUForecaster(self.data, min_history=self.min_history).trainable_skus()
+        jobs = [(model, sku) for model in self.models for sku in skus]
+        logger.info(f"Backtesting {len(skus)} SKUs x {len(self.models)} models over {len(self.cutoffs)} cutoffs")
+
+        frames = []
+        with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+            futures = {
+                executor.submit(BACKTESTS[model], sku, self.data[[sku]], self.cutoffs, self.horizon): (model, sku)
+                for model, sku in jobs
+            }
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Backtesting"):
+                model, sku = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Backtest failed for {model} / SKU {sku}: {str(e)}")
+                    self.failed[(model, sku)] = str(e)
+                    continue
+                if result is not None:
+                    frames.append(result[RESULT_COLUMNS])
+
+        if frames:
+            self.results = pd.concat(frames, ignore_index=True)
+        return self.results
+
+    def _score(self, by):
+        error = self.results['yhat'] - self.results['y']
+        actual = self.results['y'].abs()
+        scored = self.results.assign(
+            ape=(error.abs() / actual).where(actual != 0),
+            squared_error=error ** 2,
+            absolute_error=error.abs(),
+        ).groupby(by).agg(
+            mape=('ape', 'mean'),
+            rmse=('squared_error', 'mean'),
+            mae=('absolute_error', 'mean'),
+            n=('y', 'size'),
+        )
+        scored['rmse'] = np.sqrt(scored['rmse'])
+        return scored.reset_index()
+
+    def metrics(self):
+        """Per-(model, sku) MAPE/RMSE/MAE. MAPE ignores days with zero actual demand."""
+        return self._score(['model', 'sku'])
+
+    def summary(self):
+        """Overall metrics per model across every SKU and cutoff."""
+        return self._score('model')
+
+    def save(self, path):
+        save_results(self.results, path)
+
+
+def save_results(results, path):
+    """Store backtest results as compressed columns with dictionary-encoded labels."""
+    models, model_codes = np.unique(results['model'].to_numpy(dtype=str), return_inverse=True)
+    skus, sku_codes = np.unique(results['sku'].to_numpy(dtype=str), return_inverse=True)
+    np.savez_compressed(
+        path,
+        models=models,
+        model_codes=model_codes.astype(np.int8),
+        skus=skus,
+        sku_codes=sku_codes.astype(np.int32),
+        cutoff=results['cutoff'].to_numpy(dtype='datetime64[s]'),
+        ds=results['ds'].to_numpy(dtype='datetime64[s]'),
+        y=results['y'].to_numpy(dtype=np.float32),
+        yhat=results['yhat'].to_numpy(dtype=np.float32),
+    )
+
+
+def load_results(path):
+    with np.load(path) as stored:
+        return pd.DataFrame({
+            'model': stored['models'][stored['model_codes']],
+            'sku': stored['skus'][stored['sku_codes']],
+            'cutoff': stored['cutoff'],
+            'ds': stored['ds'],
+            'y': stored['y'],
+            'yhat': stored['yhat'],
+        })
+
+
+if __name__ == "__main__":
+    import argparse
+    from datetime import datetime, timedelta
+    from data_loader import DataLoader
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Catalog-wide forecast backtest")
+    parser.add_argument("--days", type=int, default=730, help="days of history to load")
+    parser.add_argument("--models", nargs="+", default=["prophet"], choices=sorted(BACKTESTS))
+    parser.add_argument("--initial", default="365 days")
+    parser.add_argument("--period", default="30 days")
+    parser.add_argument("--horizon", default="90 days")
+    parser.add_argument("--jobs", type=int, default=None)
+    parser.add_argument("--output", default="backtest_results.npz")
+    args = parser.parse_args()
+
+    end_date = datetime.now()
+    data = DataLoader().load_daily_demand(end_date - timedelta(days=args.days), end_date)
+    backtester = Backtester(data, models=args.models, initial=args.initial, period=args.period,
+                            horizon=args.horizon, n_jobs=args.jobs)
+    backtester.run()
+    backtester.save(args.output)
+    print(backtester.summary())
+    print(f"Saved {len(backtester.results)} rows to {args.output}")
@@ -0,0 +1,185 @@
+"""Nightly batch forecast: forecast the whole catalog once and bulk-load the
+results into a database table that downstream readers query instead of
+training models themselves.
+
+Usage:
+    python batch_forecast.py --engine prophet --jobs 8
+    python batch_forecast.py --engine lstm --db sqlite:///forecasts.db
+"""
+import io
+import os
+import csv
+import logging
+import argparse
+import pandas as pd
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from sqlalchemy import (create_engine, MetaData, Table, Column, String, Float, DateTime, Index,
+                        delete, select)
+
+logger = logging.getLogger(__name__)
+
+metadata = MetaData()
+
+forecasts_table = Table(
+    "forecasts", metadata,
+    Column("run_id", String, nullable=False),
+    Column("model", String, nullable=False),
+    Column("sku", String, nullable=False),
+    Column("ds", DateTime, nullable=False),
+    Column("yhat", Float, nullable=False),
+    Column("yhat_lower", Float),
+    Column("yhat_upper", Float),
+    Column("created_at", DateTime, nullable=False),
+    Index("ix_forecasts_run_sku_ds", "run_id", "sku", "ds", unique=True),
+    Index("ix_forecasts_sku", "sku"),
+)
+
+FORECAST_COLUMNS = [column.name for column in forecasts_table.columns]
+BATCH_SIZE = 10000
+
+
+def database_url():
+    """FORECAST_DB_URL, else the POSTGRES_URL from .env."""
+    load_dotenv()
+    url = os.getenv('FORECAST_DB_URL') or os.getenv('POSTGRES_URL')
+    if not url:
+        raise ValueError("Set FORECAST_DB_URL or POSTGRES_URL")
+    # SQLAlchemy only accepts the postgresql:// scheme.
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+    return url
+
+
+def forecast_prophet(data, forecast_periods, n_jobs):
+    from forecaster import SKUForecaster
+
+    forecaster = SKUForecaster(data, forecast_periods=forecast_periods, n_jobs=n_jobs)
+    forecaster.train_and_forecast()
+    frames = []
+    for sku in forecaster.forecasts:
+        forecast = forecaster.get_forecast(sku)
+        # Only the future rows; Prophet also returns fitted history.
+        frames.append(forecast[forecast['ds'] > data.index[-1]].assign(sku=sku))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def forecast_lstm(data, forecast_periods, n_jobs=None):
+    from global_model import GlobalForecastModel
+
+    model = GlobalForecastModel()
+    model.fit(data)
+    forecast = model.predict(data, forecast_periods)
+    forecast = forecast.rename_axis(index='ds', columns='sku').stack().rename('yhat').reset_index()
+    # The LSTM gives point forecasts only.
+    forecast['yhat_lower'] = None
+    forecast['yhat_upper'] = None
+    return forecast
+
+
+ENGINES = {
+    'prophet': forecast_prophet,
+    'lstm': forecast_lstm,
+}
+
+
+def _copy_rows(connection, rows):
+    """Postgres COPY through the DBAPI cursor (psycopg2)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(['' if row[name] is None else row[name] for name in FORECAST_COLUMNS])
+    buffer.seek(0)
+    cursor = connection.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY forecasts ({', '.join(FORECAST_COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '')", buffer
+        )
+    finally:
+        cursor.close()
+
+
+def write_forecasts(engine, forecasts, run_id, model):
+    """Replace every row of run_id with forecasts in one transaction.
+
+    Re-running the same run is idempotent. Rows go in through COPY on
+    Postgres with psycopg2, otherwise through executemany batches.
+    """
+    metadata.create_all(engine)
+    created_at = datetime.now()
+    rows = [
+        {
+            "run_id": run_id,
+            "model": model,
+            "sku": record.sku,
+            "ds": pd.Timestamp(record.ds).to_pydatetime(),
+            "yhat": float(record.yhat),
+            "yhat_lower": None if pd.isna(record.yhat_lower) else float(record.yhat_lower),
+            "yhat_upper": None if pd.isna(record.yhat_upper) else float(record.yhat_upper),
+            "created_at": created_at,
+        }
+        for record in forecasts[['sku', 'ds', 'yhat', 'yhat_lower', 'yhat_upper']].itertuples(index=False)
+    ]
+
+    with engine.begin() as connection:
+        connection.execute(delete(forecasts_table).where(forecasts_table.c.run_id == run_id))
+        use_copy = engine.dialect.name == "postgresql" and engine.dialect.driver == "psycopg2"
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            if use_copy:
+                _copy_rows(connection, batch)
+            else:
+                connection.execute(forecasts_table.insert(), batch)
+    logger.info(f"Wrote {len(rows)} forecast rows for run {run_id}")
+    return len(rows)
+
+
+def load_forecasts(engine, sku=None, run_id=None):
+    """Read precomputed forecasts: one run (default: the latest) and optionally one SKU."""
+    with engine.connect() as connection:
+        if run_id is None:
+            run_id = connection.execute(
+                select(forecasts_table.c.run_id).order_by(forecasts_table.c.created_at.desc()).limit(1)
+            ).scalar()
+            if run_id is None:
+                return pd.DataFrame(columns=FORECAST_COLUMNS)
+        query = select(forecasts_table).where(forecasts_table.c.run_id == run_id)
+        if sku is not None:
+            query = query.where(forecasts_table.c.sku == sku)
+        query = query.order_by(forecasts_table.c.sku, forecasts_table.c.ds)
+        return pd.DataFrame(connection.execute(query).mappings().all(), columns=FORECAST_COLUMNS)
+
+
+def run_batch(engine, data, model='prophet', forecast_periods=30, n_jobs=None, run_id=None):
+    run_id = run_id or f"{data.index[-1]:%Y-%m-%d}-{model}"
+    logger.info(f"Forecasting {data.shape[1]} SKUs with {model} for run {run_id}")
+    forecasts = ENGINES[model](data, forecast_periods, n_jobs)
+    if forecasts.empty:
+        logger.warning("No forecasts produced")
+        return run_id, 0
+    return run_id, write_forecasts(engine, forecasts, run_id, model)
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Forecast the catalog and bulk-load results into a database")
+    parser.add_argument("--engine", choices=sorted(ENGINES), default="prophet")
+    parser.add_argument("--days", type=int, default=730, help="days of history to load")
+    parser.add_argument("--periods", type=int, default=30, help="days to forecast")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes for Prophet")
+    parser.add_argument("--db", default=None, help="SQLAlchemy URL (default FORECAST_DB_URL / POSTGRES_URL)")
+    parser.add_argument("--run-id", default=None)
+    args = parser.parse_args()
+
+    from data_loader import DataLoader
+
+    end_date = datetime.now()
+    data = DataLoader().load_daily_demand(end_date - timedelta(days=args.days), end_date)
+    engine = create_engine(args.db or database_url())
+    run_id, count = run_batch(engine, data, model=args.engine, forecast_periods=args.periods,
+                              n_jobs=args.jobs, run_id=args.run_id)
+    print(f"Run {run_id}: wrote {count} forecast rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,673 @@
+"""Offline performance benchmarks on synthetic ShipStation data.
+
+Usage:
+    python benchmark.py preprocess --line-items 1000000
+    python benchmark.py preprocess --line-items 200000 --legacy
+    python benchmark.py lstm-predict --skus 2000 --horizon 30
+    python benchmark.py lstm-export --skus 1000 --horizon 30 --threads 1
+    python benchmark.py reorder --skus 50000 --horizon 30
+    python benchmark.py pagination --line-items 100000 --latency 0.02
+    python benchmark.py scenarios --prophet-skus 20 --scenarios 24 --legacy
+    python benchmark.py api --skus 50 --requests 500 --concurrency 32
+    python benchmark.py startup --skus 50
+    python benchmark.py sparse-demand --skus 20000 --line-items 1000000
+    python benchmark.py stat-engines --skus 20000 --line-items 1000000
+    python benchmark.py demand-cube --skus 2000 --line-items 1000000 --legacy
+    python benchmark.py suite --output results.json --thresholds benchmark_thresholds.json
+
+Each benchmark prints one JSON object with its timings so runs can be
+compared over time. ``suite`` runs every stage at a modest scale, writes
+the combined results to --output and, with --thresholds, exits non-zero
+when any metric exceeds its limit.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+import tempfile
+import subprocess
+from unittest import mock
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import torch
+from synthetic import generate_orders, generate_products
+from mock_shipstation import MockShipStation
+from demand import flatten_items, daily_demand_matrix, SparseDemand
+from model import InventoryForecastModel
+from reorder import ForecastArrays, reorder_plan
+
+logger = logging.getLogger(__name__)
+
+
+def timed(func, *args, repeat=1, **kwargs):
+    """Run func repeat times and return (best seconds, last result)."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def legacy_preprocess_data(df):
+    # Row-wise implementation DataLoader.preprocess_data used before it was
+    # vectorized; kept only as the timing baseline.
+    df = df.copy()
+    df['createDate'] = pd.to_datetime(df['createDate'], errors='coerce')
+    df = df.sort_values('createDate')
+
+    def extract_sku_quantity(item):
+        if isinstance(item, dict):
+            return item.get('sku'), item.get('quantity', 0)
+        elif isinstance(item, list) and item:
+            return item[0].get('sku'), item[0].get('quantity', 0)
+        else:
+            return None, 0
+
+    df['items'] = df['items'].apply(lambda x: [x] if isinstance(x, dict) else x)
+    df['items'] = df['items'].apply(lambda x: x if isinstance(x, list) else [])
+    df_items = df.explode('items')
+    df_items[['sku', 'quantity']] = df_items['items'].apply(extract_sku_quantity).tolist()
+    df_items['quantity'] = pd.to_numeric(df_items['quantity'], errors='coerce').fillna(0)
+    df_daily = df_items.groupby(['createDate', 'sku'])['quantity'].sum().unstack(fill_value=0)
+    return df_daily.resample('D').ffill()
+
+
+def bench_preprocess(args):
+    n_orders = max(1, args.line_items // args.items_per_order)
+    generate_seconds, orders = timed(generate_orders, n_orders, args.skus, args.days, args.items_per_order)
+    df = pd.DataFrame(orders)
+    del orders
+
+    flatten_seconds, line_items = timed(flatten_items, df, repeat=args.repeat)
+    matrix_seconds, df_daily = timed(daily_demand_matrix, line_items, repeat=args.repeat)
+    result = {
+        "benchmark": "preprocess",
+        "orders": len(df),
+        "line_items": len(line_items),
+        "skus": df_daily.shape[1],
+        "days": df_daily.shape[0],
+        "generate_seconds": generate_seconds,
+        "flatten_seconds": flatten_seconds,
+        "matrix_seconds": matrix_seconds,
+        "preprocess_seconds": flatten_seconds + matrix_seconds,
+    }
+    if args.legacy:
+        legacy_seconds, _ = timed(legacy_preprocess_data, df, repeat=args.repeat)
+        result["legacy_seconds"] = legacy_seconds
+        result["speedup"] = legacy_seconds / result["preprocess_seconds"]
+    return result
+
+
+def legacy_lstm_predict(model, data, steps):
+    # Per-series rollout InventoryForecastModel.predict used before batching.
+    model.model.eval()
+    with torch.no_grad():
+        predictions = []
+        input_tensor = torch.FloatTensor(data).unsqueeze(0)
+        for _ in range(steps):
+            output = model.model(input_tensor)
+            predictions.append(output.item())
+            input_tensor = torch.cat([input_tensor[:, 1:, :], output.unsqueeze(2)], dim=1)
+    return np.array(predictions)
+
+
+def bench_lstm_predict(args):
+    rng = np.random.default_rng(0)
+    windows = rng.standard_normal((args.skus, 7, 1)).astype(np.float32)
+    recursive = InventoryForecastModel(output_size=1)
+    direct = InventoryForecastModel(output_size=args.horizon)
+
+    batched_seconds, batched = timed(recursive.predict, windows, args.horizon, repeat=args.repeat)
+    direct_seconds, _ = timed(direct.predict, windows, args.horizon, repeat=args.repeat)
+    result = {
+        "benchmark": "lstm-predict",
+        "skus": args.skus,
+        "horizon": args.horizon,
+        "batched_recursive_seconds": batched_seconds,
+        "direct_seconds": direct_seconds,
+        "batched_recursive_skus_per_second": args.skus / batched_seconds,
+        "direct_skus_per_second": args.skus / direct_seconds,
+    }
+    if args.legacy:
+        def run_legacy():
+            return np.stack([legacy_lstm_predict(recursive, window, args.horizon) for window in windows])
+        legacy_seconds, legacy = timed(run_legacy, repeat=args.repeat)
+        result["legacy_seconds"] = legacy_seconds
+        result["legacy_skus_per_second"] = args.skus / legacy_seconds
+        result["batched_speedup"] = legacy_seconds / batched_seconds
+        result["direct_speedup"] = legacy_seconds / direct_seconds
+        result["max_abs_diff"] = float(np.abs(legacy - batched).max())
+    return result
+
+
+def bench_lstm_export(args):
+    import inference
+
+    inference.configure_threads(args.threads)
+    result = {"benchmark": "lstm-export", "skus": args.skus, "horizon": args.horizon,
+              "threads": torch.get_num_threads()}
+    variants = [("torchscript", False), ("torchscript", True), ("onnx", False)]
+    with tempfile.TemporaryDirectory() as directory:
+        for backend, quantized in variants:
+            name = backend + ("_int8" if quantized else "")
+            model = InventoryForecastModel(output_size=1)
+            try:
+                artifact = inference.compile_model(model, directory, backend, quantized, num_threads=args.threads)
+            except ImportError as e:
+                logger.warning(f"Skipping {name}: {str(e)}")
+                continue
+            if artifact is None:
+                result[name] = {"parity": False}
+                continue
+            latency = inference.compare_latency(model, model.runtime, steps=args.horizon, batch_size=args.skus,
+                                                repeat=max(args.repeat, 20))
+            result[name] = dict(latency, parity=True, parity_error=artifact["parity_error"])
+    return result
+
+
+def legacy_purchase_recommendations(forecasts, current_stock):
+    # Per-SKU loop SKUForecaster.get_purchase_recommendations used before the
+    # vectorized reorder engine.
+    recommendations = {}
+    for sku, forecast in forecasts.items():
+        last_30_days = forecast['yhat'].tail(30).sum()
+        recommendations[sku] = max(0, last_30_days - current_stock.get(sku, 0))
+    return recommendations
+
+
+def bench_reorder(args):
+    rng = np.random.default_rng(0)
+    skus = [f"SKU-{i:05d}" for i in range(args.skus)]
+    yhat = rng.gamma(2.0, 5.0, (args.skus, args.horizon))
+    spread = rng.uniform(0.1, 0.5, (args.skus, 1)) * yhat
+    forecasts = ForecastArrays(skus, yhat, yhat - spread, yhat + spread)
+    stock = pd.Series(rng.integers(0, 500, args.skus), index=skus)
+
+    plan_seconds, plan = timed(reorder_plan, forecasts, stock, repeat=args.repeat)
+    result = {
+        "benchmark": "reorder",
+        "skus": args.skus,
+        "horizon": args.horizon,
+        "plan_seconds": plan_seconds,
+        "reorders": int(plan['reorder'].sum()),
+    }
+    if args.legacy:
+        frames = {sku: pd.DataFrame({'yhat': yhat[i]}) for i, sku in enumerate(skus)}
+        legacy_seconds, _ = timed(legacy_purchase_recommendations, frames, stock.to_dict(), repeat=args.repeat)
+        result["legacy_seconds"] = legacy_seconds
+        result["speedup"] = legacy_seconds / plan_seconds
+    return result
+
+
+def synthetic_demand(args):
+    orders = generate_orders(max(1, args.line_items // args.items_per_order), args.skus, args.days,
+                             args.items_per_order)
+    return daily_demand_matrix(flatten_items(pd.DataFrame(orders)))
+
+
+def bench_pagination(args):
+    from data_loader import DataLoader
+
+    n_orders = max(1, args.line_items // args.items_per_order)
+    orders = generate_orders(n_orders, args.skus, args.days, args.items_per_order)
+    server = MockShipStation(orders, generate_products(args.skus), rate_limit=args.rate_limit,
+                             latency=args.latency)
+    environ = dict(SHIPSTATION_BASE_URL=server.start(), SHIPSTATION_API_KEY="bench", SHIPSTATION_API_SECRET="bench")
+    try:
+        with mock.patch.dict(os.environ, environ):
+            loader = DataLoader(store=None)
+        start_date = datetime(2023, 1, 1)
+        end_date = start_date + timedelta(days=args.days)
+        params = {'createDateStart': start_date.isoformat(), 'createDateEnd': end_date.isoformat()}
+        fetch_seconds, fetched = timed(loader._fetch_orders, params, repeat=args.repeat)
+        requests_before = server.request_count
+        demand_seconds, demand = timed(loader.load_daily_demand, start_date, end_date, repeat=args.repeat)
+    finally:
+        server.stop()
+    return {
+        "benchmark": "pagination",
+        "orders": len(fetched),
+        "pages": server.request_count - requests_before,
+        "latency": args.latency,
+        "fetch_seconds": fetch_seconds,
+        "load_daily_demand_seconds": demand_seconds,
+        "orders_per_second": len(fetched) / fetch_seconds,
+        "skus": demand.shape[1],
+    }
+
+
+def bench_lstm_fit(args):
+    from predict import fit_series_model, forecast_from_window, SEQUENCE_LENGTH
+
+    data = synthetic_demand(args)
+    series = data[data.sum().idxmax()].to_numpy()
+    fit_seconds, (model, n_samples) = timed(fit_series_model, series, epochs=args.epochs, repeat=args.repeat)
+    predict_seconds, _ = timed(forecast_from_window, model, series[-SEQUENCE_LENGTH:], args.horizon,
+                               repeat=args.repeat)
+    return {
+        "benchmark": "lstm-fit",
+        "days": len(series),
+        "windows": n_samples,
+        "epochs": args.epochs,
+        "fit_seconds": fit_seconds,
+        "predict_seconds": predict_seconds,
+    }
+
+
+def bench_prophet(args):
+    from forecaster import SKUForecaster
+    from cache import ForecastCache
+
+    data = synthetic_demand(args)
+    data = data[data.sum().nlargest(args.prophet_skus).index]
+
+    def train():
+        forecaster = SKUForecaster(data, forecast_periods=args.horizon, n_jobs=args.jobs, cache=ForecastCache())
+        forecaster.train_models()
+        return forecaster
+
+    train_seconds, forecaster = timed(train, repeat=args.repeat)
+    forecast_seconds, _ = timed(forecaster.make_forecasts, repeat=1)
+    return {
+        "benchmark": "prophet",
+        "skus": data.shape[1],
+        "days": data.shape[0],
+        "jobs": forecaster.n_jobs,
+        "train_seconds": train_seconds,
+        "forecast_seconds": forecast_seconds,
+        "train_skus_per_second": data.shape[1] / train_seconds,
+    }
+
+
+def bench_stat_engines(args):
+    import stat_engines
+    from forecaster import SKUForecaster
+    from cache import ForecastCache
+
+    data = synthetic_demand(args)
+    Y = stat_engines.demand_array(data, data.columns)
+    result = {"benchmark": "stat-engines", "skus": data.shape[1], "days": data.shape[0], "horizon": args.horizon}
+    for name, engine in stat_engines.ENGINES.items():
+        result[f"{name}_seconds"], _ = timed(engine, Y, args.horizon, repeat=args.repeat)
+    result["route_seconds"], (choice, _) = timed(stat_engines.route_engines, Y, args.horizon, repeat=args.repeat)
+    result["routed"] = {name: int(count) for name, count in zip(*np.unique(choice, return_counts=True))}
+
+    def forecast():
+        forecaster = SKUForecaster(data, forecast_periods=args.horizon, engine='auto', cache=ForecastCache())
+        forecaster.train_and_forecast()
+        return forecaster
+
+    result["catalog_seconds"], forecaster = timed(forecast, repeat=args.repeat)
+    result["forecasts"] = len(forecaster.forecasts)
+    result["skus_per_second"] = len(forecaster.forecasts) / result["catalog_seconds"]
+    return result
+
+
+def bench_demand_cube(args):
+    from demand_cube import DemandCube
+
+    orders = generate_orders(max(1, args.line_items // args.items_per_order), args.skus, args.days,
+                             args.items_per_order)
+    pages = [orders[i:i + 500] for i in range(0, len(orders), 500)]
+    build_seconds, cube = timed(DemandCube.from_orders, pages, repeat=args.repeat)
+    rng = np.random.default_rng(0)
+    offsets = rng.integers(0, cube.n_days, (100, 2))
+    ranges = [(cube.index[min(a, b)], cube.index[max(a, b)]) for a, b in offsets]
+
+    def queries():
+        for start, end in ranges:
+            cube.daily(start, end)
+            cube.top_skus(start, end, 10)
+
+    query_seconds, _ = timed(queries, repeat=args.repeat)
+    result = {
+        "benchmark": "demand-cube",
+        "orders": len(orders),
+        "skus": len(cube.skus),
+        "days": cube.n_days,
+        "megabytes": cube.nbytes / 1e6,
+        "build_seconds": build_seconds,
+        "query_seconds": query_seconds / len(ranges),
+    }
+    if args.legacy:
+        frame = pd.DataFrame(orders)
+
+        def legacy_query(start, end):
+            # What get_daily_order_totals + get_top_selling_skus did per call,
+            # minus the refetch: parse, group and re-explode the orders.
+            df = frame.copy()
+            df['createDate'] = pd.to_datetime(df['createDate'], errors='coerce')
+            df = df[(df['createDate'] >= start) & (df['createDate'] < end + pd.Timedelta(days=1))]
+            df.groupby(df['createDate'].dt.date)['orderTotal'].sum()
+            flatten_items(df).groupby('sku')['quantity'].sum().nlargest(10)
+
+        legacy_seconds, _ = timed(legacy_query, *ranges[0], repeat=args.repeat)
+        result["legacy_query_seconds"] = legacy_seconds
+        result["speedup"] = legacy_seconds / result["query_seconds"]
+    return result
+
+
+def bench_scenarios(args):
+    from forecaster import SKUForecaster
+    from cache import ForecastCache
+    from scenarios import Scenario
+
+    data = synthetic_demand(args)
+    data = data[data.sum().nlargest(args.prophet_skus).index]
+    forecaster = SKUForecaster(data, forecast_periods=args.horizon, n_jobs=args.jobs, cache=ForecastCache())
+    forecaster.train_models()
+    scenarios = [Scenario(f"lift-{i}", multiplier=1 + 0.05 * i, trend_change=0.01 * (i % 4))
+                 for i in range(args.scenarios)]
+    pairs = len(forecaster.models) * len(scenarios)
+
+    point_seconds, table = timed(forecaster.simulate_scenarios, scenarios, repeat=args.repeat)
+    sampled_seconds, _ = timed(forecaster.simulate_scenarios, scenarios, uncertainty_samples=1000,
+                               repeat=args.repeat)
+    result = {
+        "benchmark": "scenarios",
+        "skus": len(forecaster.models),
+        "scenarios": len(scenarios),
+        "jobs": forecaster.n_jobs,
+        "rows": len(table),
+        "point_seconds": point_seconds,
+        "sampled_seconds": sampled_seconds,
+        "scenario_skus_per_second": pairs / point_seconds,
+    }
+    if args.legacy:
+        # One full predict (1000 uncertainty samples) per SKU and scenario;
+        # timed on a single pair and scaled to the grid.
+        sku = next(iter(forecaster.models))
+        legacy_seconds, _ = timed(forecaster.simulate_scenario, sku, lambda future: future, repeat=args.repeat)
+        result["legacy_seconds"] = legacy_seconds * pairs
+        result["speedup"] = result["legacy_seconds"] / point_seconds
+    return result
+
+
+def bench_api(args):
+    """Latency of /predict under concurrent load, served from a temporary registry.
+
+    Models are registered up front so requests measure serving rather than
+    training; repeated SKUs exercise the forecast cache and request coalescing.
+    """
+    with tempfile.TemporaryDirectory(prefix="bench-api-") as workdir, \
+            mock.patch.dict(os.environ, MODEL_REGISTRY_PATH=os.path.join(workdir, "registry"),
+                            JOB_DB_PATH=os.path.join(workdir, "jobs.db")), \
+            mock.patch("registry._registry", None):
+        # A fresh process-wide registry in workdir, dropped again on exit.
+        return _bench_api(args)
+
+
+def _bench_api(args):
+    import httpx
+    from predict import fit_series_model, SEQUENCE_LENGTH
+    import api
+    from registry import get_registry
+
+    registry = get_registry()
+    data = synthetic_demand(args)
+    skus = list(data.sum().nlargest(args.skus).index)
+    model, _ = fit_series_model(data[skus[0]].to_numpy(), epochs=1)
+    for sku in skus:
+        registry.save(sku, model, {"last_window": data[sku].to_numpy()[-SEQUENCE_LENGTH:].tolist()})
+
+    async def run():
+        latencies = []
+        semaphore = asyncio.Semaphore(args.concurrency)
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            async def request(i):
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/predict", json={"sku": skus[i % len(skus)], "days": args.horizon})
+                    latencies.append(time.perf_counter() - start)
+                    response.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(request(i) for i in range(args.requests)))
+            return time.perf_counter() - start, np.array(latencies)
+
+    total_seconds, latencies = asyncio.run(run())
+    return {
+        "benchmark": "api",
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "skus": len(skus),
+        "requests_per_second": args.requests / total_seconds,
+        "p50_seconds": float(np.percentile(latencies, 50)),
+        "p95_seconds": float(np.percentile(latencies, 95)),
+        "p99_seconds": float(np.percentile(latencies, 99)),
+    }
+
+
+def bench_sparse_demand(args):
+    """Memory and access cost of the dense wide matrix against SparseDemand."""
+    orders = generate_orders(max(1, args.line_items // args.items_per_order), args.skus, args.days,
+                             args.items_per_order)
+    line_items = flatten_items(pd.DataFrame(orders))
+    del orders
+
+    dense_seconds, dense = timed(daily_demand_matrix, line_items, repeat=args.repeat)
+    sparse_seconds, sparse = timed(SparseDemand.from_line_items, line_items, repeat=args.repeat)
+    skus = list(dense.columns[:: max(1, len(dense.columns) // 200)])
+    dense_slice_seconds, _ = timed(lambda: [dense[[sku]].reset_index() for sku in skus], repeat=args.repeat)
+    sparse_slice_seconds, _ = timed(lambda: [sparse.prophet_frame(sku) for sku in skus], repeat=args.repeat)
+
+    with tempfile.TemporaryDirectory(prefix="bench-sparse-") as path:
+        sparse.save(path)
+        mapped_seconds, _ = timed(SparseDemand.load, path, repeat=args.repeat)
+    return {
+        "benchmark": "sparse-demand",
+        "skus": len(sparse.skus),
+        "days": sparse.n_days,
+        "nonzeros": len(sparse.quantity),
+        "density": len(sparse.quantity) / max(1, sparse.n_days * len(sparse.skus)),
+        "dense_bytes": int(dense.memory_usage(index=False).sum()),
+        "sparse_bytes": int(sparse.nbytes),
+        "dense_build_seconds": dense_seconds,
+        "sparse_build_seconds": sparse_seconds,
+        "dense_prophet_frame_seconds": dense_slice_seconds / len(skus),
+        "sparse_prophet_frame_seconds": sparse_slice_seconds / len(skus),
+        "mmap_load_seconds": mapped_seconds,
+    }
+
+
+STARTUP_SCRIPT = """
+import json, time, asyncio
+started = time.perf_counter()
+import api
+imported = time.perf_counter()
+import httpx
+
+async def main():
+    if WARM:
+        await api.startup_event()
+    ready = time.perf_counter()
+    transport = httpx.ASGITransport(app=api.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        timings = []
+        for sku in SKUS:
+            start = time.perf_counter()
+            (await client.post("/predict", json={"sku": sku, "days": 30})).raise_for_status()
+            timings.append(time.perf_counter() - start)
+    if WARM:
+        await api.shutdown_event()
+    print(json.dumps({"import_seconds": imported - started, "startup_seconds": ready - imported,
+                      "first_request_seconds": timings[0], "later_request_seconds": timings[1:],
+                      "time_to_first_response_seconds": ready - started + timings[0]}))
+
+asyncio.run(main())
+"""
+
+
+def bench_startup(args):
+    """Import cost, warm-up and time-to-first-request of api.py in a fresh interpreter.
+
+    Runs once with the startup phase (preloading registered models) and once
+    without it, so the cost it moves off the first request is visible.
+    """
+    from predict import fit_series_model, SEQUENCE_LENGTH
+    from registry import ModelRegistry
+
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as workdir:
+        registry = ModelRegistry(os.path.join(workdir, "registry"))
+        data = synthetic_demand(args)
+        skus = list(data.sum().nlargest(args.skus).index)
+        model, _ = fit_series_model(data[skus[0]].to_numpy(), epochs=1)
+        for sku in skus:
+            registry.save(sku, model, {"last_window": data[sku].to_numpy()[-SEQUENCE_LENGTH:].tolist()})
+
+        env = dict(os.environ, MODEL_REGISTRY_PATH=registry.root, JOB_DB_PATH=os.path.join(workdir, "jobs.db"))
+        result = {"benchmark": "startup", "skus": len(skus)}
+        for label, warm in (("warm", True), ("cold", False)):
+            script = f"WARM = {warm}\nSKUS = {json.dumps(skus[:5])}\n" + STARTUP_SCRIPT
+            output = subprocess.run([sys.executable, "-c", script], env=env, cwd=os.path.dirname(__file__) or ".",
+                                    capture_output=True, text=True, check=True).stdout
+            timings = json.loads(output.strip().splitlines()[-1])
+            timings["later_request_seconds"] = float(np.median(timings["later_request_seconds"]))
+            result.update({f"{label}_{key}": value for key, value in timings.items()})
+
+        importtime = subprocess.run([sys.executable, "-X", "importtime", "-c", "import api"], env=env,
+                                    cwd=os.path.dirname(__file__) or ".", capture_output=True, text=True).stderr
+        # -X importtime lines are "import time: self | cumulative | <indent>name", two spaces per level.
+        children = []
+        for line in importtime.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                name = parts[2].rstrip()
+                depth = (len(name) - len(name.lstrip()) - 1) // 2
+                if depth == 1:
+                    children.append((int(parts[1]) / 1e6, name.strip()))
+        result["api_import_top_modules"] = {name: seconds for seconds, name in sorted(children, reverse=True)[:8]}
+        return result
+
+
+# Stages run by `suite`, with the argument overrides that keep it to a few minutes.
+SUITE = {
+    "pagination": {"line_items": 60000, "latency": 0.01},
+    "preprocess": {"line_items": 300000},
+    "lstm-fit": {"epochs": 20},
+    "lstm-predict": {},
+    "lstm-export": {"skus": 1000},
+    "prophet": {},
+    "reorder": {"skus": 50000},
+    "scenarios": {"prophet_skus": 10},
+    "api": {"skus": 20},
+    "startup": {"skus": 20},
+    "sparse-demand": {"skus": 20000, "line_items": 300000},
+    "stat-engines": {"skus": 5000, "line_items": 300000},
+    "demand-cube": {"line_items": 300000},
+}
+
+
+def bench_suite(args):
+    results = {}
+    for name, overrides in SUITE.items():
+        stage_args = argparse.Namespace(**dict(vars(args), **overrides))
+        logger.warning(f"Running {name}")
+        results[name] = BENCHMARKS[name](stage_args)
+    return {
+        "benchmark": "suite",
+        "timestamp": datetime.now().isoformat(),
+        "stages": results,
+    }
+
+
+def flatten_metrics(result, prefix=""):
+    """{"stages": {"api": {"p95_seconds": 0.1}}} -> {"api.p95_seconds": 0.1} for numeric values."""
+    metrics = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            metrics.update(flatten_metrics(value, f"{prefix}{key}." if key != "stages" else prefix))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            metrics[f"{prefix}{key}"] = value
+    return metrics
+
+
+def check_thresholds(result, thresholds):
+    """Compare metrics with {"metric": {"max": x} | {"min": y}}; returns a list of violations."""
+    metrics = flatten_metrics(result)
+    if result.get("benchmark") != "suite":
+        metrics = {f"{result['benchmark']}.{key}": value for key, value in metrics.items()}
+    violations = []
+    for name, limits in thresholds.items():
+        if name not in metrics:
+            continue
+        value = metrics[name]
+        if "max" in limits and value > limits["max"]:
+            violations.append(f"{name} = {value:.4g} exceeds max {limits['max']}")
+        if "min" in limits and value < limits["min"]:
+            violations.append(f"{name} = {value:.4g} below min {limits['min']}")
+    return violations
+
+
+BENCHMARKS = {
+    "preprocess": bench_preprocess,
+    "lstm-predict": bench_lstm_predict,
+    "lstm-export": bench_lstm_export,
+    "reorder": bench_reorder,
+    "pagination": bench_pagination,
+    "lstm-fit": bench_lstm_fit,
+    "prophet": bench_prophet,
+    "scenarios": bench_scenarios,
+    "api": bench_api,
+    "startup": bench_startup,
+    "sparse-demand": bench_sparse_demand,
+    "stat-engines": bench_stat_engines,
+    "demand-cube": bench_demand_cube,
+    "suite": bench_suite,
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Inventory forecast performance benchmarks")
+    parser.add_argument("benchmark", choices=sorted(BENCHMARKS))
+    parser.add_argument("--line-items", type=int, default=1_000_000)
+    parser.add_argument("--items-per-order", type=int, default=3)
+    parser.add_argument("--skus", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--horizon", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--epochs", type=int, default=100, help="LSTM training epochs (lstm-fit)")
+    parser.add_argument("--prophet-skus", type=int, default=20)
+    parser.add_argument("--scenarios", type=int, default=24, help="what-if scenarios per SKU (scenarios)")
+    parser.add_argument("--jobs", type=int, default=None, help="Prophet worker processes (default: all cores)")
+    parser.add_argument("--latency", type=float, default=0.0, help="mock server seconds per page")
+    parser.add_argument("--rate-limit", type=int, default=100000, help="mock server requests per window")
+    parser.add_argument("--requests", type=int, default=500, help="API requests to send")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None, help="torch intra-op threads (lstm-export)")
+    parser.add_argument("--output", default=None, help="also write the JSON result to this file")
+    parser.add_argument("--thresholds", default=None,
+                        help="JSON file of metric limits; exit 1 if any is exceeded")
+    parser.add_argument("--legacy", action="store_true",
+                        help="also time the pre-optimization baseline (for preprocess it unstacks by raw "
+                             "timestamp, so memory grows with orders x SKUs; keep --line-items modest)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING)
+    args = parse_args(argv)
+    result = BENCHMARKS[args.benchmark](args)
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            violations = check_thresholds(result, json.load(f))
+        for violation in violations:
+            print(f"REGRESSION: {violation}", file=sys.stderr)
+        if violations:
+            sys.exit(1)
+    return result
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,143 @@
+import os
+import pickle
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+
+def forecast_key(sku, horizon, model_version, watermark):
+    """Cache key for one forecast: which SKU, how far ahead, from which model, on which data."""
+    return f"{sku}|{horizon}|{model_version}|{watermark}"
+
+
+class ForecastCache:
+    """Two-tier cache of computed forecasts.
+
+    The memory tier is an LRU bounded by ``max_entries``. The optional disk
+    tier is a SQLite file, so the API, the dashboard and batch jobs on the
+    same host reuse each other's results; once it holds more than
+    ``max_disk_entries`` rows, the least recently read or written go first.
+    Values are returned as stored; callers must not mutate them.
+    """
+
+    def __init__(self, max_entries=1024, disk_path=None, max_disk_entries=100000):
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self.disk_path = disk_path
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.conn = None
+        # Upper bound on the disk rows (overwrites count as new), refreshed
+        # with COUNT(*) once it passes max_disk_entries.
+        self._disk_entries = 0
+        if disk_path:
+            self.conn = sqlite3.connect(disk_path, check_same_thread=False, timeout=30)
+            with self._lock, self.conn:
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS forecasts (key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                    "created_at TEXT NOT NULL, accessed_at TEXT)"
+                )
+                columns = {row[1] for row in self.conn.execute("PRAGMA table_info(forecasts)")}
+                if 'accessed_at' not in columns:
+                    # Caches created before eviction went by last access.
+                    self.conn.execute("ALTER TABLE forecasts ADD COLUMN accessed_at TEXT")
+                    self.conn.execute("UPDATE forecasts SET accessed_at = created_at")
+                self.conn.execute("DROP INDEX IF EXISTS idx_forecasts_created_at")
+                self.conn.execute("CREATE INDEX IF NOT EXISTS idx_forecasts_accessed_at ON forecasts (accessed_at)")
+                self._disk_entries = self.conn.execute("SELECT COUNT(*) FROM forecasts").fetchone()[0]
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+            if self.conn is not None:
+                row = self.conn.execute("SELECT value FROM forecasts WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    with self.conn:
+                        self.conn.execute("UPDATE forecasts SET accessed_at = ? WHERE key = ?",
+                                          (datetime.now().isoformat(), key))
+                    value = pickle.loads(row[0])
+                    self._remember(key, value)
+                    self.disk_hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            if self.conn is None:
+                return
+            now = datetime.now().isoformat()
+            with self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO forecasts (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, pickle.dumps(value), now, now)
+                )
+                self._disk_entries += 1
+                if self._disk_entries > self.max_disk_entries:
+                    self._evict()
+
+    def _evict(self):
+        # Least recently used rows beyond max_disk_entries; other processes
+        # may share the file, so count rather than trust _disk_entries.
+        count = self.conn.execute("SELECT COUNT(*) FROM forecasts").fetchone()[0]
+        if count > self.max_disk_entries:
+            self.conn.execute(
+                "DELETE FROM forecasts WHERE key IN (SELECT key FROM forecasts ORDER BY accessed_at LIMIT ?)",
+                (count - self.max_disk_entries,)
+            )
+            count = self.max_disk_entries
+        self._disk_entries = count
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.conn is not None:
+                with self.conn:
+                    self.conn.execute("DELETE FROM forecasts")
+                self._disk_entries = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_forecast_cache():
+    """Process-wide cache configured from FORECAST_CACHE_* environment variables."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ForecastCache(
+                max_entries=int(os.getenv('FORECAST_CACHE_SIZE', 1024)),
+                disk_path=os.getenv('FORECAST_CACHE_PATH') or None,
+                max_disk_entries=int(os.getenv('FORECAST_CACHE_DISK_SIZE', 100000))
+            )
+        return _cache
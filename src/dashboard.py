@@ -2,16 +2,32 @@ import streamlit as st
 import pandas as pd
 import plotly.graph_objs as go
 from data_loader import DataLoader
-from predict import make_prediction
 from datetime import datetime, timedelta
+import os
 
 @st.cache
 def load_data():
     loader = DataLoader()
     end_date = datetime.now()
     start_date = end_date - timedelta(days=90)
-    raw_data = loader.load_order_history(start_date, end_date)
-    return loader.preprocess_data(raw_data)
+    return loader.load_daily_demand(start_date, end_date)
+
+@st.cache(allow_output_mutation=True)
+def forecast_engine():
+    # Precomputed forecasts written by batch_forecast.py, if configured.
+    url = os.getenv('FORECAST_DB_URL')
+    if not url:
+        return None
+    from sqlalchemy import create_engine
+    return create_engine(url)
+
+def load_precomputed(sku):
+    engine = forecast_engine()
+    if engine is None:
+        return None
+    from batch_forecast import load_forecasts
+    forecast = load_forecasts(engine, sku=sku)
+    return forecast if not forecast.empty else None
 
 st.title('Inventory Forecast Dashboard')
 
@@ -20,15 +36,27 @@ data = load_data()
 sku = st.selectbox('Select SKU', data.columns)
 
 if st.button('Generate Forecast'):
-    with st.spinner('Generating forecast...'):
-        prediction = make_prediction(sku)
+    precomputed = load_precomputed(sku)
+    if precomputed is None:
+        with st.spinner('Generating forecast...'):
+            # torch is only imported when a forecast has to be computed here.
+            from predict import make_prediction
+            prediction = make_prediction(sku)
     
     sku_data = data[sku].dropna()
     
     fig = go.Figure()
     fig.add_trace(go.Scatter(x=sku_data.index, y=sku_data.values, name='Historical Data'))
-    fig.add_trace(go.Scatter(x=pd.date_range(start=sku_data.index[-1], periods=31, freq='D')[1:], 
-                             y=prediction, name='Prediction'))
+    if precomputed is None:
+        fig.add_trace(go.Scatter(x=pd.date_range(start=sku_data.index[-1], periods=31, freq='D')[1:], 
+                                 y=prediction, name='Prediction'))
+    else:
+        fig.add_trace(go.Scatter(x=precomputed['ds'], y=precomputed['yhat'], name='Prediction'))
+        if precomputed['yhat_upper'].notna().any():
+            fig.add_trace(go.Scatter(x=precomputed['ds'], y=precomputed['yhat_upper'], name='Upper bound',
+                                     line=dict(dash='dot')))
+            fig.add_trace(go.Scatter(x=precomputed['ds'], y=precomputed['yhat_lower'], name='Lower bound',
+                                     line=dict(dash='dot')))
     
     fig.update_layout(title=f'Sales History and Prediction for SKU: {sku}',
                       xaxis_title='Date',
@@ -1,10 +1,14 @@
 import os
-import requests
 import pandas as pd
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 import logging
 import base64
+from order_store import OrderStore, date_key
+from fetcher import PageFetcher
+from demand import DailyDemandAccumulator, flatten_items, daily_demand_matrix
+from demand_cube import DemandCube
+from metrics import timed_stage, count_items
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -13,11 +17,11 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 load_dotenv()
 
 class DataLoader:
-    def __init__(self):
+    def __init__(self, store=None):
         try:
             self.api_key = os.getenv('SHIPSTATION_API_KEY')
             self.api_secret = os.getenv('SHIPSTATION_API_SECRET')
-            self.base_url = "https://ssapi.shipstation.com"
+            self.base_url = os.getenv('SHIPSTATION_BASE_URL', "https://ssapi.shipstation.com")
 
             if not all([self.api_key, self.api_secret]):
                 raise ValueError("Missing ShipStation API credentials in environment variables")
@@ -26,6 +30,18 @@ class DataLoader:
                 "Authorization": f"Basic {self._get_auth_header()}",
                 "Content-Type": "application/json"
             }
+            self.fetcher = PageFetcher(self.base_url, self.headers,
+                                       max_workers=int(os.getenv('SHIPSTATION_MAX_WORKERS', 4)))
+
+            # Optional local order store; repeat loads are served from disk and
+            # only orders modified since the last sync are fetched.
+            store_path = os.getenv('ORDER_STORE_PATH')
+            if store is None and store_path:
+                store = OrderStore(store_path)
+            self.store = store
+            # Demand cube behind the aggregate queries, and the range it was loaded for.
+            self._cube = None
+            self._cube_range = None
             logging.info("ShipStation API connection established successfully")
         except Exception as e:
             logging.error(f"Error initializing DataLoader: {str(e)}")
@@ -35,69 +51,111 @@ class DataLoader:
         auth_string = f"{self.api_key}:{self.api_secret}"
         return base64.b64encode(auth_string.encode()).decode()
 
+    def _fetch_pages(self, endpoint, params, key):
+        return self.fetcher.iter_pages(endpoint, params, key)
+
+    def _fetch_orders(self, params):
+        all_orders = []
+        for orders in self._fetch_pages("orders", dict(params, pageSize=500), 'orders'):
+            all_orders.extend(orders)
+        return all_orders
+
+    @timed_stage("order_store_sync")
+    def sync_order_store(self, start_date):
+        """Bring the local order store up to date for orders created since start_date."""
+        covered_start = self.store.get_covered_start()
+        watermark = self.store.get_watermark()
+        sync_started = datetime.now()
+
+        if covered_start is None:
+            # First sync: everything created from start_date up to now.
+            orders = self._fetch_orders({"createDateStart": start_date.isoformat()})
+            latest = self.store.upsert_orders(orders)
+            self.store.set_covered_start(start_date)
+            self.store.set_watermark(latest or sync_started)
+            logging.info(f"Order store initialized with {len(orders)} orders")
+            return
+
+        if date_key(start_date) < covered_start:
+            # Backfill the older part of the window the store has never seen.
+            orders = self._fetch_orders({
+                "createDateStart": start_date.isoformat(),
+                "createDateEnd": covered_start
+            })
+            self.store.upsert_orders(orders)
+            self.store.set_covered_start(start_date)
+            logging.info(f"Order store backfilled {len(orders)} orders from {start_date}")
+
+        # Incremental sync: new orders and changes to existing ones. The
+        # watermark itself is re-fetched so nothing modified in the same second
+        # is missed; upserts make that overlap harmless.
+        orders = self._fetch_orders({"modifyDateStart": watermark})
+        latest = self.store.upsert_orders(orders)
+        if latest and latest > watermark:
+            self.store.set_watermark(latest)
+        logging.info(f"Order store synced {len(orders)} orders modified since {watermark}")
+
+    @timed_stage("load_order_history")
     def load_order_history(self, start_date, end_date):
         try:
-            url = f"{self.base_url}/orders"
-            params = {
+            if self.store is not None:
+                self.sync_order_store(start_date)
+                df = self.store.load_orders(start_date, end_date)
+                logging.info(f"Loaded {len(df)} orders from local order store")
+                return df
+
+            all_orders = self._fetch_orders({
                 "createDateStart": start_date.isoformat(),
-                "createDateEnd": end_date.isoformat(),
-                "pageSize": 500  # Adjust as needed
-            }
-            
-            all_orders = []
-            page = 1
-            
-            while True:
-                params['page'] = page
-                response = requests.get(url, headers=self.headers, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                if not data['orders']:
-                    break
-                
-                all_orders.extend(data['orders'])
-                page += 1
+                "createDateEnd": end_date.isoformat()
+            })
 
             df = pd.DataFrame(all_orders)
+            count_items("load_order_history", len(df), unit="orders")
             logging.info(f"Loaded {len(df)} orders from ShipStation API")
             return df
         except Exception as e:
             logging.error(f"Error loading order history: {str(e)}")
             raise
 
+    def _iter_order_pages(self, start_date, end_date):
+        """Pages of orders created in the range, from the order store when configured."""
+        if self.store is not None:
+            self.sync_order_store(start_date)
+            return self.store.iter_orders(start_date, end_date)
+        return self._fetch_pages("orders", {
+            "createDateStart": start_date.isoformat(),
+            "createDateEnd": end_date.isoformat(),
+            "pageSize": 500
+        }, 'orders')
+
+    @timed_stage("load_daily_demand")
+    def load_daily_demand(self, start_date, end_date, sparse=False):
+        """Streaming alternative to load_order_history + preprocess_data.
+
+        Each page of orders is reduced into per-day SKU quantities as soon as
+        it arrives, so the full order DataFrame is never built. sparse=True
+        returns a demand.SparseDemand instead of the dense wide frame.
+        """
+        try:
+            accumulator = DailyDemandAccumulator()
+            for orders in self._iter_order_pages(start_date, end_date):
+                accumulator.add_orders(orders)
+
+            df_daily = accumulator.to_sparse() if sparse else accumulator.to_frame()
+            count_items("load_daily_demand", accumulator.order_count, unit="orders")
+            logging.info(f"Streamed {accumulator.order_count} orders into daily demand. Shape: {df_daily.shape}")
+            return df_daily
+        except Exception as e:
+            logging.error(f"Error loading daily demand: {str(e)}")
+            raise
+
+    @timed_stage("preprocess")
     def preprocess_data(self, df):
         try:
-            # Convert createDate to datetime
-            df['createDate'] = pd.to_datetime(df['createDate'], errors='coerce')
-            
-            # Sort by date
-            df = df.sort_values('createDate')
-            
-            # Function to safely extract SKU and quantity
-            def extract_sku_quantity(item):
-                if isinstance(item, dict):
-                    return item.get('sku'), item.get('quantity', 0)
-                elif isinstance(item, list) and item:
-                    return item[0].get('sku'), item[0].get('quantity', 0)
-                else:
-                    return None, 0
-
-            # Extract SKU and quantity from items
-            df['items'] = df['items'].apply(lambda x: [x] if isinstance(x, dict) else x)
-            df['items'] = df['items'].apply(lambda x: x if isinstance(x, list) else [])
-            df_items = df.explode('items')
-            df_items[['sku', 'quantity']] = df_items['items'].apply(extract_sku_quantity).tolist()
-            
-            # Convert quantity to numeric, replacing any non-numeric values with 0
-            df_items['quantity'] = pd.to_numeric(df_items['quantity'], errors='coerce').fillna(0)
-            
-            # Group by date and SKU, sum the quantities
-            df_daily = df_items.groupby(['createDate', 'sku'])['quantity'].sum().unstack(fill_value=0)
-            
-            # Resample to daily frequency and forward fill missing values
-            df_daily = df_daily.resample('D').ffill()
-            
+            line_items = flatten_items(df)
+            df_daily = daily_demand_matrix(line_items)
+            count_items("preprocess", len(line_items), unit="line_items")
+
             logging.info(f"Data preprocessed successfully. Shape: {df_daily.shape}")
             return df_daily
         except Exception as e:
@@ -106,23 +164,9 @@ class DataLoader:
 
     def get_product_list(self):
         try:
-            url = f"{self.base_url}/products"
-            params = {"pageSize": 500}
-            
             all_products = []
-            page = 1
-            
-            while True:
-                params['page'] = page
-                response = requests.get(url, headers=self.headers, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                if not data['products']:
-                    break
-                
-                all_products.extend(data['products'])
-                page += 1
+            for products in self._fetch_pages("products", {"pageSize": 500}, 'products'):
+                all_products.extend(products)
 
             products = [product['sku'] for product in all_products if product['sku']]
             logging.info(f"Retrieved {len(products)} unique products")
@@ -131,26 +175,46 @@ class DataLoader:
             logging.error(f"Error getting product list: {str(e)}")
             raise
 
+    @timed_stage("demand_cube")
+    def get_demand_cube(self, start_date, end_date):
+        """DemandCube covering start_date..end_date, loaded once and then extended.
+
+        A later end_date only loads orders from the last loaded day onwards
+        (that day is dropped and reloaded, since it may have been partial);
+        an earlier start_date rebuilds the cube.
+        """
+        try:
+            if self._cube is None or start_date < self._cube_range[0]:
+                self._cube = DemandCube.from_orders(self._iter_order_pages(start_date, end_date))
+                self._cube_range = (start_date, end_date)
+                logging.info(f"Built demand cube: {self._cube.n_days} days x {len(self._cube.skus)} SKUs")
+            elif end_date > self._cube_range[1]:
+                resume = pd.Timestamp(self._cube_range[1]).normalize().to_pydatetime()
+                self._cube.truncate(resume)
+                self._cube.add_pages(self._iter_order_pages(resume, end_date))
+                self._cube_range = (self._cube_range[0], end_date)
+                logging.info(f"Extended demand cube from {resume:%Y-%m-%d} to {end_date}")
+            return self._cube
+        except Exception as e:
+            logging.error(f"Error loading demand cube: {str(e)}")
+            raise
+
     def get_daily_order_totals(self, start_date, end_date):
         try:
-            df = self.load_order_history(start_date, end_date)
-            df['createDate'] = pd.to_datetime(df['createDate'], errors='coerce')
-            daily_totals = df.groupby(df['createDate'].dt.date)['orderTotal'].sum().reset_index()
-            daily_totals.columns = ['order_date', 'total_amount']
+            daily = self.get_demand_cube(start_date, end_date).daily(start_date, end_date)
+            daily = daily[daily['orders'] > 0]
+            daily_totals = pd.DataFrame({'order_date': daily.index.date,
+                                         'total_amount': daily['order_total'].to_numpy()})
             logging.info(f"Retrieved daily order totals from {start_date} to {end_date}")
             return daily_totals
         except Exception as e:
             logging.error(f"Error getting daily order totals: {str(e)}")
             raise
 
-    def get_top_selling_skus(self, start_date, end_date, top_n=10):
+    def get_top_selling_skus(self, start_date, end_date, top_n=10, by='quantity'):
+        """Top SKUs by quantity (or revenue) with both sums; see DemandCube.top_skus."""
         try:
-            df = self.load_order_history(start_date, end_date)
-            df_items = df.explode('items')
-            df_items['sku'] = df_items['items'].apply(lambda x: x.get('sku') if isinstance(x, dict) else None)
-            df_items['quantity'] = df_items['items'].apply(lambda x: x.get('quantity', 0) if isinstance(x, dict) else 0)
-            
-            top_skus = df_items.groupby('sku')['quantity'].sum().nlargest(top_n).reset_index()
+            top_skus = self.get_demand_cube(start_date, end_date).top_skus(start_date, end_date, top_n, by)
             logging.info(f"Retrieved top {top_n} selling SKUs from {start_date} to {end_date}")
             return top_skus
         except Exception as e:
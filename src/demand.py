@@ -0,0 +1,247 @@
+import os
+import json
+import logging
+from collections import defaultdict
+from itertools import chain
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def _order_items(order):
+    items = order.get('items')
+    if isinstance(items, dict):
+        return [items]
+    if isinstance(items, list):
+        return items
+    return []
+
+
+def _quantity(value):
+    try:
+        quantity = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if quantity != quantity else quantity
+
+
+class DailyDemandAccumulator:
+    """Reduces order pages into running per-day, per-SKU quantities.
+
+    Pages are folded in as they arrive and can be discarded afterwards, so
+    memory grows with the number of (day, sku) pairs rather than with the
+    number of orders.
+    """
+
+    def __init__(self):
+        self.counts = defaultdict(lambda: defaultdict(float))
+        self.order_count = 0
+
+    def add_orders(self, orders):
+        for order in orders:
+            create_date = order.get('createDate')
+            if not create_date:
+                continue
+            day_counts = self.counts[str(create_date)[:10]]
+            for item in _order_items(order):
+                if not isinstance(item, dict) or item.get('sku') is None:
+                    continue
+                day_counts[item['sku']] += _quantity(item.get('quantity', 0))
+            self.order_count += 1
+
+    def to_frame(self):
+        """Return the wide daily matrix (days x SKUs) with missing days zero-filled."""
+        if not self.counts:
+            return pd.DataFrame(index=pd.DatetimeIndex([], name='createDate'))
+        df_daily = pd.DataFrame.from_dict(self.counts, orient='index').fillna(0)
+        df_daily.index = pd.to_datetime(df_daily.index)
+        df_daily = df_daily.sort_index().sort_index(axis=1)
+        df_daily = df_daily.asfreq('D', fill_value=0)
+        df_daily.index.name = 'createDate'
+        df_daily.columns.name = 'sku'
+        return df_daily
+
+    def to_sparse(self):
+        """Return the same demand as a SparseDemand, without building the wide frame."""
+        line_items = pd.DataFrame(
+            [(day, sku, quantity) for day, day_counts in self.counts.items() for sku, quantity in day_counts.items()],
+            columns=['createDate', 'sku', 'quantity']
+        )
+        line_items['createDate'] = pd.to_datetime(line_items['createDate'])
+        return SparseDemand.from_line_items(line_items)
+
+
+def flatten_items(df):
+    """One row per order line item: createDate, sku, quantity.
+
+    Items may be a dict, a list of dicts or missing; every line of a
+    multi-line order is kept.
+    """
+    items = df['items'].map(lambda x: [item for item in _order_items({'items': x}) if isinstance(item, dict)])
+    # int64 even for an empty frame, where map(len) yields float64.
+    counts = items.map(len).to_numpy(dtype=np.int64)
+
+    line_items = pd.DataFrame(list(chain.from_iterable(items)), columns=['sku', 'quantity'])
+    line_items.insert(0, 'createDate', np.repeat(pd.to_datetime(df['createDate'], errors='coerce').to_numpy(), counts))
+    line_items['quantity'] = pd.to_numeric(line_items['quantity'], errors='coerce').fillna(0).astype(float)
+    return line_items.dropna(subset=['createDate', 'sku'])
+
+
+def daily_demand_matrix(line_items):
+    """Sum line items into a days x SKUs matrix with missing days zero-filled."""
+    if line_items.empty:
+        return pd.DataFrame(index=pd.DatetimeIndex([], name='createDate'))
+    days = line_items['createDate'].dt.normalize()
+    df_daily = line_items.groupby([days, 'sku'])['quantity'].sum().unstack(fill_value=0)
+    df_daily = df_daily.asfreq('D', fill_value=0)
+    df_daily.index.name = 'createDate'
+    df_daily.columns.name = 'sku'
+    return df_daily
+
+
+class SparseDemand:
+    """Daily demand as int32 nonzeros grouped by SKU (CSR: one row per SKU).
+
+    ``day`` holds day offsets from ``start`` and ``quantity`` the demand on
+    that day, both sorted by (sku, day); SKU ``i`` owns the slice
+    ``indptr[i]:indptr[i + 1]``. Memory grows with the number of nonzero
+    (day, sku) pairs instead of days x SKUs. Per-SKU access returns views,
+    and dense frames are only built on request.
+
+    Supports the subset of the wide DataFrame interface the forecasters use:
+    ``index``, ``columns``, ``demand[sku]`` (a dense Series) and
+    ``demand[[skus]]`` (a dense wide frame). ``save`` writes plain .npy files
+    that ``load`` memory-maps, and a memory-mapped store pickles as its path,
+    so worker processes share one on-disk copy.
+    """
+
+    def __init__(self, skus, start, n_days, indptr, day, quantity, path=None):
+        self.skus = np.asarray(skus)
+        self.start = np.datetime64(start, 'D')
+        self.n_days = int(n_days)
+        self.indptr = indptr
+        self.day = day
+        self.quantity = quantity
+        self.path = path
+        self._positions = {sku: i for i, sku in enumerate(self.skus.tolist())}
+
+    @classmethod
+    def from_line_items(cls, line_items):
+        """Build from flatten_items output; quantities are rounded to integers."""
+        days = line_items['createDate'].to_numpy(dtype='datetime64[D]')
+        if len(days) == 0:
+            return cls([], np.datetime64('1970-01-01'), 0, np.zeros(1, np.int64),
+                       np.zeros(0, np.int32), np.zeros(0, np.int32))
+        start = days.min()
+        codes, skus = pd.factorize(line_items['sku'].astype(str), sort=True)
+        offsets = (days - start).astype(np.int64)
+        return cls._from_codes(skus.to_numpy(), start, int(offsets.max()) + 1, codes, offsets,
+                               line_items['quantity'].to_numpy(dtype=float))
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build from a wide days x SKUs frame with a daily index."""
+        values = df.to_numpy()
+        values = np.nan_to_num(values.astype(float))
+        day, sku = np.nonzero(values)
+        start = df.index[0] if len(df.index) else np.datetime64('1970-01-01')
+        return cls._from_codes(df.columns.astype(str).to_numpy(), start, len(df.index), sku, day, values[day, sku])
+
+    @classmethod
+    def _from_codes(cls, skus, start, n_days, codes, offsets, quantities):
+        keys = codes.astype(np.int64) * n_days + offsets
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        totals = np.rint(np.bincount(inverse, weights=quantities)).astype(np.int32)
+        keep = totals != 0
+        unique_keys, totals = unique_keys[keep], totals[keep]
+        sku_codes = unique_keys // n_days
+        indptr = np.zeros(len(skus) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sku_codes, minlength=len(skus)), out=indptr[1:])
+        return cls(skus, start, n_days, indptr, (unique_keys % n_days).astype(np.int32), totals)
+
+    @property
+    def index(self):
+        return pd.date_range(pd.Timestamp(self.start).as_unit('ns'), periods=self.n_days, freq='D', name='createDate')
+
+    @property
+    def columns(self):
+        return pd.Index(self.skus, name='sku')
+
+    @property
+    def shape(self):
+        return (self.n_days, len(self.skus))
+
+    @property
+    def nbytes(self):
+        return self.indptr.nbytes + self.day.nbytes + self.quantity.nbytes
+
+    def __contains__(self, sku):
+        return sku in self._positions
+
+    def nonzero(self, sku):
+        """(day offsets, quantities) of one SKU's nonzero days, as views."""
+        position = self._positions[sku]
+        lo, hi = self.indptr[position], self.indptr[position + 1]
+        return self.day[lo:hi], self.quantity[lo:hi]
+
+    def dense(self, sku, dtype=np.float64):
+        values = np.zeros(self.n_days, dtype=dtype)
+        day, quantity = self.nonzero(sku)
+        values[day] = quantity
+        return values
+
+    def __getitem__(self, key):
+        if isinstance(key, (list, tuple, pd.Index, np.ndarray)):
+            return self.to_frame(key)
+        return pd.Series(self.dense(key), index=self.index, name=key)
+
+    def to_frame(self, skus=None):
+        """Densify into the wide days x SKUs float frame daily_demand_matrix returns."""
+        skus = self.skus if skus is None else np.asarray(skus)
+        values = np.zeros((self.n_days, len(skus)))
+        for column, sku in enumerate(skus):
+            day, quantity = self.nonzero(sku)
+            values[day, column] = quantity
+        return pd.DataFrame(values, index=self.index, columns=pd.Index(skus, name='sku'))
+
+    def prophet_frame(self, sku):
+        """ds/y frame for one SKU, as SKUForecaster.prepare_data returns."""
+        return pd.DataFrame({'ds': self.index, 'y': self.dense(sku)})
+
+    def active_days(self):
+        """Number of nonzero days per SKU, aligned with ``skus``."""
+        return np.diff(self.indptr)
+
+    def first_days(self):
+        """Day offset of each SKU's first nonzero day (``n_days`` for SKUs with none), aligned with ``skus``."""
+        first = np.full(len(self.skus), self.n_days, dtype=np.int64)
+        active = self.active_days() > 0
+        first[active] = self.day[self.indptr[:-1][active]]
+        return first
+
+    def save(self, path):
+        """Write the arrays as .npy files in directory path."""
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'skus.npy'), self.skus.astype(str))
+        np.save(os.path.join(path, 'indptr.npy'), self.indptr)
+        np.save(os.path.join(path, 'day.npy'), self.day)
+        np.save(os.path.join(path, 'quantity.npy'), self.quantity)
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump({'start': str(self.start), 'n_days': self.n_days}, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        mode = 'r' if mmap else None
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        return cls(np.load(os.path.join(path, 'skus.npy')), meta['start'], meta['n_days'],
+                   np.load(os.path.join(path, 'indptr.npy'), mmap_mode=mode),
+                   np.load(os.path.join(path, 'day.npy'), mmap_mode=mode),
+                   np.load(os.path.join(path, 'quantity.npy'), mmap_mode=mode),
+                   path=path if mmap else None)
+
+    def __reduce__(self):
+        if self.path is not None:
+            return (SparseDemand.load, (self.path,))
+        return (SparseDemand, (self.skus, self.start, self.n_days, self.indptr, self.day, self.quantity))
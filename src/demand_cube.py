@@ -0,0 +1,205 @@
+import logging
+from itertools import chain
+import numpy as np
+import pandas as pd
+from demand import _order_items, _quantity
+
+logger = logging.getLogger(__name__)
+
+SKU_FIELDS = ('quantity', 'revenue')
+DAY_FIELDS = ('quantity', 'revenue', 'order_total', 'orders')
+
+
+def _day(value):
+    return np.datetime64(pd.Timestamp(value).normalize().date(), 'D')
+
+
+class DemandCube:
+    """Per-day, per-SKU quantity and revenue held as prefix sums over days.
+
+    ``cumulative[field][d, s]`` is the sum of field for SKU s over the
+    first d days, so any date range reduces to one row subtraction: range
+    totals per SKU cost O(n_skus) and catalog-wide daily figures (which
+    keep their own prefix sums, including order totals and order counts)
+    cost O(1). Orders can be added at any time; days after the current
+    end are appended, and orders for days already covered are folded into
+    every later prefix row.
+
+    Revenue is quantity x unitPrice per line item; ``order_total`` is the
+    order-level orderTotal (including shipping and tax) used for daily
+    totals.
+    """
+
+    def __init__(self):
+        self.start = None
+        self.skus = pd.Index([], name='sku')
+        self.cumulative = {field: np.zeros((1, 0)) for field in SKU_FIELDS}
+        self.day_cumulative = np.zeros((1, len(DAY_FIELDS)))
+
+    @classmethod
+    def from_orders(cls, pages):
+        """Build from an iterable of order pages (lists of ShipStation order dicts).
+
+        Pages are parsed as they arrive and folded in with one cumulative
+        pass at the end, since unsorted pages would each touch every day.
+        """
+        cube = cls()
+        cube.add_pages(pages)
+        return cube
+
+    @property
+    def n_days(self):
+        return len(self.day_cumulative) - 1
+
+    @property
+    def end(self):
+        """Last covered day, or None for an empty cube."""
+        return None if self.start is None else self.start + np.timedelta64(self.n_days - 1, 'D')
+
+    @property
+    def index(self):
+        if self.start is None:
+            return pd.DatetimeIndex([], name='createDate')
+        return pd.date_range(pd.Timestamp(self.start), periods=self.n_days, freq='D', name='createDate')
+
+    @property
+    def nbytes(self):
+        return sum(values.nbytes for values in self.cumulative.values()) + self.day_cumulative.nbytes
+
+    def _resize(self, start, end, skus):
+        # Prefix rows before the old start are zero; rows past the old end
+        # repeat the last prefix row; new SKUs start at zero.
+        before = 0 if self.start is None else int((self.start - start) // np.timedelta64(1, 'D'))
+        n_days = int((end - start) // np.timedelta64(1, 'D')) + 1
+        after = n_days - before - self.n_days
+        new_skus = pd.Index(skus).difference(self.skus)
+        if before == 0 and after == 0 and new_skus.empty:
+            return
+
+        def pad(values):
+            rows = [np.zeros((before,) + values.shape[1:]), values, np.repeat(values[-1:], after, axis=0)]
+            return np.concatenate(rows)
+
+        for field, values in self.cumulative.items():
+            values = np.concatenate([values, np.zeros((len(values), len(new_skus)))], axis=1)
+            self.cumulative[field] = pad(values)
+        self.day_cumulative = pad(self.day_cumulative)
+        self.skus = self.skus.append(pd.Index(new_skus, name='sku'))
+        self.start = start
+
+    @staticmethod
+    def _parse(orders):
+        item_days, item_skus, quantities, revenues = [], [], [], []
+        order_days, order_totals = [], []
+        for order in orders:
+            create_date = order.get('createDate')
+            if not create_date:
+                continue
+            day = str(create_date)[:10]
+            order_days.append(day)
+            order_totals.append(_quantity(order.get('orderTotal', 0)))
+            for item in _order_items(order):
+                if not isinstance(item, dict) or item.get('sku') is None:
+                    continue
+                quantity = _quantity(item.get('quantity', 0))
+                item_days.append(day)
+                item_skus.append(item['sku'])
+                quantities.append(quantity)
+                revenues.append(quantity * _quantity(item.get('unitPrice', 0)))
+        return item_days, item_skus, quantities, revenues, order_days, order_totals
+
+    def add_orders(self, orders):
+        """Fold a page of orders into the cube."""
+        self._add(*self._parse(orders))
+
+    def add_pages(self, pages):
+        """Fold several pages of orders in with a single cumulative pass."""
+        parsed = [self._parse(orders) for orders in pages]
+        if parsed:
+            self._add(*(list(chain.from_iterable(part)) for part in zip(*parsed)))
+
+    def _add(self, item_days, item_skus, quantities, revenues, order_days, order_totals):
+        if not order_days:
+            return
+        order_days = np.array(order_days, dtype='datetime64[D]')
+        item_days = np.array(item_days, dtype='datetime64[D]')
+        first, last = order_days.min(), order_days.max()
+        if self.start is not None:
+            first, last = min(first, self.start), max(last, self.end)
+        self._resize(first, last, pd.unique(np.asarray(item_skus, dtype=object)))
+
+        # Daily deltas over the touched span, then cumulated into every later prefix row.
+        offset = int((order_days.min() - self.start) // np.timedelta64(1, 'D'))
+        span = int((order_days.max() - self.start) // np.timedelta64(1, 'D')) - offset + 1
+        order_rows = (order_days - self.start).astype(np.int64) - offset
+        item_rows = (item_days - self.start).astype(np.int64) - offset
+        columns = self.skus.get_indexer(item_skus)
+        for field, values in zip(SKU_FIELDS, (quantities, revenues)):
+            delta = np.zeros((span, len(self.skus)))
+            np.add.at(delta, (item_rows, columns), values)
+            self._accumulate(self.cumulative[field], offset, delta)
+        delta = np.zeros((span, len(DAY_FIELDS)))
+        np.add.at(delta[:, 0], item_rows, quantities)
+        np.add.at(delta[:, 1], item_rows, revenues)
+        np.add.at(delta[:, 2], order_rows, order_totals)
+        np.add.at(delta[:, 3], order_rows, 1)
+        self._accumulate(self.day_cumulative, offset, delta)
+
+    @staticmethod
+    def _accumulate(cumulative, offset, delta):
+        running = np.cumsum(delta, axis=0)
+        cumulative[offset + 1:offset + 1 + len(delta)] += running
+        cumulative[offset + 1 + len(delta):] += running[-1]
+
+    def truncate(self, day):
+        """Drop ``day`` and everything after it, e.g. to reload a partially loaded day."""
+        if self.start is None:
+            return
+        keep = int((_day(day) - self.start) // np.timedelta64(1, 'D'))
+        keep = min(max(keep, 0), self.n_days)
+        for field, values in self.cumulative.items():
+            self.cumulative[field] = values[:keep + 1].copy()
+        self.day_cumulative = self.day_cumulative[:keep + 1].copy()
+        if keep == 0:
+            self.start = None
+
+    def _rows(self, start_date=None, end_date=None):
+        """Prefix-row bounds (lo, hi) for the inclusive day range, clipped to the cube."""
+        if self.start is None:
+            return 0, 0
+        lo = 0 if start_date is None else int((_day(start_date) - self.start) // np.timedelta64(1, 'D'))
+        hi = self.n_days if end_date is None else int((_day(end_date) - self.start) // np.timedelta64(1, 'D')) + 1
+        lo, hi = min(max(lo, 0), self.n_days), min(max(hi, 0), self.n_days)
+        return lo, max(lo, hi)
+
+    def totals(self, start_date=None, end_date=None):
+        """Catalog-wide quantity, revenue, order total and order count for the range."""
+        lo, hi = self._rows(start_date, end_date)
+        return dict(zip(DAY_FIELDS, (self.day_cumulative[hi] - self.day_cumulative[lo]).tolist()))
+
+    def daily(self, start_date=None, end_date=None):
+        """Per-day catalog totals (days x DAY_FIELDS) for the range."""
+        lo, hi = self._rows(start_date, end_date)
+        return pd.DataFrame(np.diff(self.day_cumulative[lo:hi + 1], axis=0), index=self.index[lo:hi],
+                            columns=list(DAY_FIELDS))
+
+    def sku_totals(self, start_date=None, end_date=None, field='quantity'):
+        """Per-SKU sum of field over the range."""
+        lo, hi = self._rows(start_date, end_date)
+        values = self.cumulative[field]
+        return pd.Series(values[hi] - values[lo], index=self.skus, name=field)
+
+    def top_skus(self, start_date=None, end_date=None, top_n=10, by='quantity'):
+        """The top_n SKUs by quantity or revenue over the range, with both sums."""
+        lo, hi = self._rows(start_date, end_date)
+        sums = {field: self.cumulative[field][hi] - self.cumulative[field][lo] for field in SKU_FIELDS}
+        ranked = sums[by]
+        top = np.argpartition(-ranked, top_n)[:top_n] if top_n < len(ranked) else np.arange(len(ranked))
+        top = top[np.lexsort((top, -ranked[top]))]
+        return pd.DataFrame({'sku': self.skus[top], **{field: sums[field][top] for field in SKU_FIELDS}})
+
+    def history(self, sku, start_date=None, end_date=None, field='quantity'):
+        """Daily values of field for one SKU over the range."""
+        lo, hi = self._rows(start_date, end_date)
+        column = self.cumulative[field][lo:hi + 1, self.skus.get_loc(sku)]
+        return pd.Series(np.diff(column), index=self.index[lo:hi], name=sku)
@@ -0,0 +1,180 @@
+import time
+import logging
+import threading
+import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from metrics import observe_stage, stage_timer, count_items, in_context, SHIPSTATION_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """Shares ShipStation's X-Rate-Limit-* budget between worker threads.
+
+    Every request takes one unit of the remaining budget before it is sent, so
+    parallel workers never overshoot the window; when the budget is spent,
+    callers sleep until the reset time reported by the last response and the
+    budget is refilled to the last-known window limit. Within a window a
+    reported budget (less the requests still in flight, which the server
+    may not have counted yet) only ever lowers the local one, since
+    responses can arrive out of order.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.limit = None
+        self.window = 0.0
+        self.remaining = None
+        self.reset_at = 0.0
+        self.in_flight = 0
+
+    def acquire(self):
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if self.remaining is None or self.remaining > 0:
+                    if self.remaining is not None:
+                        self.remaining -= 1
+                    self.in_flight += 1
+                    return waited
+                if now >= self.reset_at:
+                    # The window has rolled over; until a response reports the new
+                    # budget, assume the full limit and length of the last window.
+                    self.remaining = self.limit
+                    self.reset_at = now + self.window
+                    continue
+                delay = self.reset_at - now
+            logger.info(f"Rate limit reached, waiting {delay:.1f}s")
+            time.sleep(delay)
+            waited += delay
+
+    def release(self):
+        """Mark a request acquired earlier as answered (or failed without a response)."""
+        with self._lock:
+            self.in_flight = max(self.in_flight - 1, 0)
+
+    def update(self, headers):
+        limit = headers.get('X-Rate-Limit-Limit')
+        remaining = headers.get('X-Rate-Limit-Remaining')
+        reset = headers.get('X-Rate-Limit-Reset')
+        if remaining is None or reset is None:
+            return
+        with self._lock:
+            if limit is not None:
+                self.limit = int(limit)
+            elif self.limit is None or int(remaining) >= self.limit:
+                self.limit = int(remaining) + 1
+            reported = max(int(remaining) - self.in_flight, 0)
+            self.remaining = reported if self.remaining is None else min(self.remaining, reported)
+            self.window = max(self.window, float(reset))
+            self.reset_at = time.monotonic() + int(reset)
+
+    def block(self, seconds):
+        with self._lock:
+            self.remaining = 0
+            self.reset_at = max(self.reset_at, time.monotonic() + seconds)
+
+
+class PageFetcher:
+    """Paginated ShipStation GETs over a pooled session.
+
+    The first page is fetched on its own to learn ``pages``; the rest are
+    requested in parallel and yielded back in page order. 429 and 5xx
+    responses are retried with exponential backoff.
+    """
+
+    def __init__(self, base_url, headers, max_workers=4, max_retries=5, backoff=1.0, timeout=60):
+        self.base_url = base_url
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.rate_limiter = RateLimiter()
+
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def get(self, endpoint, params):
+        url = f"{self.base_url}/{endpoint}"
+        for attempt in range(self.max_retries + 1):
+            observe_stage("shipstation_rate_limit_wait", self.rate_limiter.acquire())
+            try:
+                with stage_timer("shipstation_request"):
+                    response = self.session.get(url, params=params, timeout=self.timeout)
+            finally:
+                self.rate_limiter.release()
+            SHIPSTATION_REQUESTS.inc(endpoint=endpoint, status=response.status_code)
+            self.rate_limiter.update(response.headers)
+
+            if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                response.raise_for_status()
+                return response.json()
+
+            if response.status_code == 429:
+                delay = float(response.headers.get('X-Rate-Limit-Reset', self.backoff * 2 ** attempt))
+                self.rate_limiter.block(delay)
+            else:
+                delay = self.backoff * 2 ** attempt
+                with stage_timer("shipstation_backoff"):
+                    time.sleep(delay)
+            logger.warning(f"{endpoint} page {params.get('page')} returned {response.status_code}, "
+                           f"retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+
+    def iter_pages(self, endpoint, params, key):
+        """Yield each page's records in page order.
+
+        At most ``2 * max_workers`` pages are requested ahead of the
+        consumer, and nothing here holds on to a page once it has been
+        yielded, so memory stays bounded however many pages there are.
+        """
+        params = dict(params)
+        first = self.get(endpoint, dict(params, page=1))
+        records, pages = first[key], first.get('pages')
+        del first
+        if not records:
+            return
+        count_items("shipstation_pages", 1, unit="pages")
+        yield records
+        del records
+
+        if pages is None:
+            # No page count in the response: walk pages until an empty one.
+            page = 2
+            while True:
+                records = self.get(endpoint, dict(params, page=page))[key]
+                if not records:
+                    return
+                count_items("shipstation_pages", 1, unit="pages")
+                yield records
+                del records
+                page += 1
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = deque()
+            next_page = 2
+            try:
+                while in_flight or next_page <= pages:
+                    while next_page <= pages and len(in_flight) < 2 * self.max_workers:
+                        # Each page runs in a copy of this context so per-request profiles see it.
+                        in_flight.append(executor.submit(in_context(self.get), endpoint,
+                                                         dict(params, page=next_page)))
+                        next_page += 1
+                    records = in_flight.popleft().result()[key]
+                    if records:
+                        count_items("shipstation_pages", 1, unit="pages")
+                        yield records
+                    del records
+            finally:
+                for future in in_flight:
+                    future.cancel()
+
+    def close(self):
+        self.session.close()
@@ -1,52 +1,298 @@
+import os
+import logging
 import pandas as pd
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import prophet
 from prophet import Prophet
 from prophet.diagnostics import cross_validation, performance_metrics
+from prophet.serialize import model_to_json, model_from_json
 from tqdm import tqdm
+from cache import get_forecast_cache, forecast_key
+from reorder import ForecastArrays, reorder_plan, INTERVAL_WIDTH
+from anomaly import AnomalyDetector, ANOMALY_COLUMNS, wide_forecasts
+from metrics import stage_timer, timed_stage, count_items
+from demand import SparseDemand
+from scenarios import simulate_scenarios
+from stat_engines import ENGINES as STAT_ENGINES, demand_array, route_engines, forecast_frames
+
+logger = logging.getLogger(__name__)
+
+MODEL_VERSION = f"prophet-{prophet.__version__}-daily"
+
+def warm_start_params(model):
+    """Fitted parameters of a Prophet model in the form Prophet.fit(init=...) takes."""
+    params = {}
+    for name in ['k', 'm', 'sigma_obs']:
+        params[name] = float(np.mean(model.params[name]))
+    for name in ['delta', 'beta']:
+        params[name] = np.mean(model.params[name], axis=0)
+    return params
+
+@timed_stage("prophet_fit")
+def _fit_prophet(df, init=None):
+    # init warm-starts the optimizer from a previous fit's parameters.
+    if init is not None:
+        try:
+            return Prophet(daily_seasonality=True).fit(df, init=init)
+        except Exception as e:
+            # Parameters Prophet cannot read as a starting point. (Arrays shaped
+            # for a different changepoint or seasonality count do not raise;
+            # Prophet swaps them for its default inits.)
+            logger.warning(f"Warm start failed, fitting from scratch: {str(e)}")
+    return Prophet(daily_seasonality=True).fit(df)
+
+def _prepared_prophet(df):
+    # Set up on df's history without fitting. prophet.diagnostics refits a
+    # copy per cutoff and only needs the history and model settings.
+    model = Prophet(daily_seasonality=True)
+    model.preprocess(df)
+    return model
+
+def _fit_sku(sku, df, forecast_periods=None, init=None):
+    # Runs in a worker process. Prophet models are returned as JSON because
+    # the Stan backend does not pickle reliably.
+    model = _fit_prophet(df, init)
+    forecast = None
+    if forecast_periods is not None:
+        future = model.make_future_dataframe(periods=forecast_periods)
+        forecast = model.predict(future)
+    return sku, model_to_json(model), forecast
+
+def _forecast_sku(sku, model_json, forecast_periods):
+    model = model_from_json(model_json)
+    future = model.make_future_dataframe(periods=forecast_periods)
+    return sku, None, model.predict(future)
 
 class SKUForecaster:
-    def __init__(self, data, forecast_periods=30):
+    def __init__(self, data, forecast_periods=30, n_jobs=1, min_history=14, cache=None, engine='prophet',
+                 route_tolerance=0.1, route_max_error=None):
+        if engine not in ('prophet', 'auto') and engine not in STAT_ENGINES:
+            raise ValueError(f"Unknown engine {engine!r}; expected 'prophet', 'auto' or one of {list(STAT_ENGINES)}")
         self.data = data
         self.forecast_periods = forecast_periods
+        # n_jobs > 1 fits/forecasts SKUs in a process pool; None uses every core.
+        self.n_jobs = n_jobs or os.cpu_count()
+        self.min_history = min_history
         self.models = {}
         self.forecasts = {}
         self.cv_results = {}
         self.performance_metrics = {}
+        self.skipped = {}
+        self.failed = {}
+        # How each model in self.models was obtained: 'refit', 'update' (warm
+        # start) or 'current' (previous fit reused, no new data).
+        self.fit_modes = {}
+        self.cache = cache or get_forecast_cache()
+        # 'prophet', a statistical engine from stat_engines.ENGINES applied to
+        # every SKU, or 'auto' to route each SKU by holdout error (SKUs whose
+        # best error exceeds route_max_error go to Prophet).
+        self.engine = engine
+        self.route_tolerance = route_tolerance
+        self.route_max_error = route_max_error
+        # SKU -> engine that produced its forecast, for statistical forecasts.
+        self.engines = {}
 
     def prepare_data(self, sku):
+        if isinstance(self.data, SparseDemand):
+            # Densify just this SKU rather than slicing a wide frame.
+            return self.data.prophet_frame(sku)
         df = self.data[[sku]].reset_index()
         df.columns = ['ds', 'y']
         return df
 
-    def train_models(self):
-        for sku in tqdm(self.data.columns, desc="Training models"):
-            df = self.prepare_data(sku)
-            model = Prophet(daily_seasonality=True)
-            model.fit(df)
-            self.models[sku] = model
+    def _cache_key(self, sku):
+        # The series fingerprint stands in for a data watermark: any change to
+        # the SKU's history yields a new key.
+        series = self.data[sku]
+        fingerprint = int(pd.util.hash_pandas_object(series, index=True).sum())
+        watermark = f"{series.index[-1]:%Y-%m-%d}:{fingerprint:x}"
+        return forecast_key(sku, self.forecast_periods, MODEL_VERSION, watermark)
 
-    def make_forecasts(self):
-        for sku, model in tqdm(self.models.items(), desc="Making forecasts"):
-            future = model.make_future_dataframe(periods=self.forecast_periods)
-            forecast = model.predict(future)
+    def _cached_forecast(self, sku):
+        forecast = self.cache.get(self._cache_key(sku))
+        if forecast is not None:
             self.forecasts[sku] = forecast
+        return forecast
+
+    def _store_forecast(self, sku, forecast):
+        self.forecasts[sku] = forecast
+        self.cache.put(self._cache_key(sku), forecast)
+
+    def trainable_skus(self):
+        """SKUs worth a Prophet fit; the rest are recorded in self.skipped.
+
+        History counts the days since a SKU's first demand: on a zero-filled
+        grid every SKU spans the whole window, including SKUs launched days ago.
+        """
+        if isinstance(self.data, SparseDemand):
+            history = pd.Series(self.data.n_days - self.data.first_days(), index=self.data.columns)
+            has_demand = pd.Series(self.data.active_days() > 0, index=self.data.columns)
+        else:
+            started = self.data.fillna(0).ne(0).cummax()
+            history = self.data.where(started).notna().sum()
+            has_demand = started.iloc[-1] if len(self.data.index) else started.any()
+        for sku in self.data.columns[~has_demand]:
+            self.skipped[sku] = "no demand"
+        for sku in self.data.columns[has_demand & (history < self.min_history)]:
+            self.skipped[sku] = f"fewer than {self.min_history} days of history"
+        return list(self.data.columns[has_demand & (history >= self.min_history)])
+
+    @timed_stage("stat_forecast")
+    def _forecast_statistical(self, skus):
+        """Forecast skus with the vectorized engines; returns the SKUs left for Prophet.
+
+        Statistical forecasts are cheaper to recompute than to look up, so
+        they bypass the forecast cache and cover only the future days.
+        """
+        if self.engine == 'prophet' or not skus:
+            return skus
+        Y = demand_array(self.data, skus)
+        skus = np.asarray(skus, dtype=object)
+        if self.engine == 'auto' and Y.shape[1] <= self.forecast_periods:
+            # Too short to hold out a horizon for the backtest.
+            logger.info(f"{Y.shape[1]} days of history cannot be routed over a {self.forecast_periods}-day "
+                        f"horizon; sending {len(skus)} SKUs to Prophet")
+            return list(skus)
+        if self.engine == 'auto':
+            choice, _ = route_engines(Y, self.forecast_periods, tolerance=self.route_tolerance,
+                                      max_error=self.route_max_error)
+        else:
+            choice = np.full(len(skus), self.engine, dtype=object)
+        last_date = self.data.index[-1]
+        for name in pd.unique(choice):
+            if name == 'prophet':
+                continue
+            selected = choice == name
+            try:
+                yhat, yhat_lower, yhat_upper = STAT_ENGINES[name](Y[selected], self.forecast_periods)
+            except ValueError as e:
+                logger.error(f"Engine {name} failed for {int(selected.sum())} SKUs: {str(e)}")
+                self.failed.update(dict.fromkeys(skus[selected], str(e)))
+                continue
+            self.forecasts.update(forecast_frames(skus[selected], last_date, yhat, yhat_lower, yhat_upper))
+            self.engines.update(dict.fromkeys(skus[selected], name))
+            count_items("stat_forecast", int(selected.sum()), unit=name)
+        return list(skus[choice == 'prophet'])
+
+    def _run_parallel(self, func, jobs, desc):
+        with ProcessPoolExecutor(max_workers=self.n_jobs) as executor:
+            futures = {executor.submit(func, *job): job[0] for job in jobs}
+            for future in tqdm(as_completed(futures), total=len(futures), desc=desc):
+                sku = futures[future]
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.error(f"{desc} failed for SKU {sku}: {str(e)}")
+                    self.failed[sku] = str(e)
+
+    def _collect(self, results):
+        for sku, model_json, forecast in results:
+            if model_json is not None:
+                self.models[sku] = model_from_json(model_json)
+            if forecast is not None:
+                self._store_forecast(sku, forecast)
+
+    @timed_stage("prophet_train")
+    def train_models(self, previous=None, policy=None):
+        """Fit every trainable SKU.
+
+        previous maps SKU -> RegistryEntry of an earlier fit (Prophet model
+        plus metadata). With a policy (registry.RefitPolicy), SKUs with a
+        previous fit are warm-started from its parameters unless the policy
+        asks for a full refit; SKUs with no new data keep the previous model.
+        SKUs handled by a statistical engine are forecast here and not fitted.
+        """
+        previous = previous or {}
+        jobs = []
+        for sku in self._forecast_statistical(self.trainable_skus()):
+            entry = previous.get(sku) if policy is not None else None
+            init = None
+            if entry is not None:
+                data_end = self.data[sku].dropna().index[-1]
+                new_days = (data_end - entry.model.history['ds'].max()).days
+                if new_days <= 0:
+                    self.models[sku] = entry.model
+                    self.fit_modes[sku] = 'current'
+                    continue
+                reason = policy.refit_reason(entry.metadata, new_days)
+                if reason is None:
+                    init = warm_start_params(entry.model)
+                else:
+                    logger.info(f"Full refit for SKU {sku}: {reason}")
+            self.fit_modes[sku] = 'refit' if init is None else 'update'
+            jobs.append((sku, self.prepare_data(sku), None, init))
+        count_items("prophet_train", len(jobs), unit="skus")
+        if self.n_jobs > 1:
+            self._collect(self._run_parallel(_fit_sku, jobs, "Training models"))
+            return
+        for sku, df, _, init in tqdm(jobs, desc="Training models"):
+            try:
+                self.models[sku] = _fit_prophet(df, init)
+            except Exception as e:
+                logger.error(f"Training failed for SKU {sku}: {str(e)}")
+                self.failed[sku] = str(e)
+
+    @timed_stage("prophet_forecast")
+    def make_forecasts(self):
+        pending = {sku: model for sku, model in self.models.items() if self._cached_forecast(sku) is None}
+        count_items("prophet_forecast", len(pending), unit="skus")
+        if self.n_jobs > 1:
+            jobs = [(sku, model_to_json(model), self.forecast_periods) for sku, model in pending.items()]
+            self._collect(self._run_parallel(_forecast_sku, jobs, "Making forecasts"))
+            return
+        for sku, model in tqdm(pending.items(), desc="Making forecasts"):
+            try:
+                with stage_timer("prophet_predict"):
+                    future = model.make_future_dataframe(periods=self.forecast_periods)
+                    forecast = model.predict(future)
+                self._store_forecast(sku, forecast)
+            except Exception as e:
+                logger.error(f"Forecast failed for SKU {sku}: {str(e)}")
+                self.failed[sku] = str(e)
+
+    @timed_stage("prophet_train_and_forecast")
+    def train_and_forecast(self):
+        """Fit and forecast in one pass, so parallel workers ship each SKU only once.
+
+        SKUs whose forecast is already cached for the current data are served
+        from the cache and not fitted, so they will not appear in self.models;
+        neither will SKUs forecast by a statistical engine.
+        """
+        skus = self._forecast_statistical(self.trainable_skus())
+        skus = [sku for sku in skus if self._cached_forecast(sku) is None]
+        count_items("prophet_train_and_forecast", len(skus), unit="skus")
+        if self.n_jobs == 1:
+            for sku in tqdm(skus, desc="Training and forecasting"):
+                try:
+                    model = _fit_prophet(self.prepare_data(sku))
+                    self.models[sku] = model
+                    with stage_timer("prophet_predict"):
+                        future = model.make_future_dataframe(periods=self.forecast_periods)
+                        forecast = model.predict(future)
+                    self._store_forecast(sku, forecast)
+                except Exception as e:
+                    logger.error(f"Training failed for SKU {sku}: {str(e)}")
+                    self.failed[sku] = str(e)
+            return
+        jobs = [(sku, self.prepare_data(sku), self.forecast_periods) for sku in skus]
+        self._collect(self._run_parallel(_fit_sku, jobs, "Training and forecasting"))
 
     def get_forecast(self, sku):
-        if sku in self.forecasts:
+        if sku in self.forecasts or (sku in self.data.columns and self._cached_forecast(sku) is not None):
             return self.forecasts[sku][['ds', 'yhat', 'yhat_lower', 'yhat_upper']]
         else:
             return None
 
-    def get_purchase_recommendations(self, current_stock):
-        recommendations = {}
-        for sku, forecast in self.forecasts.items():
-            last_30_days = forecast['yhat'].tail(30).sum()
-            if sku in current_stock:
-                needed = max(0, last_30_days - current_stock[sku])
-                recommendations[sku] = needed
-            else:
-                recommendations[sku] = last_30_days
-        return recommendations
+    def forecast_arrays(self):
+        """Future rows of every forecast stacked into (n_skus, forecast_periods) arrays."""
+        return ForecastArrays.from_forecasts(self.forecasts, self.forecast_periods)
+
+    def get_purchase_recommendations(self, current_stock, lead_time=7, review_period=7, service_level=0.95):
+        """Reorder plan for every forecast SKU; see reorder.reorder_plan."""
+        return reorder_plan(self.forecast_arrays(), current_stock, lead_time=lead_time,
+                            review_period=review_period, service_level=service_level,
+                            interval_width=INTERVAL_WIDTH)
 
     def get_seasonal_components(self, sku):
         if sku in self.models:
@@ -55,10 +301,13 @@ class SKUForecaster:
         else:
             return None
 
-    def perform_cross_validation(self, sku, initial='365 days', period='30 days', horizon='90 days'):
+    def perform_cross_validation(self, sku, initial='365 days', period='30 days', horizon='90 days',
+                                 cutoffs=None, parallel=None):
+        # cutoffs pins the evaluation dates (shared across SKUs by the backtest
+        # runner); parallel is passed to Prophet to run cutoffs concurrently.
         if sku in self.models:
-            df = self.prepare_data(sku)
-            cv_results = cross_validation(self.models[sku], initial=initial, period=period, horizon=horizon)
+            cv_results = cross_validation(self.models[sku], initial=initial, period=period, horizon=horizon,
+                                          cutoffs=cutoffs, parallel=parallel, disable_tqdm=True)
             self.cv_results[sku] = cv_results
             metrics = performance_metrics(cv_results)
             self.performance_metrics[sku] = metrics
@@ -68,17 +317,30 @@ class SKUForecaster:
 
     def detect_anomalies(self, sku, threshold=0.05):
         if sku in self.forecasts:
-            forecast = self.forecasts[sku]
-            observed = self.prepare_data(sku)
-            merged = forecast.merge(observed, on='ds', how='left')
-            merged['error'] = merged['y'] - merged['yhat']
-            merged['uncertainty'] = merged['yhat_upper'] - merged['yhat_lower']
-            merged['normalized_error'] = merged['error'] / merged['uncertainty']
-            anomalies = merged[abs(merged['normalized_error']) > threshold]
-            return anomalies
+            anomalies = self.detect_all_anomalies(threshold, skus=[sku])
+            return anomalies.drop(columns=['sku', 'zscore'])
         else:
             return None
 
+    def detect_all_anomalies(self, threshold=0.05, skus=None):
+        """Anomalies for every forecast SKU (or just ``skus``), scored on aligned arrays.
+
+        SKUs forecast by a statistical engine are skipped: those forecasts
+        cover only future days, so there are no fitted values to compare
+        the history against.
+        """
+        requested = [sku for sku in (skus or self.forecasts) if sku in self.forecasts]
+        unscored = [sku for sku in requested if sku in self.engines]
+        if unscored:
+            logger.info(f"Skipping anomaly detection for {len(unscored)} SKUs forecast by statistical engines "
+                        f"(no in-sample fit): {', '.join(map(str, unscored[:10]))}"
+                        + (", ..." if len(unscored) > 10 else ""))
+        forecasts = {sku: self.forecasts[sku] for sku in requested if sku not in self.engines}
+        if not forecasts:
+            return pd.DataFrame(columns=ANOMALY_COLUMNS)
+        observed = self.data[[sku for sku in forecasts if sku in self.data.columns]]
+        return AnomalyDetector(threshold).detect(observed, wide_forecasts(forecasts))
+
     def simulate_scenario(self, sku, scenario_func):
         if sku in self.models:
             model = self.models[sku]
@@ -89,6 +351,18 @@ class SKUForecaster:
         else:
             return None
 
+    def simulate_scenarios(self, scenarios, skus=None, uncertainty_samples=0):
+        """Every scenarios.Scenario for every fitted SKU (or just ``skus``) as one tidy frame.
+
+        Reuses the fitted models instead of re-running predict per scenario;
+        see scenarios.simulate_scenarios. Failures are recorded in self.failed.
+        """
+        models = {sku: self.models[sku] for sku in (skus or self.models) if sku in self.models}
+        results, errors = simulate_scenarios(models, scenarios, self.forecast_periods, uncertainty_samples,
+                                             INTERVAL_WIDTH, self.n_jobs)
+        self.failed.update(errors)
+        return results
+
 if __name__ == "__main__":
     from data_loader import DataLoader
     
@@ -119,4 +393,11 @@ if __name__ == "__main__":
     
     scenario_forecast = forecaster.simulate_scenario(sku_example, increase_trend)
     print(f"Scenario forecast for {sku_example}:")
-    print(scenario_forecast.tail())
\ No newline at end of file
+    print(scenario_forecast.tail())
+    # The same what-ifs for every SKU at once, reusing the fitted models
+    from scenarios import Scenario
+    scenarios = [Scenario('baseline'), Scenario('trend +0.1/day', trend_change=0.1),
+                 Scenario('promotion +20%', multiplier=1.2)]
+    scenario_table = forecaster.simulate_scenarios(scenarios)
+    print("Scenario demand totals:")
+    print(scenario_table.groupby('scenario')['yhat'].sum())
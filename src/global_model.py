@@ -0,0 +1,118 @@
+import logging
+import numpy as np
+import pandas as pd
+import torch
+from numpy.lib.stride_tricks import sliding_window_view
+from model import InventoryForecastModel
+from demand import SparseDemand
+
+logger = logging.getLogger(__name__)
+
+
+class GlobalForecastModel:
+    """One LSTMForecaster shared by every SKU in the catalog.
+
+    Each SKU is standardized with its own mean and standard deviation, so
+    windows from slow and fast movers live on the same scale and can be
+    stacked into large mini-batches. Prediction runs every SKU through the
+    network as one batch.
+    """
+
+    def __init__(self, hidden_size: int = 64, num_layers: int = 2, sequence_length: int = 7):
+        self.sequence_length = sequence_length
+        self.forecaster = InventoryForecastModel(input_size=1, hidden_size=hidden_size,
+                                                 num_layers=num_layers, output_size=1)
+        self.skus = []
+        self.means = np.zeros(0)
+        self.scales = np.ones(0)
+        # Last observed window per SKU (n_skus, sequence_length), kept so the
+        # model can forecast without reloading demand data.
+        self.last_window = np.zeros((0, sequence_length))
+        self.last_date = None
+
+    def _scale(self, values: np.ndarray) -> np.ndarray:
+        return (values - self.means) / self.scales
+
+    def fit(self, data: pd.DataFrame, epochs: int = 20, batch_size: int = 1024,
+            validation_split: float = 0.1, patience: int = 3) -> dict:
+        """Train on a days x SKUs demand matrix; the most recent days are held out."""
+        if isinstance(data, SparseDemand):
+            data = data.to_frame()
+        values = data.to_numpy(dtype=np.float64)
+        if len(values) <= self.sequence_length:
+            raise ValueError(f"Need more than {self.sequence_length} days of data, got {len(values)}")
+
+        self.skus = list(data.columns)
+        self.means = values.mean(axis=0)
+        scales = values.std(axis=0)
+        self.scales = np.where(scales > 0, scales, 1.0)
+        scaled = self._scale(values).astype(np.float32)
+        self.last_window = values[-self.sequence_length:].T.copy()
+        self.last_date = data.index[-1]
+
+        # (days - seq, n_skus, seq + 1) view of every SKU's windows; flattening
+        # keeps them in date order so the validation tail is the latest days.
+        windows = sliding_window_view(scaled, self.sequence_length + 1, axis=0)
+        windows = windows.reshape(-1, self.sequence_length + 1)
+        X = windows[:, :self.sequence_length, np.newaxis]
+        y = windows[:, self.sequence_length:]
+
+        logger.info(f"Training global model on {len(self.skus)} SKUs, {X.shape[0]} windows")
+        return self.forecaster.fit(X, y, epochs=epochs, batch_size=batch_size,
+                                   validation_split=validation_split, patience=patience)
+
+    def _forecast(self, index: list, windows: np.ndarray, steps: int) -> np.ndarray:
+        """Batched rollout for trained SKU positions; windows is (n, sequence_length)."""
+        means, scales = self.means[index, np.newaxis], self.scales[index, np.newaxis]
+        scaled = ((windows - means) / scales)[:, :, np.newaxis]
+        return self.forecaster.predict(scaled, steps) * scales + means
+
+    def _frame(self, forecast: np.ndarray, skus: list, last_date) -> pd.DataFrame:
+        start = last_date + pd.Timedelta(days=1)
+        return pd.DataFrame(forecast.T, index=pd.date_range(start, periods=forecast.shape[1], freq='D'), columns=skus)
+
+    def predict(self, data: pd.DataFrame, steps: int) -> pd.DataFrame:
+        """Forecast every trained SKU present in data; returns a steps x SKUs frame."""
+        positions = {sku: i for i, sku in enumerate(self.skus)}
+        skus = [sku for sku in self.skus if sku in data.columns]
+        if isinstance(data, SparseDemand):
+            # Only the last sequence_length days are needed; densify per SKU.
+            windows = np.stack([data.dense(sku)[-self.sequence_length:] for sku in skus]) \
+                if skus else np.zeros((0, self.sequence_length))
+        else:
+            windows = data[skus].to_numpy(dtype=np.float64)[-self.sequence_length:].T
+        forecast = self._forecast([positions[sku] for sku in skus], windows, steps)
+        return self._frame(forecast, skus, data.index[-1])
+
+    def predict_latest(self, skus: list, steps: int) -> pd.DataFrame:
+        """Forecast from the windows seen at training time; unknown SKUs are left out."""
+        positions = {sku: i for i, sku in enumerate(self.skus)}
+        skus = [sku for sku in skus if sku in positions]
+        index = [positions[sku] for sku in skus]
+        forecast = self._forecast(index, self.last_window[index], steps)
+        return self._frame(forecast, skus, self.last_date)
+
+    def save(self, path: str) -> None:
+        torch.save({
+            "state_dict": self.forecaster.model.state_dict(),
+            "config": self.forecaster.config,
+            "sequence_length": self.sequence_length,
+            "skus": self.skus,
+            "means": self.means,
+            "scales": self.scales,
+            "last_window": self.last_window,
+            "last_date": self.last_date,
+        }, path)
+
+    @classmethod
+    def load(cls, path: str) -> "GlobalForecastModel":
+        state = torch.load(path, weights_only=False)
+        model = cls(hidden_size=state["config"]["hidden_size"], num_layers=state["config"]["num_layers"],
+                    sequence_length=state["sequence_length"])
+        model.forecaster.model.load_state_dict(state["state_dict"])
+        model.skus = state["skus"]
+        model.means = state["means"]
+        model.scales = state["scales"]
+        model.last_window = state["last_window"]
+        model.last_date = state["last_date"]
+        return model
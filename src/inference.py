@@ -0,0 +1,169 @@
+"""Compiled CPU inference for the per-SKU LSTMs.
+
+Trained LSTMForecaster modules can be exported to TorchScript (scripted,
+frozen and optimized for inference, optionally with LSTM/Linear layers
+dynamically quantized to int8) or to ONNX for onnxruntime. A loaded
+artifact is attached to InventoryForecastModel as ``runtime`` and used in
+place of the eager module by ``predict``; every export is checked against
+the eager module before it is used.
+
+Usage:
+    python inference.py --backend torchscript --quantize --threads 1
+"""
+import os
+import sys
+import copy
+import json
+import time
+import logging
+import argparse
+import numpy as np
+import torch
+import torch.nn as nn
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS = {'torchscript': 'model.ts', 'onnx': 'model.onnx'}
+# Largest absolute difference from the eager module (in scaled units) an
+# export may show on the parity windows and still be served.
+PARITY_TOLERANCE = 1e-4
+QUANTIZED_PARITY_TOLERANCE = 0.05
+PARITY_WINDOWS = 64
+
+
+def configure_threads(num_threads):
+    """Set torch's intra-op thread count (process-wide)."""
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+
+def quantize(module):
+    """Copy of module with LSTM and Linear weights dynamically quantized to int8."""
+    return torch.ao.quantization.quantize_dynamic(copy.deepcopy(module).eval(), {nn.LSTM, nn.Linear},
+                                                  dtype=torch.qint8)
+
+
+def export_module(module, path, backend='torchscript', quantized=False, sequence_length=7):
+    """Write module as a backend artifact at path."""
+    module = quantize(module) if quantized else module.eval()
+    if backend == 'torchscript':
+        torch.jit.save(torch.jit.optimize_for_inference(torch.jit.script(module)), path)
+    elif backend == 'onnx':
+        if quantized:
+            raise ValueError("Dynamic int8 quantization is only supported for TorchScript exports")
+        # Both are optional dependencies; fail before writing anything.
+        import onnx  # noqa: F401
+        import onnxruntime  # noqa: F401
+        example = torch.zeros(1, sequence_length, module.lstm.input_size)
+        torch.onnx.export(module, (example,), path, input_names=['window'], output_names=['forecast'],
+                          dynamic_axes={'window': {0: 'batch'}, 'forecast': {0: 'batch'}}, dynamo=False)
+    else:
+        raise ValueError(f"Unknown backend {backend!r}; expected one of {list(ARTIFACTS)}")
+
+
+class OnnxRunner:
+    """Callable over an onnxruntime session that takes and returns torch tensors like the module."""
+
+    def __init__(self, path, num_threads=None):
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = onnxruntime.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+    def __call__(self, window):
+        output = self.session.run(None, {'window': np.ascontiguousarray(window.numpy())})[0]
+        return torch.from_numpy(output)
+
+
+def load_runtime(path, backend, num_threads=None):
+    if backend == 'torchscript':
+        configure_threads(num_threads)
+        return torch.jit.load(path).eval()
+    if backend == 'onnx':
+        return OnnxRunner(path, num_threads)
+    raise ValueError(f"Unknown backend {backend!r}; expected one of {list(ARTIFACTS)}")
+
+
+def parity_error(module, runtime, sequence_length=7, n_windows=PARITY_WINDOWS):
+    """Largest absolute output difference between the eager module and runtime on random windows."""
+    rng = np.random.default_rng(0)
+    windows = torch.from_numpy(rng.standard_normal((n_windows, sequence_length, module.lstm.input_size))
+                                .astype(np.float32))
+    module.eval()
+    with torch.inference_mode():
+        return float((module(windows) - runtime(windows)).abs().max())
+
+
+def compile_model(model, directory, backend='torchscript', quantized=False, sequence_length=7, num_threads=None):
+    """Export model.model into directory, check parity and attach the runtime.
+
+    Returns the artifact description to keep in registry metadata, or None
+    (model left on the eager path) when the export is outside tolerance.
+    """
+    path = os.path.join(directory, ARTIFACTS[backend])
+    export_module(model.model, path + ".tmp", backend, quantized, sequence_length)
+    runtime = load_runtime(path + ".tmp", backend, num_threads)
+    error = parity_error(model.model, runtime, sequence_length)
+    tolerance = QUANTIZED_PARITY_TOLERANCE if quantized else PARITY_TOLERANCE
+    if error > tolerance:
+        os.remove(path + ".tmp")
+        logger.warning(f"{backend} export off by {error:.3g} (tolerance {tolerance}); serving eager model")
+        return None
+    os.replace(path + ".tmp", path)
+    if backend == 'torchscript':
+        # Reload from the final path so nothing refers to the temporary file.
+        runtime = load_runtime(path, backend, num_threads)
+    model.runtime = runtime
+    return {"backend": backend, "path": ARTIFACTS[backend], "quantized": quantized, "parity_error": error}
+
+
+def compare_latency(model, runtime, sequence_length=7, steps=30, batch_size=1000, repeat=20):
+    """Seconds per single-window forecast and windows per second for a batch, eager vs runtime."""
+    window = np.random.default_rng(0).standard_normal((sequence_length, 1)).astype(np.float32)
+    batch = np.random.default_rng(1).standard_normal((batch_size, sequence_length, 1)).astype(np.float32)
+    results = {}
+    for name, candidate in (('eager', None), ('compiled', runtime)):
+        model.runtime = candidate
+        model.predict(window, steps)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            model.predict(window, steps)
+        results[f"{name}_single_seconds"] = (time.perf_counter() - start) / repeat
+        start = time.perf_counter()
+        model.predict(batch, steps)
+        results[f"{name}_windows_per_second"] = batch_size / (time.perf_counter() - start)
+    model.runtime = runtime
+    results["single_speedup"] = results["eager_single_seconds"] / results["compiled_single_seconds"]
+    return results
+
+
+def main(argv=None):
+    from registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description="Compile registered LSTMs for CPU serving")
+    parser.add_argument("--registry", default=os.getenv('MODEL_REGISTRY_PATH', 'model_registry'))
+    parser.add_argument("--backend", choices=list(ARTIFACTS), default='torchscript')
+    parser.add_argument("--quantize", action="store_true", help="dynamic int8 quantization (TorchScript only)")
+    parser.add_argument("--threads", type=int, default=None, help="intra-op threads for inference")
+    parser.add_argument("--skus", nargs="*", default=None, help="default: every registered SKU")
+    args = parser.parse_args(argv)
+
+    registry = ModelRegistry(args.registry, backend=args.backend, quantize=args.quantize, num_threads=args.threads)
+    report = {}
+    for sku in args.skus or registry.recent_skus():
+        entry = registry.export(sku)
+        if entry is None or entry.model.runtime is None:
+            report[sku] = None
+            continue
+        artifact = dict(entry.metadata["artifact"])
+        artifact.update(compare_latency(entry.model, entry.model.runtime, entry.metadata["sequence_length"]))
+        report[sku] = artifact
+    print(json.dumps(report, indent=2))
+    return 0 if all(report.values()) else 1
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
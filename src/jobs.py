@@ -0,0 +1,240 @@
+import json
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+JOB_MODELS = ('lstm', 'prophet', 'global')
+
+
+def run_training_job(job, report_progress):
+    """Train the SKUs of one job and return a summary with stage timings.
+
+    Demand is loaded once for the whole job; ``skus`` of None means every SKU
+    in the loaded window.
+    """
+    from data_loader import DataLoader
+    from registry import get_registry
+
+    registry = get_registry()
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=job['days'])
+
+    started = time.perf_counter()
+    loader = DataLoader()
+    processed_data = loader.load_daily_demand(start_date, end_date)
+    load_seconds = time.perf_counter() - started
+
+    skus = job['skus'] or list(processed_data.columns)
+    incremental = bool(job.get('incremental', True))
+    report_progress(0, len(skus))
+    failed = {}
+    modes = {}
+    started = time.perf_counter()
+
+    if job['model'] == 'lstm':
+        from predict import train_sku_model, refresh_sku_model, data_watermark
+
+        watermark = data_watermark(loader, processed_data)
+        for done, sku in enumerate(skus, start=1):
+            try:
+                if incremental:
+                    _, modes[sku] = refresh_sku_model(sku, processed_data, start_date, end_date,
+                                                      watermark=watermark, registry=registry)
+                else:
+                    train_sku_model(sku, processed_data, start_date, end_date, watermark=watermark, registry=registry)
+                    modes[sku] = 'refit'
+            except Exception as e:
+                logger.error(f"Job {job['id']}: training failed for SKU {sku}: {str(e)}")
+                failed[sku] = str(e)
+            report_progress(done, len(skus))
+    elif job['model'] == 'global':
+        from predict import fit_global_model, data_watermark
+
+        # One model over every requested SKU; it replaces the registered global model.
+        present = [sku for sku in skus if sku in processed_data.columns]
+        failed.update({sku: f"SKU {sku} not found in the data" for sku in skus if sku not in present})
+        if present:
+            fit_global_model(processed_data[present], start_date, end_date,
+                             watermark=data_watermark(loader, processed_data), registry=registry)
+            modes.update(dict.fromkeys(present, 'refit'))
+        report_progress(len(skus), len(skus))
+    else:
+        from forecaster import SKUForecaster
+
+        missing = [sku for sku in skus if sku not in processed_data.columns]
+        for sku in missing:
+            failed[sku] = f"SKU {sku} not found in the data"
+        present = [sku for sku in skus if sku in processed_data.columns]
+        previous = {}
+        if incremental:
+            for sku in present:
+                entry = registry.get_prophet_entry(sku)
+                if entry is not None:
+                    previous[sku] = entry
+        forecaster = SKUForecaster(processed_data[present], n_jobs=job['workers'])
+        # Train in chunks so progress moves while the pool is busy.
+        chunk_size = max(1, forecaster.n_jobs * 4)
+        for i in range(0, len(present), chunk_size):
+            forecaster.data = processed_data[present[i:i + chunk_size]]
+            forecaster.train_models(previous=previous, policy=registry.refit_policy if incremental else None)
+            report_progress(len(missing) + min(i + chunk_size, len(present)), len(skus))
+        now = datetime.now().isoformat()
+        for sku, model in forecaster.models.items():
+            mode = forecaster.fit_modes.get(sku, 'refit')
+            modes[sku] = mode
+            if mode == 'current':
+                continue
+            metadata = {"full_fit_at": now, "updates": 0}
+            if mode == 'update':
+                metadata = dict(previous[sku].metadata, updates=previous[sku].metadata.get("updates", 0) + 1)
+            metadata.update(data_end=f"{model.history['ds'].max():%Y-%m-%d}", trained_at=now)
+            registry.save_prophet(sku, model, metadata)
+        failed.update(forecaster.failed)
+        failed.update(forecaster.skipped)
+
+    return {
+        "load_seconds": load_seconds,
+        "train_seconds": time.perf_counter() - started,
+        "trained": len(skus) - len(failed),
+        "modes": {mode: sum(1 for m in modes.values() if m == mode) for mode in sorted(set(modes.values()))},
+        "failed": failed,
+    }
+
+
+class JobQueue:
+    """SQLite-backed training job queue worked by a fixed number of threads.
+
+    Jobs survive restarts: anything still marked running when the queue starts
+    was interrupted and is queued again.
+    """
+
+    def __init__(self, path="jobs.db", workers=1, runner=run_training_job, poll_interval=1.0):
+        self.path = path
+        self.workers = workers
+        self.runner = runner
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        with self._lock, self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    skus TEXT,
+                    days INTEGER NOT NULL,
+                    workers INTEGER NOT NULL,
+                    incremental INTEGER NOT NULL DEFAULT 1,
+                    status TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    progress_done INTEGER NOT NULL DEFAULT 0,
+                    progress_total INTEGER,
+                    result TEXT,
+                    error TEXT
+                )
+                """
+            )
+            columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(jobs)")}
+            if 'incremental' not in columns:
+                # Queues created before incremental updates existed.
+                self.conn.execute("ALTER TABLE jobs ADD COLUMN incremental INTEGER NOT NULL DEFAULT 1")
+
+    def start(self):
+        with self._lock, self.conn:
+            requeued = self.conn.execute(
+                "UPDATE jobs SET status = 'queued', started_at = NULL, progress_done = 0 WHERE status = 'running'"
+            ).rowcount
+        if requeued:
+            logger.info(f"Requeued {requeued} interrupted training jobs")
+        self._stop.clear()
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"train-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(self, model='lstm', skus=None, days=90, workers=1, incremental=True):
+        """Queue a training job. incremental lets the registry's refit policy
+        warm-start from previous fits; False forces a full refit."""
+        if model not in JOB_MODELS:
+            raise ValueError(f"Unknown model '{model}', expected one of {JOB_MODELS}")
+        if workers < 1:
+            raise ValueError(f"workers must be at least 1, got {workers}")
+        job_id = uuid.uuid4().hex
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO jobs (id, model, skus, days, workers, incremental, status, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, 'queued', ?)",
+                (job_id, model, json.dumps(skus) if skus else None, days, workers, int(incremental),
+                 datetime.now().isoformat())
+            )
+        self._wakeup.set()
+        logger.info(f"Queued {model} training job {job_id} for {len(skus) if skus else 'all'} SKUs")
+        return job_id
+
+    def _row_to_job(self, row):
+        job = dict(row)
+        job['skus'] = json.loads(job['skus']) if job['skus'] else None
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['incremental'] = bool(job['incremental'])
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def _claim(self):
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE jobs SET status = 'running', started_at = ? WHERE id = ?",
+                              (datetime.now().isoformat(), row['id']))
+        return self._row_to_job(row)
+
+    def _update(self, job_id, **fields):
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self.conn:
+            self.conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _work(self):
+        while not self._stop.is_set():
+            job = self._claim()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+
+            logger.info(f"Starting training job {job['id']}")
+
+            def report_progress(done, total, job_id=job['id']):
+                self._update(job_id, progress_done=done, progress_total=total)
+
+            try:
+                result = self.runner(job, report_progress)
+                self._update(job['id'], status='done', finished_at=datetime.now().isoformat(),
+                             result=json.dumps(result))
+                logger.info(f"Training job {job['id']} finished")
+            except Exception as e:
+                logger.error(f"Training job {job['id']} failed: {str(e)}", exc_info=True)
+                self._update(job['id'], status='failed', finished_at=datetime.now().isoformat(), error=str(e))
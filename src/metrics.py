@@ -0,0 +1,215 @@
+"""In-process timers and counters, rendered in the Prometheus text format.
+
+Stages are timed with ``stage_timer`` and land in one histogram,
+``inventory_stage_seconds{stage="..."}``; work done in a stage (pages,
+orders, windows) is counted with ``count_items``. While a request profile
+is active (see ``profile``), every stage timed in that context is also
+recorded in the profile so a single request can be broken down.
+
+Worker processes keep their own metrics, which are not merged back, so
+per-fit Prophet timings are only visible when fits run in-process.
+"""
+import os
+import time
+import logging
+import threading
+import functools
+import contextvars
+from bisect import bisect_left
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+def _label_string(names, values):
+    if not names:
+        return ""
+    escape = lambda value: str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    pairs = ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1.0, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(name, "") for name in self.labelnames), 0.0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_string(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (non-cumulative, last is +Inf), sum, count]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self, **labels):
+        """(sum, count) for one label set."""
+        series = self._series.get(tuple(labels.get(name, "") for name in self.labelnames))
+        return (series[1], series[2]) if series else (0.0, 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    labels = _label_string(self.labelnames + ("le",), key + (le,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _label_string(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {total}")
+                lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+STAGE_SECONDS = REGISTRY.histogram("inventory_stage_seconds", "Time spent per pipeline stage", ["stage"])
+STAGE_ITEMS = REGISTRY.counter("inventory_stage_items_total", "Work items processed per pipeline stage",
+                               ["stage", "unit"])
+SHIPSTATION_REQUESTS = REGISTRY.counter("inventory_shipstation_requests_total",
+                                        "ShipStation HTTP requests by endpoint and status", ["endpoint", "status"])
+HTTP_REQUEST_SECONDS = REGISTRY.histogram("inventory_http_request_seconds", "API request latency",
+                                          ["method", "route", "status"])
+
+_profile = contextvars.ContextVar("inventory_profile", default=None)
+
+
+class Profile:
+    """Per-request list of (stage, seconds) observations; safe to share across threads."""
+
+    def __init__(self, name):
+        self.name = name
+        self.started = time.perf_counter()
+        self.stages = []
+        self._lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self.stages.append((stage, seconds))
+
+    def breakdown(self):
+        totals = {}
+        with self._lock:
+            for stage, seconds in self.stages:
+                total, calls = totals.get(stage, (0.0, 0))
+                totals[stage] = (total + seconds, calls + 1)
+        return {
+            "name": self.name,
+            "total_seconds": time.perf_counter() - self.started,
+            "stages": {stage: {"seconds": total, "calls": calls} for stage, (total, calls) in totals.items()},
+        }
+
+
+def observe_stage(stage, seconds):
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    profile = _profile.get()
+    if profile is not None:
+        profile.record(stage, seconds)
+
+
+def count_items(stage, amount, unit="items"):
+    STAGE_ITEMS.inc(amount, stage=stage, unit=unit)
+
+
+@contextmanager
+def stage_timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - start)
+
+
+def timed_stage(stage):
+    """Decorator form of stage_timer."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def profile(name):
+    """Collect every stage timed in this context (and contexts copied from it)."""
+    current = Profile(name)
+    token = _profile.set(current)
+    try:
+        yield current
+    finally:
+        _profile.reset(token)
+
+
+def in_context(func):
+    """Bind func to a copy of the caller's context, for handing work to a thread pool.
+
+    Make one per task: a context can only be entered by one thread at a time.
+    """
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+
+def profiling_enabled():
+    return os.getenv('PROFILE_REQUESTS', '').lower() in ('1', 'true', 'yes')
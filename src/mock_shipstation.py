@@ -0,0 +1,133 @@
+import json
+import math
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+logger = logging.getLogger(__name__)
+
+
+class MockShipStation:
+    """Local stand-in for the ShipStation /orders and /products endpoints.
+
+    Serves in-memory records with ShipStation-style paging and rate-limit
+    headers, and can inject failures so retry and backoff can be exercised
+    without credentials:
+
+        server = MockShipStation(orders, products, fail_first=2)
+        base_url = server.start()
+        ...
+        server.stop()
+    """
+
+    def __init__(self, orders=None, products=None, rate_limit=40, window=60, fail_first=0,
+                 fail_status=500, latency=0.0, host="127.0.0.1", port=0):
+        self.orders = orders or []
+        self.products = products or []
+        self.rate_limit = rate_limit
+        self.window = window
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.latency = latency
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._window_start = time.monotonic()
+        self._window_used = 0
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Mock ShipStation listening on {self.base_url}")
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _filter_orders(self, query):
+        orders = self.orders
+        bounds = [
+            ('createDateStart', 'createDate', lambda value, bound: value >= bound),
+            ('createDateEnd', 'createDate', lambda value, bound: value <= bound),
+            ('modifyDateStart', 'modifyDate', lambda value, bound: value >= bound),
+        ]
+        for param, field, check in bounds:
+            if param in query:
+                bound = query[param][0][:19]
+                orders = [order for order in orders if check(str(order.get(field, ''))[:19], bound)]
+        return orders
+
+    def _take_rate_limit(self):
+        """Return (error_status or None, remaining, reset_seconds) for one request."""
+        with self._lock:
+            self.request_count += 1
+            now = time.monotonic()
+            if now - self._window_start >= self.window:
+                self._window_start = now
+                self._window_used = 0
+            reset = max(0, math.ceil(self.window - (now - self._window_start)))
+            if self._window_used >= self.rate_limit:
+                return 429, 0, reset
+            self._window_used += 1
+            error = self.fail_status if self.request_count <= self.fail_first else None
+            return error, self.rate_limit - self._window_used, reset
+
+    def _make_handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _send(self, status, body, remaining, reset):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.send_header("X-Rate-Limit-Limit", str(mock.rate_limit))
+                self.send_header("X-Rate-Limit-Remaining", str(remaining))
+                self.send_header("X-Rate-Limit-Reset", str(reset))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                error, remaining, reset = mock._take_rate_limit()
+                if mock.latency:
+                    time.sleep(mock.latency)
+
+                if error:
+                    self._send(error, {"Message": "Mock failure"}, remaining, reset)
+                    return
+
+                if parsed.path == "/orders":
+                    key, records = 'orders', mock._filter_orders(query)
+                elif parsed.path == "/products":
+                    key, records = 'products', mock.products
+                else:
+                    self._send(404, {"Message": "Not found"}, remaining, reset)
+                    return
+
+                page = int(query.get('page', ['1'])[0])
+                page_size = int(query.get('pageSize', ['100'])[0])
+                start = (page - 1) * page_size
+                body = {
+                    key: records[start:start + page_size],
+                    "total": len(records),
+                    "page": page,
+                    "pages": math.ceil(len(records) / page_size),
+                }
+                self._send(200, body, remaining, reset)
+
+        return Handler
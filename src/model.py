@@ -2,6 +2,7 @@ import torch
 import torch.nn as nn
 import numpy as np
 import logging
+from metrics import timed_stage, count_items
 
 logger = logging.getLogger(__name__)
 
@@ -14,43 +15,171 @@ class LSTMForecaster(nn.Module):
         self.fc = nn.Linear(hidden_size, output_size)
 
     def forward(self, x):
-        batch_size = x.size(0)
-        h0 = torch.zeros(self.num_layers, batch_size, self.hidden_size).to(x.device)
-        c0 = torch.zeros(self.num_layers, batch_size, self.hidden_size).to(x.device)
-        
-        out, _ = self.lstm(x, (h0, c0))
+        # nn.LSTM starts from zero hidden and cell states when none are passed.
+        out, _ = self.lstm(x)
         out = self.fc(out[:, -1, :])
         return out
 
+def _writeable(values: np.ndarray) -> np.ndarray:
+    return values if values.flags.writeable else values.copy()
+
+class SeriesScaler:
+    """Standardizes a demand series so the LSTM trains on unit-scale values."""
+
+    def __init__(self, mean: float = 0.0, scale: float = 1.0):
+        self.mean = mean
+        self.scale = scale
+
+    def fit(self, values: np.ndarray) -> "SeriesScaler":
+        self.mean = float(np.mean(values))
+        std = float(np.std(values))
+        self.scale = std if std > 0 else 1.0
+        return self
+
+    def transform(self, values: np.ndarray) -> np.ndarray:
+        return (values - self.mean) / self.scale
+
+    def inverse_transform(self, values: np.ndarray) -> np.ndarray:
+        return values * self.scale + self.mean
+
+    def to_dict(self) -> dict:
+        return {"mean": self.mean, "scale": self.scale}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> "SeriesScaler":
+        return cls(state["mean"], state["scale"])
+
 class InventoryForecastModel:
     def __init__(self, input_size: int = 1, hidden_size: int = 64, num_layers: int = 2, output_size: int = 1):
+        self.config = {"input_size": input_size, "hidden_size": hidden_size,
+                       "num_layers": num_layers, "output_size": output_size}
+        self.scaler = None
         self.model = LSTMForecaster(input_size, hidden_size, num_layers, output_size)
         self.optimizer = torch.optim.Adam(self.model.parameters())
         self.criterion = nn.MSELoss()
+        # Compiled module (see inference.py) that predict uses in place of
+        # self.model when set; fit clears it since its weights go stale.
+        self.runtime = None
+
+    def __getstate__(self):
+        # Compiled runtimes are tied to files and sessions; copies and
+        # pickles fall back to the eager module.
+        return dict(self.__dict__, runtime=None)
+
+    @timed_stage("lstm_fit")
+    def fit(self, X: np.ndarray, y: np.ndarray, epochs: int = 100, batch_size: int = None,
+            validation_split: float = 0.0, patience: int = None, min_delta: float = 0.0,
+            num_threads: int = None) -> dict:
+        """Train on windows X (samples, seq_len, features) and targets y (samples, output_size).
+
+        The last validation_split fraction of samples (the most recent
+        windows) is held out. With patience set, training stops once the
+        monitored loss (validation if held out, else training) has not
+        improved by min_delta for that many epochs, and the best weights are
+        restored. batch_size=None trains full-batch. num_threads sets
+        torch's intra-op thread count, which is process-wide.
+
+        Returns the loss history.
+        """
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        self.runtime = None
+
+        # Window views are read-only, so they are copied into contiguous
+        # float32 arrays torch can own.
+        X_tensor = torch.from_numpy(_writeable(np.ascontiguousarray(X, dtype=np.float32)))
+        y_tensor = torch.from_numpy(_writeable(np.ascontiguousarray(y, dtype=np.float32)))
+        n_val = int(len(X_tensor) * validation_split)
+        if n_val > 0:
+            X_train, y_train = X_tensor[:-n_val], y_tensor[:-n_val]
+            X_val, y_val = X_tensor[-n_val:], y_tensor[-n_val:]
+        else:
+            X_train, y_train = X_tensor, y_tensor
+            X_val = y_val = None
+
+        history = {"train_loss": [], "val_loss": [], "best_epoch": None, "epochs_run": 0}
+        best_loss = float('inf')
+        best_state = None
+        stale_epochs = 0
 
-    def fit(self, X: np.ndarray, y: np.ndarray, epochs: int = 100) -> None:
-        X_tensor = torch.FloatTensor(X)
-        y_tensor = torch.FloatTensor(y)
-        self.model.train()
         for epoch in range(epochs):
-            self.optimizer.zero_grad()
-            y_pred = self.model(X_tensor)
-            loss = self.criterion(y_pred, y_tensor)
-            loss.backward()
-            self.optimizer.step()
+            self.model.train()
+            if batch_size is None or batch_size >= len(X_train):
+                batches = [(X_train, y_train)]
+            else:
+                order = torch.randperm(len(X_train))
+                batches = [(X_train[idx], y_train[idx]) for idx in order.split(batch_size)]
+            epoch_loss = 0.0
+            for X_batch, y_batch in batches:
+                self.optimizer.zero_grad()
+                y_pred = self.model(X_batch)
+                loss = self.criterion(y_pred, y_batch)
+                loss.backward()
+                self.optimizer.step()
+                epoch_loss += loss.item() * len(X_batch)
+            train_loss = epoch_loss / len(X_train)
+            history["train_loss"].append(train_loss)
+            history["epochs_run"] = epoch + 1
+
+            monitored = train_loss
+            if X_val is not None:
+                self.model.eval()
+                with torch.no_grad():
+                    monitored = self.criterion(self.model(X_val), y_val).item()
+                history["val_loss"].append(monitored)
+
             if epoch % 10 == 0:
-                logger.info(f"Epoch {epoch}, Loss: {loss.item()}")
+                logger.info(f"Epoch {epoch}, Loss: {train_loss}" +
+                            (f", Validation loss: {monitored}" if X_val is not None else ""))
+
+            if patience is None:
+                continue
+            if monitored < best_loss - min_delta:
+                best_loss = monitored
+                best_state = {name: value.clone() for name, value in self.model.state_dict().items()}
+                history["best_epoch"] = epoch
+                stale_epochs = 0
+            else:
+                stale_epochs += 1
+                if stale_epochs >= patience:
+                    logger.info(f"Early stopping at epoch {epoch}, best epoch {history['best_epoch']}")
+                    break
+
+        if best_state is not None:
+            self.model.load_state_dict(best_state)
+        count_items("lstm_fit", history["epochs_run"], unit="epochs")
+        count_items("lstm_fit", history["epochs_run"] * len(X_train), unit="samples")
+        return history
 
+    @timed_stage("lstm_predict")
     def predict(self, data: np.ndarray, steps: int) -> np.ndarray:
+        """Forecast steps values ahead.
+
+        data is one window (sequence_length, input_size), returning (steps,),
+        or a batch of windows (n_series, sequence_length, input_size),
+        returning (n_series, steps). A model with output_size > 1 emits that
+        many days per forward pass, so a direct head with output_size >= steps
+        needs a single pass; otherwise outputs are fed back recursively.
+        """
+        data = np.asarray(data, dtype=np.float32)
+        single = data.ndim == 2
+        if single:
+            data = data[np.newaxis]
+        batch_size, sequence_length, _ = data.shape
+        horizon = self.config["output_size"]
+        passes = -(-steps // horizon)
+        forward = self.model if self.runtime is None else self.runtime
+
         self.model.eval()
-        with torch.no_grad():
-            predictions = []
-            # Ensure input tensor has the correct shape: (1, sequence_length, input_size)
-            input_tensor = torch.FloatTensor(data).unsqueeze(0)  # Adds batch dimension to (sequence_length, input_size)
-            for _ in range(steps):
-                output = self.model(input_tensor)  # Model expects (batch_size, sequence_length, input_size)
-                predictions.append(output.item())
-                # Shift the input tensor and append the output to the end
-                input_tensor = torch.cat([input_tensor[:, 1:, :], output.unsqueeze(0).unsqueeze(2)], dim=1)
-                # input_tensor shape remains (1, sequence_length, input_size)
-        return np.array(predictions)
+        with torch.inference_mode():
+            # Preallocated rollout buffer: each pass reads the last
+            # sequence_length values and appends its outputs in place.
+            buffer = torch.empty(batch_size, sequence_length + passes * horizon, 1)
+            buffer[:, :sequence_length, :] = torch.from_numpy(data)
+            for i in range(passes):
+                offset = i * horizon
+                output = forward(buffer[:, offset:offset + sequence_length, :])  # (batch_size, horizon)
+                buffer[:, sequence_length + offset:sequence_length + offset + horizon, 0] = output
+        predictions = buffer[:, sequence_length:sequence_length + steps, 0].numpy()
+        count_items("lstm_predict", batch_size, unit="series")
+        return predictions[0] if single else predictions
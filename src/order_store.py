@@ -0,0 +1,119 @@
+import json
+import sqlite3
+import logging
+import threading
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ShipStation timestamps look like "2015-06-29T08:46:27.0000000". The first 19
+# characters sort lexicographically in time order, which lets SQLite range-scan
+# the create_date index without parsing.
+DATE_KEY_LENGTH = 19
+
+
+def date_key(value):
+    if value is None:
+        return None
+    if hasattr(value, 'strftime'):
+        return value.strftime('%Y-%m-%dT%H:%M:%S')
+    return str(value)[:DATE_KEY_LENGTH]
+
+
+class OrderStore:
+    """Local SQLite copy of ShipStation orders.
+
+    The store remembers the earliest createDate it holds a complete copy of
+    (``covered_start``) and the latest modifyDate it has seen (``watermark``).
+    Everything created on or after ``covered_start`` is up to date as of the
+    watermark, so a refresh only needs orders modified since then.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self._create_tables()
+        logger.info(f"Order store opened at {path}")
+
+    def _create_tables(self):
+        with self._lock, self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS orders (
+                    order_id INTEGER PRIMARY KEY,
+                    create_date TEXT NOT NULL,
+                    modify_date TEXT,
+                    payload TEXT NOT NULL
+                )
+                """
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_orders_create_date ON orders (create_date)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _get_meta(self, key):
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key, value):
+        with self._lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def get_watermark(self):
+        return self._get_meta('watermark')
+
+    def set_watermark(self, value):
+        self._set_meta('watermark', date_key(value))
+
+    def get_covered_start(self):
+        return self._get_meta('covered_start')
+
+    def set_covered_start(self, value):
+        self._set_meta('covered_start', date_key(value))
+
+    def upsert_orders(self, orders):
+        """Insert or replace orders and return the latest modifyDate among them."""
+        rows = []
+        latest = None
+        for order in orders:
+            if order.get('orderId') is None or not order.get('createDate'):
+                continue
+            modify_date = date_key(order.get('modifyDate'))
+            if modify_date and (latest is None or modify_date > latest):
+                latest = modify_date
+            rows.append((order['orderId'], date_key(order['createDate']), modify_date, json.dumps(order)))
+        if rows:
+            with self._lock, self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO orders (order_id, create_date, modify_date, payload) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+        return latest
+
+    def iter_orders(self, start_date, end_date, batch_size=1000):
+        """Yield orders created in the window as lists of at most batch_size."""
+        with self._lock:
+            cursor = self.conn.execute(
+                "SELECT payload FROM orders WHERE create_date >= ? AND create_date <= ? ORDER BY create_date",
+                (date_key(start_date), date_key(end_date))
+            )
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield [json.loads(payload) for (payload,) in rows]
+
+    def load_orders(self, start_date, end_date):
+        orders = []
+        for batch in self.iter_orders(start_date, end_date):
+            orders.extend(batch)
+        return pd.DataFrame(orders)
+
+    def count(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
@@ -1,19 +1,84 @@
+import os
+import copy
 import logging
 import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime, timedelta
 from data_loader import DataLoader
-from model import InventoryForecastModel
+from model import InventoryForecastModel, SeriesScaler
+from registry import get_registry
+from cache import get_forecast_cache, forecast_key
+from global_model import GlobalForecastModel
+from metrics import timed_stage
 
 logger = logging.getLogger(__name__)
 
-def train_model(start_date, end_date, sku):
+SEQUENCE_LENGTH = 7
+# Days emitted per forward pass. 1 keeps the recursive one-step model; setting
+# it to the serving horizon (e.g. 30) trains a direct multi-output head.
+FORECAST_HORIZON = int(os.getenv('LSTM_FORECAST_HORIZON', 1))
+TRAIN_BATCH_SIZE = 32
+# Most recent fraction of windows held out for early stopping.
+VALIDATION_SPLIT = 0.2
+EARLY_STOPPING_PATIENCE = 10
+TORCH_NUM_THREADS = int(os.getenv('TORCH_NUM_THREADS', 0)) or None
+# Incremental updates fine-tune for a few epochs on the windows ending in new
+# days, plus this many recent days replayed so one new day cannot dominate.
+UPDATE_EPOCHS = 5
+UPDATE_REPLAY_DAYS = 28
+# Days of demand loaded when a request has to train a model first.
+PREDICTION_HISTORY_DAYS = 90
+
+def data_watermark(loader, processed_data):
+    """Identifies the data a model was trained on: the order store watermark if
+    there is one, otherwise the last day of demand."""
+    if loader.store is not None:
+        return loader.store.get_watermark()
+    if len(processed_data.index) == 0:
+        return None
+    return processed_data.index[-1].strftime('%Y-%m-%d')
+
+def fit_series_model(sku_data, horizon=FORECAST_HORIZON, epochs=100):
+    """Fit an LSTM on one demand series; returns (model, number of training windows)."""
+    if len(sku_data) < SEQUENCE_LENGTH + horizon + 1:
+        raise ValueError(f"Need at least {SEQUENCE_LENGTH + horizon + 1} days of data, got {len(sku_data)}")
+    
+    scaler = SeriesScaler().fit(sku_data)
+    scaled_data = scaler.transform(sku_data).astype(np.float32)
+    
+    # Windows of 7 input days plus `horizon` target days, as a read-only
+    # strided view over scaled_data rather than copies.
+    windows = sliding_window_view(scaled_data, SEQUENCE_LENGTH + horizon)
+    X = windows[:, :SEQUENCE_LENGTH, np.newaxis]  # (samples, time steps, features)
+    y = windows[:, SEQUENCE_LENGTH:]  # (samples, horizon)
+    
+    logger.info(f"Training data shapes - X: {X.shape}, y: {y.shape}")
+    
+    model = InventoryForecastModel(input_size=1, hidden_size=64, num_layers=2, output_size=horizon)
+    model.scaler = scaler
+    history = model.fit(X, y, epochs=epochs, batch_size=TRAIN_BATCH_SIZE, validation_split=VALIDATION_SPLIT,
+                        patience=EARLY_STOPPING_PATIENCE, num_threads=TORCH_NUM_THREADS)
+    logger.info(f"Trained for {history['epochs_run']} epochs, best epoch {history['best_epoch']}")
+    
+    return model, int(X.shape[0])
+
+def train_model(start_date, end_date, sku, registry=None, horizon=FORECAST_HORIZON):
     logger.info(f"Training model for SKU: {sku}, start_date: {start_date}, end_date: {end_date}")
     loader = DataLoader()
-    raw_data = loader.load_order_history(start_date, end_date)
-    processed_data = loader.preprocess_data(raw_data)
+    processed_data = loader.load_daily_demand(start_date, end_date)
     
     logger.info(f"Processed data shape: {processed_data.shape}")
     
+    model, sku_data = train_sku_model(sku, processed_data, start_date, end_date,
+                                      watermark=data_watermark(loader, processed_data),
+                                      registry=registry, horizon=horizon)
+    return model, sku_data
+
+def train_sku_model(sku, processed_data, start_date, end_date, watermark=None, registry=None,
+                    horizon=FORECAST_HORIZON):
+    """Train one SKU from an already loaded demand matrix, registering it if a
+    registry is given. Lets callers training many SKUs load the data once."""
     if sku not in processed_data.columns:
         logger.error(f"SKU {sku} not found in the data")
         raise ValueError(f"SKU {sku} not found in the data")
@@ -21,44 +86,287 @@ def train_model(start_date, end_date, sku):
     sku_data = processed_data[sku].dropna().values
     logger.info(f"SKU data shape: {sku_data.shape}")
     
-    # Prepare data for LSTM (sequence of 7 days to predict the next day)
-    X, y = [], []
-    for i in range(len(sku_data) - 7):
-        X.append(sku_data[i:i+7])
-        y.append(sku_data[i+7])
-    X = np.array(X)
-    y = np.array(y)
+    model, n_samples = fit_series_model(sku_data, horizon)
     
-    # Reshape X to (samples, time steps, features)
-    X = X.reshape((X.shape[0], X.shape[1], 1))
-    y = y.reshape((y.shape[0], 1))
+    logger.info("Model training completed")
     
-    logger.info(f"Training data shapes - X: {X.shape}, y: {y.shape}")
+    if registry is not None:
+        registry.save(sku, model, {
+            "watermark": watermark,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "sequence_length": SEQUENCE_LENGTH,
+            "n_samples": n_samples,
+            "last_window": sku_data[-SEQUENCE_LENGTH:].tolist(),
+            "data_end": f"{processed_data[sku].dropna().index[-1]:%Y-%m-%d}",
+            "full_fit_at": datetime.now().isoformat(),
+            "updates": 0,
+        })
+    return model, sku_data
+
+def update_series_model(model, sku_data, new_days, epochs=UPDATE_EPOCHS):
+    """Fine-tune a trained model in place on the windows whose targets fall in
+    the last new_days days, plus UPDATE_REPLAY_DAYS of recent history. The
+    scaler from the full fit is kept. Returns the number of windows used."""
+    horizon = model.config["output_size"]
+    scaled_data = np.asarray(sku_data, dtype=float)
+    if model.scaler is not None:
+        scaled_data = model.scaler.transform(scaled_data)
+    tail = new_days + UPDATE_REPLAY_DAYS + SEQUENCE_LENGTH + horizon - 1
+    scaled_data = scaled_data[-tail:].astype(np.float32)
+    if len(scaled_data) < SEQUENCE_LENGTH + horizon:
+        raise ValueError(f"Need at least {SEQUENCE_LENGTH + horizon} days of data, got {len(scaled_data)}")
     
-    model = InventoryForecastModel(input_size=1, hidden_size=64, num_layers=2, output_size=1)
-    model.fit(X, y)
+    windows = sliding_window_view(scaled_data, SEQUENCE_LENGTH + horizon)
+    X = windows[:, :SEQUENCE_LENGTH, np.newaxis]
+    y = windows[:, SEQUENCE_LENGTH:]
+    model.fit(X, y, epochs=epochs, batch_size=TRAIN_BATCH_SIZE, num_threads=TORCH_NUM_THREADS)
+    return int(X.shape[0])
+
+def refresh_sku_model(sku, processed_data, start_date, end_date, watermark=None, registry=None,
+                      horizon=FORECAST_HORIZON):
+    """Bring a SKU's registered model up to date with processed_data.
+
+    Fine-tunes the registered weights on the days that arrived since it was
+    last trained when the registry's refit policy allows it, and falls back to
+    train_sku_model otherwise. Returns (model, mode) with mode one of
+    'current', 'update' or 'refit'.
+    """
+    registry = registry or get_registry()
+    if sku not in processed_data.columns:
+        logger.error(f"SKU {sku} not found in the data")
+        raise ValueError(f"SKU {sku} not found in the data")
     
-    logger.info("Model training completed")
-    return model, sku_data
+    series = processed_data[sku].dropna()
+    entry = registry.get(sku, allow_stale=True)
+    if entry is None:
+        reason = "no registered model"
+    elif entry.model.config["output_size"] != horizon:
+        reason = "forecast horizon changed"
+    else:
+        data_end = pd.Timestamp(entry.metadata.get("data_end", series.index[0]))
+        new_data = series[series.index > data_end]
+        if new_data.empty and entry.watermark == watermark:
+            # Nothing to learn, but record the check so the entry stops
+            # counting as stale by age and is not refetched on every request.
+            registry.touch(sku)
+            return entry.model, 'current'
+        reason = registry.refit_policy.refit_reason(entry.metadata, len(new_data), new_data.to_numpy())
+    
+    if reason is not None:
+        logger.info(f"Full refit for SKU {sku}: {reason}")
+        model, _ = train_sku_model(sku, processed_data, start_date, end_date, watermark=watermark,
+                                   registry=registry, horizon=horizon)
+        return model, 'refit'
+    
+    # Fine-tune a copy: the cached entry may be serving predictions right now.
+    model = copy.deepcopy(entry.model)
+    n_samples = update_series_model(model, series.to_numpy(), len(new_data))
+    logger.info(f"Updated SKU {sku} on {len(new_data)} new days ({n_samples} windows)")
+    sku_data = series.to_numpy()
+    registry.save(sku, model, dict(
+        entry.metadata,
+        watermark=watermark,
+        end_date=end_date.isoformat(),
+        n_samples=n_samples,
+        last_window=sku_data[-SEQUENCE_LENGTH:].tolist(),
+        data_end=f"{series.index[-1]:%Y-%m-%d}",
+        updates=entry.metadata.get("updates", 0) + 1,
+        trained_at=datetime.now().isoformat(),
+    ))
+    return model, 'update'
+
+def refresh_model(start_date, end_date, sku, registry=None, horizon=FORECAST_HORIZON):
+    """Like train_model, but warm-starts from the registry when possible."""
+    loader = DataLoader()
+    processed_data = loader.load_daily_demand(start_date, end_date)
+    return refresh_sku_model(sku, processed_data, start_date, end_date,
+                             watermark=data_watermark(loader, processed_data),
+                             registry=registry, horizon=horizon)
 
-def make_prediction(sku, days_to_predict=30):
+def forecast_from_window(model, window, days_to_predict):
+    """Roll the model forward from the last SEQUENCE_LENGTH observed days."""
+    window = np.asarray(window, dtype=float)
+    if model.scaler is not None:
+        window = model.scaler.transform(window)
+    input_data = window.reshape((SEQUENCE_LENGTH, 1))  # Reshape to (sequence_length, features)
+    prediction = model.predict(input_data, days_to_predict)
+    if model.scaler is not None:
+        prediction = model.scaler.inverse_transform(prediction)
+    return prediction
+
+@timed_stage("make_prediction")
+def make_prediction(sku, days_to_predict=30, registry=None, watermark=None, cache=None):
     logger.info(f"Making prediction for SKU: {sku}, days: {days_to_predict}")
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=90)
+    registry = registry or get_registry()
+    cache = cache or get_forecast_cache()
     
-    model, historical_data = train_model(start_date, end_date, sku)
+    # Serve from the registry when a fresh model exists; otherwise bring the
+    # entry up to date, fine-tuning it when the refit policy allows.
+    entry = registry.get(sku, watermark)
+    if entry is None:
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=PREDICTION_HISTORY_DAYS)
+        refresh_model(start_date, end_date, sku, registry=registry)
+        entry = registry.get(sku, allow_stale=True)
     
-    # Prepare the input for prediction
-    input_data = historical_data[-7:]  # Use the last 7 days of data
-    input_data = input_data.reshape((7, 1))  # Reshape to (sequence_length, features)
+    # A registry entry pins both the model and the data it was trained on, so
+    # its training timestamp and watermark fully determine the forecast.
+    key = forecast_key(sku, days_to_predict, f"lstm-{entry.metadata['trained_at']}", entry.watermark)
+    cached = cache.get(key)
+    if cached is not None:
+        logger.info(f"Serving cached prediction for SKU: {sku}")
+        return cached.copy()
     
+    input_data = np.array(entry.metadata["last_window"])  # The last 7 days of data
     logger.info(f"Input data shape for prediction: {input_data.shape}")
     
-    prediction = model.predict(input_data, days_to_predict)
+    prediction = forecast_from_window(entry.model, input_data, days_to_predict)
+    cache.put(key, prediction)
     
     logger.info(f"Prediction completed. Result shape: {prediction.shape}")
+    return prediction.copy()
+
+def train_global_model(start_date, end_date, epochs=20, registry=None):
+    """Train one LSTM across every SKU instead of one model per SKU."""
+    logger.info(f"Training global model, start_date: {start_date}, end_date: {end_date}")
+    loader = DataLoader()
+    processed_data = loader.load_daily_demand(start_date, end_date)
+    model = fit_global_model(processed_data, start_date, end_date, watermark=data_watermark(loader, processed_data),
+                             epochs=epochs, registry=registry)
+    return model, processed_data
+
+def fit_global_model(processed_data, start_date, end_date, watermark=None, epochs=20, registry=None):
+    """Train the global model on an already loaded demand matrix, registering
+    it if a registry is given. Every SKU in processed_data is covered."""
+    model = GlobalForecastModel(hidden_size=64, num_layers=2, sequence_length=SEQUENCE_LENGTH)
+    model.fit(processed_data, epochs=epochs)
+    logger.info("Global model training completed")
+    if registry is not None:
+        registry.save_global(model, {
+            "watermark": watermark,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "epochs": epochs,
+        })
+    return model
+
+def make_global_predictions(days_to_predict=30, model=None, processed_data=None):
+    """Forecast the whole catalog in one batched pass; returns a days x SKUs frame."""
+    if model is None or processed_data is None:
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=PREDICTION_HISTORY_DAYS)
+        model, processed_data = train_global_model(start_date, end_date)
+    prediction = model.predict(processed_data, days_to_predict)
+    logger.info(f"Global prediction completed. Result shape: {prediction.shape}")
     return prediction
 
+@timed_stage("make_batch_prediction")
+def make_batch_prediction(skus, days_to_predict=30, registry=None, watermark=None, cache=None):
+    """Forecast many SKUs at once.
+
+    SKUs covered by a fresh registered global model (trained by a 'global'
+    job) are forecast together in one batched pass and cached like
+    make_prediction's forecasts. SKUs with no fresh per-SKU model are
+    brought up to date from one shared load of demand data instead of one
+    load each; the rest are served by make_prediction. Returns
+    (predictions, errors), both dicts keyed by SKU.
+    """
+    registry = registry or get_registry()
+    cache = cache or get_forecast_cache()
+    predictions, errors = {}, {}
+    
+    entry = registry.get_global(watermark)
+    if entry is not None:
+        version = f"global-{entry.metadata['trained_at']}"
+        covered = set(entry.model.skus)
+        pending = []
+        for sku in skus:
+            if sku not in covered:
+                continue
+            cached = cache.get(forecast_key(sku, days_to_predict, version, entry.watermark))
+            if cached is not None:
+                predictions[sku] = cached.copy()
+            else:
+                pending.append(sku)
+        if pending:
+            forecast = entry.model.predict_latest(pending, days_to_predict)
+            for sku in forecast.columns:
+                prediction = forecast[sku].to_numpy()
+                cache.put(forecast_key(sku, days_to_predict, version, entry.watermark), prediction)
+                predictions[sku] = prediction.copy()
+    
+    remaining = [sku for sku in skus if sku not in predictions]
+    cold = [sku for sku in remaining if registry.get(sku, watermark) is None]
+    if cold:
+        errors.update(refresh_sku_models(cold, registry=registry))
+    
+    for sku in remaining:
+        if sku in errors:
+            continue
+        try:
+            predictions[sku] = make_prediction(sku, days_to_predict, registry=registry, watermark=watermark,
+                                               cache=cache)
+        except Exception as e:
+            logger.error(f"Batch prediction failed for SKU {sku}: {str(e)}")
+            errors[sku] = str(e)
+    
+    logger.info(f"Batch prediction completed for {len(predictions)} SKUs, {len(errors)} errors")
+    return predictions, errors
+
+def refresh_sku_models(skus, registry=None, days=PREDICTION_HISTORY_DAYS):
+    """Bring several SKUs' registered models up to date from one load of the
+    last `days` days of demand. Returns a dict of SKU -> error for SKUs that
+    could not be trained."""
+    registry = registry or get_registry()
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+    try:
+        loader = DataLoader()
+        processed_data = loader.load_daily_demand(start_date, end_date)
+    except Exception as e:
+        logger.error(f"Could not load demand for {len(skus)} SKUs: {str(e)}")
+        return dict.fromkeys(skus, str(e))
+    watermark = data_watermark(loader, processed_data)
+    errors = {}
+    for sku in skus:
+        try:
+            refresh_sku_model(sku, processed_data, start_date, end_date, watermark=watermark, registry=registry)
+        except Exception as e:
+            logger.error(f"Batch training failed for SKU {sku}: {str(e)}")
+            errors[sku] = str(e)
+    return errors
+
+def preload_models(registry=None, limit=None):
+    """Load the most recently trained registered models into the registry's
+    memory cache and run one forward pass per model shape, so the first
+    request does not pay for disk loads or torch's lazy initialization.
+    Returns the number of models loaded."""
+    registry = registry or get_registry()
+    limit = registry.cache_size if limit is None else limit
+    warmed = set()
+    loaded = 0
+    for sku in registry.recent_skus(limit):
+        try:
+            entry = registry.get(sku, allow_stale=True)
+        except Exception as e:
+            logger.error(f"Could not preload model for SKU {sku}: {str(e)}")
+            continue
+        loaded += 1
+        shape = tuple(sorted(entry.model.config.items()))
+        if shape not in warmed:
+            entry.model.predict(np.zeros((SEQUENCE_LENGTH, 1), dtype=np.float32), 1)
+            warmed.add(shape)
+    entry = registry.get_global()
+    if entry is not None:
+        entry.model.predict_latest(entry.model.skus[:1], 1)
+        loaded += 1
+    if not warmed:
+        # Nothing registered yet: still pay torch's first-call setup now.
+        InventoryForecastModel(output_size=FORECAST_HORIZON).predict(np.zeros((SEQUENCE_LENGTH, 1)), 1)
+    logger.info(f"Preloaded {loaded} models")
+    return loaded
+
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     sku = "BX-GU9X-YHC9"  # Example SKU
@@ -0,0 +1,361 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import numpy as np
+from metrics import timed_stage
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_KEY = "_global"
+
+
+class RegistryEntry:
+    def __init__(self, model, metadata):
+        self.model = model
+        self.metadata = metadata
+
+    @property
+    def trained_at(self):
+        return datetime.fromisoformat(self.metadata["trained_at"])
+
+    @property
+    def checked_at(self):
+        """When the entry was last trained or confirmed current against fresh data."""
+        checked_at = self.metadata.get("checked_at")
+        return max(self.trained_at, datetime.fromisoformat(checked_at)) if checked_at else self.trained_at
+
+    @property
+    def watermark(self):
+        return self.metadata.get("watermark")
+
+
+class RefitPolicy:
+    """Decides when a registered model may be updated in place and when it needs a full refit.
+
+    Incremental updates drift from what a fresh fit would give, so a full
+    refit is forced once the last one is older than ``max_age``, after
+    ``max_updates`` incremental updates, when more than ``max_new_days`` days
+    arrived since the model last saw data, or when the new data's mean has
+    moved more than ``max_drift`` scaler standard deviations (LSTM only).
+    """
+
+    def __init__(self, max_age=timedelta(days=7), max_updates=6, max_new_days=14, max_drift=3.0):
+        self.max_age = max_age
+        self.max_updates = max_updates
+        self.max_new_days = max_new_days
+        self.max_drift = max_drift
+
+    def refit_reason(self, metadata, new_days, new_values=None):
+        """Why a full refit is needed, or None if an incremental update is fine."""
+        if not metadata or "full_fit_at" not in metadata or "data_end" not in metadata:
+            return "no incremental metadata"
+        if datetime.now() - datetime.fromisoformat(metadata["full_fit_at"]) > self.max_age:
+            return f"last full fit older than {self.max_age}"
+        if metadata.get("updates", 0) >= self.max_updates:
+            return f"{metadata.get('updates', 0)} incremental updates since the last full fit"
+        if new_days > self.max_new_days:
+            return f"{new_days} new days since the last fit"
+        scaler = metadata.get("scaler")
+        if scaler and new_values is not None and len(new_values):
+            drift = abs(float(np.mean(new_values)) - scaler["mean"]) / scaler["scale"]
+            if drift > self.max_drift:
+                return f"demand level drifted {drift:.1f} standard deviations"
+        return None
+
+
+class ModelRegistry:
+    """On-disk store of trained per-SKU LSTMs with an in-memory LRU in front.
+
+    Each SKU gets a directory holding ``model.pt`` (the LSTMForecaster
+    state_dict) and ``metadata.json`` (hyperparameters, scaler, data
+    watermark, training window and the last input window). An entry is stale
+    once it was last trained or checked (see ``touch``) more than ``max_age``
+    ago, or was trained on a different data watermark than the caller's.
+
+    With a compiled ``backend`` ('torchscript' or 'onnx', see inference.py)
+    every saved model is also exported beside ``model.pt`` (int8-quantized
+    with ``quantize``) and loaded models are served from that artifact
+    using ``num_threads`` intra-op threads.
+    """
+
+    def __init__(self, root="model_registry", cache_size=32, max_age=timedelta(hours=24), refit_policy=None,
+                 backend='eager', quantize=False, num_threads=None):
+        self.root = root
+        self.cache_size = cache_size
+        self.max_age = max_age
+        self.refit_policy = refit_policy or RefitPolicy()
+        self.backend = backend
+        self.quantize = quantize
+        self.num_threads = num_threads
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _entry_dir(self, sku):
+        # Sanitizing alone maps different SKUs ("A/B", "A_B") to one name, so
+        # a digest of the raw SKU keeps their directories apart.
+        name = re.sub(r'[^A-Za-z0-9._-]', '_', sku)
+        return os.path.join(self.root, f"{name}-{hashlib.sha1(sku.encode()).hexdigest()[:12]}")
+
+    @staticmethod
+    def _read_metadata(path, sku):
+        """Metadata at path, or None if it is missing or belongs to another SKU."""
+        if not os.path.exists(path):
+            return None
+        with open(path) as f:
+            metadata = json.load(f)
+        if metadata.get("sku", sku) != sku:
+            logger.warning(f"Registry entry at {path} belongs to SKU {metadata['sku']}, not {sku}")
+            return None
+        return metadata
+
+    def _remember(self, sku, entry):
+        with self._lock:
+            self._cache[sku] = entry
+            self._cache.move_to_end(sku)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def is_stale(self, entry, watermark=None):
+        if datetime.now() - entry.checked_at > self.max_age:
+            return True
+        return watermark is not None and entry.watermark != watermark
+
+    def save(self, sku, model, metadata):
+        import torch
+
+        entry_dir = self._entry_dir(sku)
+        os.makedirs(entry_dir, exist_ok=True)
+        metadata = dict(metadata, sku=sku, config=model.config,
+                        scaler=model.scaler.to_dict() if model.scaler else None,
+                        trained_at=metadata.get("trained_at", datetime.now().isoformat()))
+
+        # Write to temporary files and rename so readers never see half an entry.
+        model_path = os.path.join(entry_dir, "model.pt")
+        torch.save(model.model.state_dict(), model_path + ".tmp")
+        os.replace(model_path + ".tmp", model_path)
+        metadata = self._compile(entry_dir, model, metadata)
+        metadata_path = os.path.join(entry_dir, "metadata.json")
+        with open(metadata_path + ".tmp", "w") as f:
+            json.dump(metadata, f)
+        os.replace(metadata_path + ".tmp", metadata_path)
+
+        entry = RegistryEntry(model, metadata)
+        self._remember(sku, entry)
+        logger.info(f"Registered model for SKU {sku} (watermark {metadata.get('watermark')})")
+        return entry
+
+    def _compile(self, entry_dir, model, metadata):
+        """Export model for the configured backend; returns metadata recording the artifact."""
+        metadata = {key: value for key, value in metadata.items() if key != "artifact"}
+        if self.backend == 'eager':
+            return metadata
+        from inference import compile_model
+
+        try:
+            artifact = compile_model(model, entry_dir, self.backend, self.quantize,
+                                     metadata.get("sequence_length", 7), self.num_threads)
+        except Exception as e:
+            logger.error(f"Could not export model for SKU {metadata.get('sku')} to {self.backend}: {str(e)}")
+            return metadata
+        return dict(metadata, artifact=artifact) if artifact else metadata
+
+    def export(self, sku):
+        """Compile an already registered model for the configured backend."""
+        entry = self.get(sku, allow_stale=True)
+        if entry is None:
+            return None
+        entry_dir = self._entry_dir(sku)
+        metadata = self._compile(entry_dir, entry.model, entry.metadata)
+        self._write_metadata(entry_dir, metadata)
+        entry.metadata = metadata
+        return entry
+
+    def touch(self, sku):
+        """Mark a registered model as checked against current data without retraining it.
+
+        Restarts its ``max_age`` clock; ``trained_at``, and with it the
+        forecast cache key, is left alone since the model did not change.
+        """
+        entry = self.get(sku, allow_stale=True)
+        if entry is None:
+            return None
+        metadata = dict(entry.metadata, checked_at=datetime.now().isoformat())
+        self._write_metadata(self._entry_dir(sku), metadata)
+        entry.metadata = metadata
+        return entry
+
+    @staticmethod
+    def _write_metadata(entry_dir, metadata):
+        metadata_path = os.path.join(entry_dir, "metadata.json")
+        with open(metadata_path + ".tmp", "w") as f:
+            json.dump(metadata, f)
+        os.replace(metadata_path + ".tmp", metadata_path)
+
+    @timed_stage("registry_load")
+    def _load(self, sku):
+        # torch and the model classes are imported on first use so that
+        # importing the registry (e.g. from api.py) stays cheap.
+        import torch
+        from model import InventoryForecastModel, SeriesScaler
+
+        entry_dir = self._entry_dir(sku)
+        metadata = self._read_metadata(os.path.join(entry_dir, "metadata.json"), sku)
+        if metadata is None:
+            return None
+        model = InventoryForecastModel(**metadata["config"])
+        model.model.load_state_dict(torch.load(os.path.join(entry_dir, "model.pt")))
+        model.model.eval()
+        if metadata.get("scaler"):
+            model.scaler = SeriesScaler.from_dict(metadata["scaler"])
+        if self.num_threads:
+            torch.set_num_threads(self.num_threads)
+        artifact = metadata.get("artifact")
+        if self.backend != 'eager' and artifact and artifact["backend"] == self.backend \
+                and artifact["quantized"] == self.quantize:
+            from inference import load_runtime
+
+            model.runtime = load_runtime(os.path.join(entry_dir, artifact["path"]), self.backend, self.num_threads)
+        return RegistryEntry(model, metadata)
+
+    def get(self, sku, watermark=None, allow_stale=False):
+        """Return a fresh entry for sku, or None if it is missing or stale."""
+        with self._lock:
+            entry = self._cache.get(sku)
+            if entry is not None:
+                self._cache.move_to_end(sku)
+        if entry is None:
+            entry = self._load(sku)
+            if entry is None:
+                return None
+            self._remember(sku, entry)
+        if not allow_stale and self.is_stale(entry, watermark):
+            logger.info(f"Registry entry for SKU {sku} is stale")
+            return None
+        return entry
+
+    def recent_skus(self, limit=None):
+        """SKUs with a registered LSTM, most recently trained first."""
+        entries = []
+        for name in os.listdir(self.root):
+            metadata_path = os.path.join(self.root, name, "metadata.json")
+            if name != GLOBAL_KEY and os.path.exists(metadata_path):
+                entries.append((os.path.getmtime(metadata_path), name, metadata_path))
+        entries.sort(reverse=True)
+        skus = []
+        for _, name, metadata_path in entries:
+            if limit is not None and len(skus) >= limit:
+                break
+            with open(metadata_path) as f:
+                sku = json.load(f)["sku"]
+            # Skip directories get() would not find, e.g. from an older naming scheme.
+            if os.path.join(self.root, name) == self._entry_dir(sku):
+                skus.append(sku)
+        return skus
+
+    def save_global(self, model, metadata):
+        """Register the catalog-wide GlobalForecastModel under its own key."""
+        entry_dir = os.path.join(self.root, GLOBAL_KEY)
+        os.makedirs(entry_dir, exist_ok=True)
+        metadata = dict(metadata, trained_at=metadata.get("trained_at", datetime.now().isoformat()))
+
+        model_path = os.path.join(entry_dir, "model.pt")
+        model.save(model_path + ".tmp")
+        os.replace(model_path + ".tmp", model_path)
+        metadata_path = os.path.join(entry_dir, "metadata.json")
+        with open(metadata_path + ".tmp", "w") as f:
+            json.dump(metadata, f)
+        os.replace(metadata_path + ".tmp", metadata_path)
+
+        entry = RegistryEntry(model, metadata)
+        self._remember(GLOBAL_KEY, entry)
+        logger.info(f"Registered global model for {len(model.skus)} SKUs")
+        return entry
+
+    def get_global(self, watermark=None):
+        from global_model import GlobalForecastModel
+
+        with self._lock:
+            entry = self._cache.get(GLOBAL_KEY)
+        if entry is None:
+            entry_dir = os.path.join(self.root, GLOBAL_KEY)
+            metadata_path = os.path.join(entry_dir, "metadata.json")
+            if not os.path.exists(metadata_path):
+                return None
+            with open(metadata_path) as f:
+                metadata = json.load(f)
+            entry = RegistryEntry(GlobalForecastModel.load(os.path.join(entry_dir, "model.pt")), metadata)
+            self._remember(GLOBAL_KEY, entry)
+        if self.is_stale(entry, watermark):
+            logger.info("Registry entry for the global model is stale")
+            return None
+        return entry
+
+    def save_prophet(self, sku, model, metadata=None):
+        """Store a fitted Prophet model for sku as Prophet's JSON serialization,
+        with its fit metadata (full fit time, incremental update count) beside it."""
+        from prophet.serialize import model_to_json
+
+        entry_dir = self._entry_dir(sku)
+        os.makedirs(entry_dir, exist_ok=True)
+        path = os.path.join(entry_dir, "prophet.json")
+        with open(path + ".tmp", "w") as f:
+            f.write(model_to_json(model))
+        os.replace(path + ".tmp", path)
+        metadata = dict(metadata or {}, sku=sku,
+                        trained_at=(metadata or {}).get("trained_at", datetime.now().isoformat()))
+        metadata_path = os.path.join(entry_dir, "prophet_metadata.json")
+        with open(metadata_path + ".tmp", "w") as f:
+            json.dump(metadata, f)
+        os.replace(metadata_path + ".tmp", metadata_path)
+        logger.info(f"Registered Prophet model for SKU {sku}")
+
+    def get_prophet(self, sku):
+        entry = self.get_prophet_entry(sku)
+        return entry.model if entry is not None else None
+
+    def get_prophet_entry(self, sku):
+        from prophet.serialize import model_from_json
+
+        entry_dir = self._entry_dir(sku)
+        path = os.path.join(entry_dir, "prophet.json")
+        if not os.path.exists(path):
+            return None
+        metadata_path = os.path.join(entry_dir, "prophet_metadata.json")
+        metadata = self._read_metadata(metadata_path, sku)
+        if metadata is None and os.path.exists(metadata_path):
+            return None
+        with open(path) as f:
+            model = model_from_json(f.read())
+        return RegistryEntry(model, metadata or {})
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Process-wide registry configured from MODEL_REGISTRY_*, REFIT_* and INFERENCE_* environment variables."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry(
+                root=os.getenv('MODEL_REGISTRY_PATH', 'model_registry'),
+                cache_size=int(os.getenv('MODEL_REGISTRY_CACHE_SIZE', 32)),
+                max_age=timedelta(hours=float(os.getenv('MODEL_MAX_AGE_HOURS', 24))),
+                refit_policy=RefitPolicy(
+                    max_age=timedelta(days=float(os.getenv('REFIT_MAX_AGE_DAYS', 7))),
+                    max_updates=int(os.getenv('REFIT_MAX_UPDATES', 6)),
+                    max_new_days=int(os.getenv('REFIT_MAX_NEW_DAYS', 14)),
+                    max_drift=float(os.getenv('REFIT_MAX_DRIFT', 3.0))
+                ),
+                backend=os.getenv('INFERENCE_BACKEND', 'eager'),
+                quantize=os.getenv('INFERENCE_QUANTIZE', '').lower() in ('1', 'true', 'yes'),
+                num_threads=int(os.getenv('INFERENCE_THREADS', 0)) or None
+            )
+        return _registry
@@ -0,0 +1,139 @@
+import logging
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Prophet's default interval_width: yhat_lower/yhat_upper bound an 80% interval.
+INTERVAL_WIDTH = 0.8
+
+
+class ForecastArrays:
+    """Forecasts for many SKUs stacked into (n_skus, horizon) arrays.
+
+    Rows follow ``skus``; columns are consecutive forecast days starting
+    the day after the last observation. ``yhat_lower``/``yhat_upper`` may
+    be None for point forecasts.
+    """
+
+    def __init__(self, skus, yhat, yhat_lower=None, yhat_upper=None):
+        self.skus = pd.Index(skus, name='sku')
+        self.yhat = np.asarray(yhat, dtype=np.float64)
+        self.yhat_lower = None if yhat_lower is None else np.asarray(yhat_lower, dtype=np.float64)
+        self.yhat_upper = None if yhat_upper is None else np.asarray(yhat_upper, dtype=np.float64)
+        if self.yhat.ndim != 2 or len(self.yhat) != len(self.skus):
+            raise ValueError(f"yhat must have shape (n_skus, horizon), got {self.yhat.shape}")
+
+    @property
+    def horizon(self):
+        return self.yhat.shape[1]
+
+    @classmethod
+    def from_forecasts(cls, forecasts, horizon):
+        """Stack the last ``horizon`` rows of per-SKU Prophet forecast frames."""
+        skus = list(forecasts)
+        columns = {}
+        for column in ('yhat', 'yhat_lower', 'yhat_upper'):
+            columns[column] = np.stack([forecasts[sku][column].to_numpy()[-horizon:] for sku in skus]) \
+                if skus else np.empty((0, horizon))
+        return cls(skus, **columns)
+
+    @classmethod
+    def from_long(cls, frame):
+        """Reshape a long (sku, ds, yhat[, yhat_lower, yhat_upper]) frame.
+
+        Every SKU must cover the same dates, as the batch forecast table does.
+        """
+        frame = frame.sort_values(['sku', 'ds'])
+        skus = frame['sku'].unique()
+        if len(frame) % max(len(skus), 1):
+            raise ValueError("Every SKU must have the same number of forecast days")
+        shape = (len(skus), len(frame) // max(len(skus), 1))
+        bands = {}
+        for column in ('yhat_lower', 'yhat_upper'):
+            if column in frame and frame[column].notna().all():
+                bands[column] = frame[column].to_numpy(dtype=np.float64).reshape(shape)
+        return cls(skus, frame['yhat'].to_numpy(dtype=np.float64).reshape(shape), **bands)
+
+
+def _per_sku(value, skus, name, fill=None):
+    """Broadcast a scalar, dict, Series or array to one value per SKU."""
+    if isinstance(value, dict):
+        value = pd.Series(value, dtype=np.float64)
+    if isinstance(value, pd.Series):
+        value = value.reindex(skus)
+        if fill is None and value.isna().any():
+            raise ValueError(f"{name} is missing for {int(value.isna().sum())} SKUs")
+        return value.fillna(fill).to_numpy(dtype=np.float64)
+    value = np.asarray(value, dtype=np.float64)
+    if value.ndim == 0:
+        return np.full(len(skus), float(value))
+    if value.shape != (len(skus),):
+        raise ValueError(f"{name} must have one value per SKU, got shape {value.shape}")
+    return value
+
+
+def _window_sum(cumulative, days):
+    # Sum of the first `days` columns per row, from a cumsum with a zero column prepended.
+    return np.take_along_axis(cumulative, days[:, None], axis=1)[:, 0]
+
+
+def reorder_plan(forecasts, current_stock, lead_time=7, review_period=7, service_level=0.95,
+                 interval_width=INTERVAL_WIDTH):
+    """Reorder points and order quantities for every SKU at once.
+
+    For each SKU, lead-time demand is the forecast summed over ``lead_time``
+    days. Daily forecast error is read off the Prophet interval
+    (upper - lower spans ``interval_width`` of a normal), summed in
+    variance over the lead time and scaled to ``service_level`` to give the
+    safety stock. The reorder point is lead-time demand plus safety stock.
+    A SKU at or below it orders up to the demand over lead time plus
+    ``review_period`` plus the safety stock for that longer cover period.
+
+    ``lead_time`` and ``review_period`` are days, either scalars or per SKU
+    (dict, Series or array); ``current_stock`` is per SKU and missing SKUs
+    count as zero stock. Returns one row per SKU.
+    """
+    if not isinstance(forecasts, ForecastArrays):
+        raise TypeError("forecasts must be ForecastArrays")
+    skus = forecasts.skus
+    horizon = forecasts.horizon
+    stock = _per_sku(current_stock, skus, 'current_stock', fill=0.0)
+    lead = _per_sku(lead_time, skus, 'lead_time').astype(np.int64)
+    cover = lead + _per_sku(review_period, skus, 'review_period').astype(np.int64)
+    if (lead < 0).any() or (cover > horizon).any():
+        raise ValueError(f"lead_time + review_period must be between 0 and the forecast horizon ({horizon} days)")
+
+    yhat = np.clip(forecasts.yhat, 0, None)
+    demand = np.zeros((len(skus), horizon + 1))
+    np.cumsum(yhat, axis=1, out=demand[:, 1:])
+    lead_demand = _window_sum(demand, lead)
+    cover_demand = _window_sum(demand, cover)
+
+    if forecasts.yhat_lower is not None and forecasts.yhat_upper is not None:
+        interval_z = NormalDist().inv_cdf(0.5 + interval_width / 2)
+        sigma = np.clip(forecasts.yhat_upper - forecasts.yhat_lower, 0, None) / (2 * interval_z)
+        variance = np.zeros((len(skus), horizon + 1))
+        np.cumsum(sigma ** 2, axis=1, out=variance[:, 1:])
+        service_z = NormalDist().inv_cdf(service_level)
+        safety_stock = service_z * np.sqrt(_window_sum(variance, lead))
+        cover_safety_stock = service_z * np.sqrt(_window_sum(variance, cover))
+    else:
+        safety_stock = cover_safety_stock = np.zeros(len(skus))
+
+    reorder_point = lead_demand + safety_stock
+    order_up_to = cover_demand + cover_safety_stock
+    reorder = stock <= reorder_point
+    order_quantity = np.where(reorder, np.ceil(np.clip(order_up_to - stock, 0, None)), 0.0)
+
+    return pd.DataFrame({
+        'current_stock': stock,
+        'lead_time_demand': lead_demand,
+        'safety_stock': safety_stock,
+        'reorder_point': reorder_point,
+        'cover_safety_stock': cover_safety_stock,
+        'order_up_to': order_up_to,
+        'reorder': reorder,
+        'order_quantity': order_quantity,
+    }, index=skus)
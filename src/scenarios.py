@@ -0,0 +1,169 @@
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from prophet.serialize import model_to_json, model_from_json
+from tqdm import tqdm
+from reorder import INTERVAL_WIDTH
+from metrics import timed_stage, count_items
+
+logger = logging.getLogger(__name__)
+
+RESULT_COLUMNS = ['scenario', 'sku', 'ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+
+class Scenario:
+    """A what-if applied to every SKU's forecast.
+
+    ``regressors`` overrides future values of the models' extra regressors
+    (scalars or one value per forecast day); regressors not overridden keep
+    their last observed value. ``multiplier`` scales demand (a scalar or one
+    value per day, e.g. a promotion lift). Both apply only between ``start``
+    and ``end`` when given. ``trend_change`` adds that much demand per day
+    to the trend, ramping from ``start`` (or the first forecast day).
+    """
+
+    def __init__(self, name, regressors=None, multiplier=1.0, trend_change=0.0, start=None, end=None):
+        self.name = name
+        self.regressors = regressors or {}
+        self.multiplier = multiplier
+        self.trend_change = trend_change
+        self.start = start
+        self.end = end
+
+    def window(self, ds):
+        mask = np.ones(len(ds), dtype=bool)
+        if self.start is not None:
+            mask &= ds >= pd.Timestamp(self.start)
+        if self.end is not None:
+            mask &= ds <= pd.Timestamp(self.end)
+        return mask
+
+
+def _future_frame(model, periods):
+    # Columns predict needs besides ds keep their last observed value.
+    future = model.make_future_dataframe(periods=periods, include_history=False)
+    columns = list(model.extra_regressors)
+    columns += [s['condition_name'] for s in model.seasonalities.values() if s['condition_name'] is not None]
+    if model.growth == 'logistic':
+        columns += ['cap']
+    for column in columns:
+        future[column] = model.history[column].iloc[-1]
+    return model.setup_dataframe(future)
+
+
+def simulate_model(model, scenarios, periods, uncertainty_samples=0, interval_width=INTERVAL_WIDTH, seed=0):
+    """Point forecasts (and optionally intervals) for every scenario from one fitted Prophet model.
+
+    Trend and seasonal features are evaluated once; each scenario only
+    changes regressor contributions, the trend ramp and the multiplier, so
+    all scenarios are computed as (n_scenarios, periods) array operations.
+    Parameters are posterior means (the MAP fit for models fitted without
+    MCMC). With ``uncertainty_samples``, trend paths and observation noise
+    are drawn once and shared by every scenario, so scenario differences
+    are not blurred by sampling noise; 0 skips sampling and leaves the
+    bounds as NaN. Returns (ds, yhat, yhat_lower, yhat_upper) with arrays of
+    shape (n_scenarios, periods).
+    """
+    df = _future_frame(model, periods)
+    ds = pd.DatetimeIndex(df['ds'])
+    features, _, component_cols, _ = model.make_all_seasonality_features(df)
+    X = features.to_numpy()
+    beta = np.nanmean(model.params['beta'], axis=0)
+    additive = component_cols['additive_terms'].to_numpy().astype(bool)
+    multiplicative = component_cols['multiplicative_terms'].to_numpy().astype(bool)
+    regressor_columns = {name: features.columns.get_loc(name) for name in model.extra_regressors}
+    fixed = np.ones(len(beta), dtype=bool)
+    fixed[list(regressor_columns.values())] = False
+
+    base_additive = X[:, additive & fixed] @ beta[additive & fixed] * model.y_scale
+    base_multiplicative = X[:, multiplicative & fixed] @ beta[multiplicative & fixed]
+    n_scenarios = len(scenarios)
+    add = np.tile(base_additive, (n_scenarios, 1))
+    mul = np.tile(base_multiplicative, (n_scenarios, 1))
+    windows = np.stack([scenario.window(ds) for scenario in scenarios]) if scenarios else np.zeros((0, len(ds)))
+
+    for name, column in regressor_columns.items():
+        props = model.extra_regressors[name]
+        values = np.tile(X[:, column], (n_scenarios, 1))
+        for i, scenario in enumerate(scenarios):
+            if name in scenario.regressors:
+                override = (np.broadcast_to(scenario.regressors[name], len(ds)) - props['mu']) / props['std']
+                values[i] = np.where(windows[i], override, values[i])
+        if props['mode'] == 'additive':
+            add += values * beta[column] * model.y_scale
+        else:
+            mul += values * beta[column]
+
+    start = np.array([np.argmax(w) if w.any() else len(ds) for w in windows], dtype=np.int64)
+    ramp = np.clip(np.arange(len(ds))[np.newaxis, :] - start[:, np.newaxis] + 1, 0, None) \
+        * np.array([scenario.trend_change for scenario in scenarios])[:, np.newaxis]
+    multiplier = np.stack([np.where(windows[i], np.broadcast_to(scenario.multiplier, len(ds)), 1.0)
+                           for i, scenario in enumerate(scenarios)]) if scenarios else np.ones((0, len(ds)))
+
+    trend = np.asarray(model.predict_trend(df), dtype=np.float64)
+    yhat = ((trend + ramp) * (1 + mul) + add) * multiplier
+    yhat_lower = yhat_upper = np.full_like(yhat, np.nan)
+    if uncertainty_samples:
+        np.random.seed(seed)  # Prophet draws trend changepoints from the global generator.
+        trends = model.sample_predictive_trend_vectorized(df, uncertainty_samples)  # (samples, periods)
+        sigma = np.nanmean(model.params['sigma_obs']) * model.y_scale
+        noise = np.random.default_rng(seed).normal(0, sigma, trends.shape)
+        samples = ((trends[np.newaxis] + ramp[:, np.newaxis]) * (1 + mul[:, np.newaxis]) + add[:, np.newaxis]
+                   + noise[np.newaxis]) * multiplier[:, np.newaxis]
+        yhat_lower, yhat_upper = np.percentile(samples, [50 * (1 - interval_width), 50 * (1 + interval_width)],
+                                               axis=1)
+    return ds, yhat, yhat_lower, yhat_upper
+
+
+def _tidy(sku, scenarios, ds, yhat, yhat_lower, yhat_upper):
+    n_scenarios, periods = yhat.shape
+    return pd.DataFrame({
+        'scenario': np.repeat([scenario.name for scenario in scenarios], periods),
+        'sku': sku,
+        'ds': np.tile(ds.to_numpy(), n_scenarios),
+        'yhat': yhat.ravel(),
+        'yhat_lower': yhat_lower.ravel(),
+        'yhat_upper': yhat_upper.ravel(),
+    }, columns=RESULT_COLUMNS)
+
+
+def _simulate_sku(sku, model_json, scenarios, periods, uncertainty_samples, interval_width, seed):
+    # Runs in a worker process; models travel as JSON like forecaster._forecast_sku.
+    model = model_from_json(model_json)
+    return sku, _tidy(sku, scenarios,
+                      *simulate_model(model, scenarios, periods, uncertainty_samples, interval_width, seed))
+
+
+@timed_stage("scenario_simulation")
+def simulate_scenarios(models, scenarios, periods=30, uncertainty_samples=0, interval_width=INTERVAL_WIDTH,
+                       n_jobs=1, seed=0):
+    """Run every scenario for every model in ``models`` (SKU -> fitted Prophet).
+
+    Returns (results, errors): one tidy frame with a row per scenario, SKU
+    and forecast day, and a dict of SKU -> error message for SKUs that
+    failed. n_jobs > 1 spreads SKUs over a process pool.
+    """
+    frames, errors = [], {}
+    count_items("scenario_simulation", len(models) * len(scenarios), unit="scenario_skus")
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            futures = {executor.submit(_simulate_sku, sku, model_to_json(model), scenarios, periods,
+                                       uncertainty_samples, interval_width, seed): sku
+                       for sku, model in models.items()}
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Simulating scenarios"):
+                try:
+                    frames.append(future.result()[1])
+                except Exception as e:
+                    logger.error(f"Scenario simulation failed for SKU {futures[future]}: {str(e)}")
+                    errors[futures[future]] = str(e)
+    else:
+        for sku, model in tqdm(models.items(), desc="Simulating scenarios"):
+            try:
+                frames.append(_tidy(sku, scenarios, *simulate_model(model, scenarios, periods, uncertainty_samples,
+                                                                     interval_width, seed)))
+            except Exception as e:
+                logger.error(f"Scenario simulation failed for SKU {sku}: {str(e)}")
+                errors[sku] = str(e)
+    results = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RESULT_COLUMNS)
+    return results.sort_values(['scenario', 'sku', 'ds'], ignore_index=True), errors
@@ -0,0 +1,64 @@
+import numpy as np
+from datetime import datetime, timedelta
+
+DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.0000000'
+
+
+def sku_name(index):
+    return f"SKU-{index:05d}"
+
+
+def generate_products(n_skus=100, seed=0):
+    rng = np.random.default_rng(seed)
+    prices = np.round(rng.uniform(2, 200, n_skus), 2)
+    return [
+        {"productId": i + 1, "sku": sku_name(i), "name": f"Product {i}", "price": float(prices[i])}
+        for i in range(n_skus)
+    ]
+
+
+def generate_orders(n_orders=1000, n_skus=100, days=365, items_per_order=3,
+                    start_date=datetime(2023, 1, 1), seed=0):
+    """ShipStation-shaped order dicts with long-tailed SKU popularity.
+
+    Line items per order are uniform on [1, 2 * items_per_order - 1], so the
+    mean is items_per_order and n_orders * items_per_order approximates the
+    total number of line items.
+    """
+    rng = np.random.default_rng(seed)
+    weights = 1 / np.arange(1, n_skus + 1) ** 1.1
+    weights /= weights.sum()
+    unit_prices = np.round(rng.uniform(2, 200, n_skus), 2)
+
+    offsets = np.sort(rng.integers(0, days * 86400, n_orders))
+    n_items = rng.integers(1, max(2, 2 * items_per_order), n_orders)
+    sku_index = rng.choice(n_skus, size=int(n_items.sum()), p=weights)
+    quantities = rng.integers(1, 5, size=len(sku_index))
+    modify_lag = rng.integers(0, 3 * 86400, n_orders)
+
+    orders = []
+    position = 0
+    for i in range(n_orders):
+        created = start_date + timedelta(seconds=int(offsets[i]))
+        items = []
+        for j in range(position, position + n_items[i]):
+            sku = sku_index[j]
+            items.append({
+                "orderItemId": j + 1,
+                "sku": sku_name(sku),
+                "name": f"Product {sku}",
+                "quantity": int(quantities[j]),
+                "unitPrice": float(unit_prices[sku]),
+            })
+        position += n_items[i]
+        orders.append({
+            "orderId": i + 1,
+            "orderNumber": str(100000 + i),
+            "orderDate": created.strftime(DATE_FORMAT),
+            "createDate": created.strftime(DATE_FORMAT),
+            "modifyDate": (created + timedelta(seconds=int(modify_lag[i]))).strftime(DATE_FORMAT),
+            "orderStatus": "shipped",
+            "orderTotal": round(sum(item["quantity"] * item["unitPrice"] for item in items), 2),
+            "items": items,
+        })
+    return orders
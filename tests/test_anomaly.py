@@ -0,0 +1,62 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from anomaly import ANOMALY_COLUMNS, RunningStats
+from cache import ForecastCache
+from forecaster import SKUForecaster
+
+
+def test_batched_updates_match_full_sample_statistics():
+    rng = np.random.default_rng(0)
+    values = rng.normal(5, 2, (60, 4))
+    values[rng.random(values.shape) < 0.2] = np.nan
+    stats = RunningStats()
+
+    for start in range(0, 60, 13):
+        stats.update(values[start:start + 13], ['a', 'b', 'c', 'd'])
+
+    expected = pd.DataFrame(values, columns=['a', 'b', 'c', 'd'])
+    frame = stats.to_frame()
+    np.testing.assert_allclose(frame['count'], expected.count())
+    np.testing.assert_allclose(frame['mean'], expected.mean())
+    np.testing.assert_allclose(frame['std'], expected.std(ddof=1))
+
+
+def test_new_skus_are_added_in_later_batches():
+    stats = RunningStats(['a'])
+    stats.update(np.array([[1.0], [3.0]]), ['a'])
+    stats.update(np.array([[5.0, 2.0], [7.0, 4.0]]), ['a', 'b'])
+
+    frame = stats.to_frame()
+    assert frame.index.tolist() == ['a', 'b']
+    assert frame['mean'].tolist() == [4.0, 3.0]
+    np.testing.assert_allclose(frame['std'], [np.std([1, 3, 5, 7], ddof=1), np.std([2, 4], ddof=1)])
+
+
+def test_zscores_need_two_observations():
+    stats = RunningStats()
+    stats.update(np.array([[2.0, 1.0], [4.0, np.nan]]), ['a', 'b'])
+
+    scores = stats.zscores(np.array([[3.0 + np.sqrt(2), 1.0]]), ['a', 'b'])
+
+    np.testing.assert_allclose(scores[0, 0], 1.0)
+    assert np.isnan(scores[0, 1])
+
+
+def test_statistical_engine_skus_are_skipped(caplog):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(rng.poisson(10, (60, 3)).astype(float), columns=['a', 'b', 'c'],
+                        index=pd.date_range('2024-01-01', periods=60, name='createDate'))
+    forecaster = SKUForecaster(data, forecast_periods=7, engine='seasonal_naive', cache=ForecastCache())
+    forecaster.train_models()
+    assert set(forecaster.engines) == {'a', 'b', 'c'}
+
+    with caplog.at_level(logging.INFO, logger='forecaster'):
+        anomalies = forecaster.detect_all_anomalies()
+
+    assert anomalies.empty
+    assert list(anomalies.columns) == ANOMALY_COLUMNS
+    assert "Skipping anomaly detection for 3 SKUs" in caplog.text
+    assert forecaster.detect_anomalies('a').empty
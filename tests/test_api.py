@@ -0,0 +1,77 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import numpy as np
+import pytest
+
+import api
+import predict
+
+
+def post_all(*requests):
+    async def run():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*(client.post(path, json=body) for path, body in requests))
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+    lock = threading.Lock()
+
+    def make_prediction(sku, days_to_predict=30):
+        with lock:
+            calls.append((sku, days_to_predict))
+        # Long enough for the other requests to arrive while this one runs.
+        time.sleep(0.3)
+        if sku == "missing":
+            raise ValueError(f"No demand history for SKU {sku}")
+        return np.arange(days_to_predict, dtype=float)
+
+    def make_batch_prediction(skus, days_to_predict=30):
+        predictions, errors = {}, {}
+        for sku in skus:
+            if sku == "missing":
+                errors[sku] = f"No demand history for SKU {sku}"
+            else:
+                predictions[sku] = np.full(days_to_predict, float(len(sku)))
+        return predictions, errors
+
+    monkeypatch.setattr(predict, "make_prediction", make_prediction)
+    monkeypatch.setattr(predict, "make_batch_prediction", make_batch_prediction)
+    return calls
+
+
+def test_identical_predictions_share_one_computation(calls):
+    responses = post_all(*[("/predict", {"sku": "A", "days": 5})] * 4, ("/predict", {"sku": "A", "days": 7}))
+
+    assert [response.status_code for response in responses] == [200] * 5
+    assert all(response.json() == {"sku": "A", "predictions": [0.0, 1.0, 2.0, 3.0, 4.0]}
+               for response in responses[:4])
+    assert len(responses[4].json()["predictions"]) == 7
+    assert sorted(calls) == [("A", 5), ("A", 7)]
+    assert api.inflight_predictions == {}
+
+
+def test_failed_prediction_is_a_400_for_every_waiter(calls):
+    responses = post_all(*[("/predict", {"sku": "missing", "days": 5})] * 3)
+
+    assert [response.status_code for response in responses] == [400] * 3
+    assert "No demand history" in responses[0].json()["detail"]
+    assert calls == [("missing", 5)]
+
+
+def test_batch_returns_results_and_errors(calls):
+    [response] = post_all(("/predict/batch", {"skus": ["AB", "missing", "XYZ"], "days": 3}))
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "results": [{"sku": "AB", "predictions": [2.0, 2.0, 2.0]},
+                    {"sku": "XYZ", "predictions": [3.0, 3.0, 3.0]}],
+        "errors": {"missing": "No demand history for SKU missing"},
+    }
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import RESULT_COLUMNS, Backtester, load_results, save_results
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2023-01-01", periods=120, freq="D", name="createDate")
+    weekly = 5 + 2 * np.sin(2 * np.pi * np.arange(120) / 7)
+    data = pd.DataFrame({
+        "A": rng.poisson(weekly),
+        "B": rng.poisson(weekly * 3),
+        # Too little history to be scored.
+        "C": np.r_[np.zeros(115), np.ones(5)],
+    }, index=index).astype(float)
+    data.columns.name = "sku"
+    return data
+
+
+@pytest.fixture(scope="module")
+def backtester(data):
+    backtester = Backtester(data, initial="60 days", period="30 days", horizon="14 days", n_jobs=1)
+    backtester.run()
+    return backtester
+
+
+def test_run_scores_every_trainable_sku_at_every_cutoff(backtester):
+    results = backtester.results
+    assert list(results.columns) == RESULT_COLUMNS
+    assert backtester.failed == {}
+    assert sorted(results["sku"].unique()) == ["A", "B"]
+    assert sorted(results["cutoff"].unique()) == backtester.cutoffs
+    # 14 scored days per SKU and cutoff, each after its cutoff.
+    assert results.groupby(["sku", "cutoff"]).size().eq(14).all()
+    assert (results["ds"] > results["cutoff"]).all()
+
+
+def test_metrics_match_a_direct_computation(backtester):
+    metrics = backtester.metrics().set_index(["model", "sku"])
+    results = backtester.results
+
+    for sku in ["A", "B"]:
+        rows = results[results["sku"] == sku]
+        error = rows["yhat"] - rows["y"]
+        nonzero = rows["y"] != 0
+        row = metrics.loc[("prophet", sku)]
+        assert row["mae"] == pytest.approx(error.abs().mean())
+        assert row["rmse"] == pytest.approx(np.sqrt((error ** 2).mean()))
+        assert row["mape"] == pytest.approx((error[nonzero].abs() / rows["y"][nonzero]).mean())
+        assert row["n"] == len(rows)
+
+    summary = backtester.summary().set_index("model")
+    assert summary.loc["prophet", "n"] == len(results)
+    assert summary.loc["prophet", "mae"] == pytest.approx((results["yhat"] - results["y"]).abs().mean())
+
+
+def test_results_round_trip(backtester, tmp_path):
+    path = tmp_path / "results.npz"
+    save_results(backtester.results, path)
+
+    loaded = load_results(path)
+    expected = backtester.results.reset_index(drop=True)
+    assert list(loaded.columns) == RESULT_COLUMNS
+    assert list(loaded["model"]) == list(expected["model"])
+    assert list(loaded["sku"]) == list(expected["sku"])
+    np.testing.assert_array_equal(loaded["cutoff"].to_numpy("datetime64[s]"), expected["cutoff"].to_numpy("datetime64[s]"))
+    np.testing.assert_array_equal(loaded["ds"].to_numpy("datetime64[s]"), expected["ds"].to_numpy("datetime64[s]"))
+    # Values are stored as float32.
+    np.testing.assert_allclose(loaded["y"], expected["y"], rtol=1e-6)
+    np.testing.assert_allclose(loaded["yhat"], expected["yhat"], rtol=1e-6)
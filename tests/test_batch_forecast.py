@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, func, select
+
+from batch_forecast import forecasts_table, load_forecasts, write_forecasts
+
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'forecasts.db'}")
+
+
+def make_forecasts(skus=("A", "B"), days=5, offset=0.0):
+    ds = pd.date_range("2024-03-01", periods=days)
+    frames = [
+        pd.DataFrame({
+            "sku": sku,
+            "ds": ds,
+            "yhat": [float(i) + offset for i in range(days)],
+            "yhat_lower": [float(i) - 1 + offset for i in range(days)],
+            "yhat_upper": [None] * days if sku == "B" else [float(i) + 1 + offset for i in range(days)],
+        })
+        for sku in skus
+    ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def row_count(engine, run_id):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(func.count()).select_from(forecasts_table).where(forecasts_table.c.run_id == run_id)
+        ).scalar()
+
+
+def test_rerunning_a_run_replaces_its_rows(engine):
+    assert write_forecasts(engine, make_forecasts(), "run-1", "prophet") == 10
+    assert write_forecasts(engine, make_forecasts(offset=100.0), "run-1", "prophet") == 10
+    write_forecasts(engine, make_forecasts(skus=("C",)), "run-2", "prophet")
+
+    assert row_count(engine, "run-1") == 10
+    assert row_count(engine, "run-2") == 5
+    assert load_forecasts(engine, run_id="run-1")["yhat"].min() == 100.0
+
+
+def test_load_forecasts_round_trips(engine):
+    forecasts = make_forecasts()
+    write_forecasts(engine, forecasts, "run-1", "lstm")
+
+    loaded = load_forecasts(engine, run_id="run-1")
+    assert set(loaded["run_id"]) == {"run-1"}
+    assert set(loaded["model"]) == {"lstm"}
+    pd.testing.assert_frame_equal(
+        loaded[["sku", "ds", "yhat", "yhat_lower", "yhat_upper"]].astype({"ds": "datetime64[ns]"}),
+        forecasts.astype({"ds": "datetime64[ns]", "yhat_upper": float}),
+    )
+
+    one_sku = load_forecasts(engine, sku="B")
+    assert list(one_sku["sku"].unique()) == ["B"]
+    assert one_sku["yhat_upper"].isna().all()
+
+
+def test_load_forecasts_without_runs_is_empty(engine):
+    write_forecasts(engine, make_forecasts().iloc[:0], "run-1", "prophet")
+    assert load_forecasts(engine).empty
@@ -0,0 +1,77 @@
+import asyncio
+
+import httpx
+import numpy as np
+
+import api
+import cache
+from cache import ForecastCache, forecast_key
+
+
+def test_memory_tier_evicts_least_recently_used():
+    forecasts = ForecastCache(max_entries=2)
+    forecasts.put("a", 1)
+    forecasts.put("b", 2)
+    assert forecasts.get("a") == 1
+    forecasts.put("c", 3)
+
+    assert forecasts.get("b") is None
+    assert forecasts.get("a") == 1 and forecasts.get("c") == 3
+    assert forecasts.stats()["memory_entries"] == 2
+
+
+def test_disk_tier_serves_what_memory_evicted(tmp_path):
+    path = str(tmp_path / "cache.db")
+    forecasts = ForecastCache(max_entries=1, disk_path=path)
+    forecasts.put("a", np.arange(3.0))
+    forecasts.put("b", np.arange(4.0))
+
+    np.testing.assert_array_equal(forecasts.get("a"), np.arange(3.0))
+    assert (forecasts.memory_hits, forecasts.disk_hits) == (0, 1)
+    # Read back from disk, "a" is in memory again.
+    forecasts.get("a")
+    assert (forecasts.memory_hits, forecasts.disk_hits) == (1, 1)
+
+    # Another process sharing the file sees the same entries.
+    np.testing.assert_array_equal(ForecastCache(disk_path=path).get("b"), np.arange(4.0))
+
+
+def test_disk_tier_evicts_least_recently_read(tmp_path):
+    forecasts = ForecastCache(max_entries=1, disk_path=str(tmp_path / "cache.db"), max_disk_entries=2)
+    forecasts.put("a", 1)
+    forecasts.put("b", 2)
+    forecasts.get("a")
+    forecasts.put("c", 3)
+    forecasts._memory.clear()
+
+    assert forecasts.get("b") is None
+    assert forecasts.get("a") == 1 and forecasts.get("c") == 3
+
+
+def test_new_model_version_misses():
+    forecasts = ForecastCache()
+    forecasts.put(forecast_key("A", 30, "v1", "2024-03-01"), 1)
+
+    assert forecasts.get(forecast_key("A", 30, "v1", "2024-03-01")) == 1
+    assert forecasts.get(forecast_key("A", 30, "v2", "2024-03-01")) is None
+    assert forecasts.get(forecast_key("A", 30, "v1", "2024-03-02")) is None
+    assert forecasts.get(forecast_key("A", 14, "v1", "2024-03-01")) is None
+
+
+def test_stats_endpoint_reports_counters(monkeypatch):
+    forecasts = ForecastCache()
+    monkeypatch.setattr(cache, "_cache", forecasts)
+    forecasts.put("a", 1)
+    forecasts.get("a")
+    forecasts.get("a")
+    forecasts.get("b")
+
+    async def fetch():
+        transport = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.get("/cache/stats")
+
+    response = asyncio.run(fetch())
+    assert response.status_code == 200
+    assert response.json() == {"memory_hits": 2, "disk_hits": 0, "misses": 1,
+                               "hit_rate": 2 / 3, "memory_entries": 1}
@@ -0,0 +1,43 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from data_loader import DataLoader
+from mock_shipstation import MockShipStation
+from synthetic import generate_orders
+
+START = datetime(2023, 1, 1)
+END = datetime(2023, 3, 1)
+
+
+def ns(frame):
+    # Index resolution differs between builders (us vs ns); only the days matter.
+    return frame.set_axis(frame.index.as_unit('ns'))
+
+
+@pytest.fixture
+def loader(monkeypatch):
+    server = MockShipStation(generate_orders(n_orders=2500, n_skus=30, days=59, start_date=START), rate_limit=100000)
+    monkeypatch.setenv('SHIPSTATION_API_KEY', 'key')
+    monkeypatch.setenv('SHIPSTATION_API_SECRET', 'secret')
+    monkeypatch.setenv('SHIPSTATION_BASE_URL', server.start())
+    monkeypatch.delenv('ORDER_STORE_PATH', raising=False)
+    yield DataLoader()
+    server.stop()
+
+
+def test_streamed_demand_matches_preprocessed_orders(loader):
+    expected = loader.preprocess_data(loader.load_order_history(START, END))
+
+    streamed = loader.load_daily_demand(START, END)
+
+    pd.testing.assert_frame_equal(ns(streamed), ns(expected.astype(float)), check_freq=False)
+
+
+def test_sparse_streamed_demand_matches_dense(loader):
+    dense = loader.load_daily_demand(START, END)
+
+    sparse = loader.load_daily_demand(START, END, sparse=True)
+
+    pd.testing.assert_frame_equal(ns(sparse.to_frame()), ns(dense), check_freq=False)
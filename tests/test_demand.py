@@ -0,0 +1,107 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from demand import DailyDemandAccumulator, SparseDemand, daily_demand_matrix, flatten_items
+from synthetic import generate_orders
+
+
+@pytest.fixture(scope="module")
+def line_items():
+    return flatten_items(pd.DataFrame(generate_orders(n_orders=2000, n_skus=60, days=90)))
+
+
+@pytest.fixture(scope="module")
+def dense(line_items):
+    return daily_demand_matrix(line_items)
+
+
+def test_multi_line_orders_keep_every_line():
+    orders = pd.DataFrame({
+        'createDate': ['2023-01-01T08:00:00', '2023-01-01T17:30:00', '2023-01-04T09:00:00'],
+        'items': [
+            [{'sku': 'A', 'quantity': 2}, {'sku': 'B', 'quantity': 1}, {'sku': 'A', 'quantity': 3}],
+            [{'sku': 'B', 'quantity': '4'}],
+            [{'sku': 'C', 'quantity': 1}, 'not-an-item'],
+        ],
+    })
+
+    line_items = flatten_items(orders)
+    assert list(line_items['sku']) == ['A', 'B', 'A', 'B', 'C']
+    assert list(line_items['quantity']) == [2.0, 1.0, 3.0, 4.0, 1.0]
+
+    daily = daily_demand_matrix(line_items)
+    assert list(daily.index) == list(pd.date_range('2023-01-01', '2023-01-04'))
+    assert daily.loc['2023-01-01'].to_dict() == {'A': 5.0, 'B': 5.0, 'C': 0.0}
+    # Days without orders are present and zero-filled.
+    assert (daily.loc['2023-01-02':'2023-01-03'] == 0).all().all()
+    assert daily.loc['2023-01-04'].to_dict() == {'A': 0.0, 'B': 0.0, 'C': 1.0}
+
+
+def test_empty_orders_give_an_empty_matrix():
+    line_items = flatten_items(pd.DataFrame({'createDate': [], 'items': []}))
+    assert line_items.empty
+
+    daily = daily_demand_matrix(line_items)
+    pd.testing.assert_frame_equal(daily, DailyDemandAccumulator().to_frame())
+
+
+def test_matches_the_streaming_accumulator():
+    orders = generate_orders(n_orders=500, n_skus=20, days=45)
+    accumulator = DailyDemandAccumulator()
+    for start in range(0, len(orders), 100):
+        accumulator.add_orders(orders[start:start + 100])
+
+    daily = daily_demand_matrix(flatten_items(pd.DataFrame(orders)))
+    streamed = accumulator.to_frame()
+    pd.testing.assert_frame_equal(
+        daily.astype(float).set_axis(daily.index.as_unit('ns')),
+        streamed.set_axis(streamed.index.as_unit('ns')),
+        check_freq=False, check_names=False,
+    )
+
+
+def test_sparse_matches_the_dense_matrix(line_items, dense):
+    sparse = SparseDemand.from_line_items(line_items)
+
+    assert sparse.shape == dense.shape
+    assert sparse.index.equals(dense.index)
+    assert list(sparse.columns) == list(dense.columns)
+    pd.testing.assert_frame_equal(sparse.to_frame(), dense.astype(float), check_freq=False)
+    assert len(sparse.quantity) == int((dense.to_numpy() != 0).sum())
+
+
+def test_per_sku_access_matches_dense(line_items, dense):
+    sparse = SparseDemand.from_line_items(line_items)
+    sku = dense.columns[5]
+
+    pd.testing.assert_series_equal(sparse[sku], dense[sku].astype(float), check_names=False, check_freq=False)
+    pd.testing.assert_frame_equal(sparse[[sku]], dense[[sku]].astype(float), check_freq=False)
+    frame = sparse.prophet_frame(sku)
+    np.testing.assert_array_equal(frame['ds'], dense.index)
+    np.testing.assert_allclose(frame['y'], dense[sku])
+
+
+def test_day_statistics(dense):
+    frame = dense.copy()
+    frame.iloc[:, 0] = 0
+    frame.iloc[:10, 1] = 0
+    sparse = SparseDemand.from_frame(frame)
+
+    np.testing.assert_array_equal(sparse.active_days(), frame.ne(0).sum().to_numpy())
+    assert sparse.first_days()[0] == len(frame)
+    assert sparse.first_days()[1] == frame.iloc[:, 1].to_numpy().nonzero()[0][0]
+
+
+def test_saved_store_memory_maps_and_pickles_as_its_path(line_items, tmp_path):
+    sparse = SparseDemand.from_line_items(line_items)
+    sparse.save(str(tmp_path))
+
+    mapped = SparseDemand.load(str(tmp_path))
+    restored = pickle.loads(pickle.dumps(mapped))
+
+    assert isinstance(mapped.quantity, np.memmap)
+    assert len(pickle.dumps(mapped)) < 1000
+    pd.testing.assert_frame_equal(restored.to_frame(), sparse.to_frame())
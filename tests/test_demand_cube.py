@@ -0,0 +1,125 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from demand_cube import DemandCube
+from synthetic import generate_orders
+
+
+@pytest.fixture(scope="module")
+def orders():
+    orders = generate_orders(n_orders=3000, n_skus=40, days=60)
+    for i, order in enumerate(orders):
+        order['orderTotal'] = 10.0 + i % 7
+    return orders
+
+
+@pytest.fixture(scope="module")
+def items(orders):
+    rows = [(order['createDate'][:10], item['sku'], item['quantity'], item['quantity'] * item['unitPrice'])
+            for order in orders for item in order['items']]
+    items = pd.DataFrame(rows, columns=['day', 'sku', 'quantity', 'revenue'])
+    items['day'] = pd.to_datetime(items['day'])
+    return items
+
+
+def pages(orders, size=500):
+    return [orders[i:i + size] for i in range(0, len(orders), size)]
+
+
+def test_range_sums_match_pandas(orders, items):
+    cube = DemandCube.from_orders(pages(orders))
+    start, end = pd.Timestamp('2023-01-10'), pd.Timestamp('2023-02-05')
+    window = items[(items['day'] >= start) & (items['day'] <= end)]
+    order_days = pd.to_datetime(pd.Series([order['createDate'][:10] for order in orders]))
+    in_window = (order_days >= start) & (order_days <= end)
+
+    totals = cube.totals(start, end)
+    assert totals['quantity'] == pytest.approx(window['quantity'].sum())
+    assert totals['revenue'] == pytest.approx(window['revenue'].sum())
+    assert totals['orders'] == in_window.sum()
+    assert totals['order_total'] == pytest.approx(sum(o['orderTotal'] for o, keep in zip(orders, in_window) if keep))
+
+    expected = window.groupby('sku')['quantity'].sum().reindex(cube.skus, fill_value=0)
+    pd.testing.assert_series_equal(cube.sku_totals(start, end), expected.astype(float), check_names=False)
+
+
+def test_daily_and_history_match_pandas(orders, items):
+    cube = DemandCube.from_orders(pages(orders))
+    start, end = '2023-01-20', '2023-01-31'
+
+    daily = cube.daily(start, end)
+    expected = items.groupby('day')[['quantity', 'revenue']].sum().loc[start:end]
+    np.testing.assert_allclose(daily[['quantity', 'revenue']].to_numpy(), expected.to_numpy())
+    assert list(daily.index) == list(pd.date_range(start, end))
+
+    sku = cube.skus[3]
+    history = items[items['sku'] == sku].groupby('day')['quantity'].sum()
+    expected = history.reindex(pd.date_range(start, end), fill_value=0).to_numpy()
+    np.testing.assert_allclose(cube.history(sku, start, end).to_numpy(), expected)
+
+
+@pytest.mark.parametrize("by", ['quantity', 'revenue'])
+def test_top_skus_match_pandas(orders, items, by):
+    cube = DemandCube.from_orders(pages(orders))
+
+    top = cube.top_skus('2023-01-01', '2023-03-31', top_n=5, by=by)
+
+    expected = items.groupby('sku')[by].sum().sort_values(ascending=False, kind='stable').head(5)
+    assert top['sku'].tolist() == expected.index.tolist()
+    np.testing.assert_allclose(top[by], expected.to_numpy())
+
+
+def test_incremental_updates_match_a_full_build(orders):
+    full = DemandCube.from_orders(pages(orders))
+    cube = DemandCube.from_orders(pages(orders[1000:2000]))
+    # Later days are appended, earlier days prepended.
+    for page in pages(orders[2000:] + orders[:1000], size=300):
+        cube.add_orders(page)
+
+    assert cube.start == full.start and cube.n_days == full.n_days
+    for field in ('quantity', 'revenue'):
+        pd.testing.assert_series_equal(cube.sku_totals(field=field).sort_index(),
+                                       full.sku_totals(field=field).sort_index())
+    np.testing.assert_allclose(cube.daily()[['quantity', 'revenue']], full.daily()[['quantity', 'revenue']])
+
+
+def test_extending_with_pages_matches_a_full_build(orders):
+    full = DemandCube.from_orders(pages(orders))
+    ordered = sorted(orders, key=lambda order: order['createDate'])
+    cube = DemandCube.from_orders(pages([o for o in ordered if o['createDate'] < '2023-02-01']))
+
+    # Reload the last day as get_demand_cube does, then fold the rest in at once.
+    cube.truncate('2023-01-31')
+    cube.add_pages(pages([o for o in ordered if o['createDate'] >= '2023-01-31'], size=300))
+
+    assert cube.start == full.start and cube.n_days == full.n_days
+    pd.testing.assert_series_equal(cube.sku_totals().sort_index(), full.sku_totals().sort_index())
+    np.testing.assert_allclose(cube.daily(), full.daily())
+
+
+def test_orders_inside_the_cube_do_not_resize_it(orders):
+    cube = DemandCube.from_orders(pages(orders))
+    quantity, days = cube.cumulative['quantity'], cube.day_cumulative
+
+    cube.add_orders(orders[:50])
+
+    assert cube.cumulative['quantity'] is quantity
+    assert cube.day_cumulative is days
+
+
+def test_truncate_drops_the_day_and_everything_after(orders):
+    cube = DemandCube.from_orders(pages(orders))
+
+    cube.truncate('2023-02-01')
+
+    assert str(cube.end) == '2023-01-31'
+    assert cube.totals()['quantity'] == pytest.approx(cube.daily()['quantity'].sum())
+
+
+def test_empty_cube():
+    cube = DemandCube.from_orders([])
+
+    assert cube.end is None
+    assert cube.totals()['orders'] == 0
+    assert cube.top_skus(top_n=3).empty
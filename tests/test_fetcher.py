@@ -0,0 +1,104 @@
+import time
+import tracemalloc
+
+import pytest
+
+from fetcher import PageFetcher, RateLimiter
+from mock_shipstation import MockShipStation
+from synthetic import generate_orders
+
+
+@pytest.fixture
+def orders():
+    return generate_orders(n_orders=3000, n_skus=20, days=30)
+
+
+def fetch_all(server, max_workers=4, **kwargs):
+    fetcher = PageFetcher(server.start(), {}, max_workers=max_workers, **kwargs)
+    statuses = []
+    get = fetcher.session.get
+
+    def recording_get(*args, **kw):
+        response = get(*args, **kw)
+        statuses.append(response.status_code)
+        return response
+
+    fetcher.session.get = recording_get
+    try:
+        pages = list(fetcher.iter_pages('orders', {'pageSize': 100}, 'orders'))
+    finally:
+        fetcher.close()
+        server.stop()
+    return pages, statuses
+
+
+def test_pages_come_back_in_order(orders):
+    pages, statuses = fetch_all(MockShipStation(orders, rate_limit=1000))
+
+    assert [order['orderId'] for page in pages for order in page] == [order['orderId'] for order in orders]
+    assert statuses == [200] * 30
+
+
+def test_workers_stay_within_the_rate_limit_across_windows(orders):
+    pages, statuses = fetch_all(MockShipStation(orders, rate_limit=10, window=1))
+
+    assert sum(len(page) for page in pages) == len(orders)
+    assert 429 not in statuses
+
+
+def test_server_errors_are_retried(orders):
+    pages, statuses = fetch_all(MockShipStation(orders, rate_limit=1000, fail_first=2), backoff=0.01)
+
+    assert sum(len(page) for page in pages) == len(orders)
+    assert statuses.count(500) == 2
+
+
+def test_limiter_refills_to_the_last_known_limit_at_reset():
+    limiter = RateLimiter()
+    limiter.acquire()
+    limiter.release()
+    limiter.update({'X-Rate-Limit-Limit': '5', 'X-Rate-Limit-Remaining': '0', 'X-Rate-Limit-Reset': '0'})
+
+    assert limiter.remaining == 0
+    limiter.acquire()
+    assert limiter.remaining == 4
+
+
+def test_limiter_does_not_raise_the_budget_from_stale_responses():
+    limiter = RateLimiter()
+    limiter.update({'X-Rate-Limit-Limit': '10', 'X-Rate-Limit-Remaining': '9', 'X-Rate-Limit-Reset': '60'})
+    for _ in range(3):
+        limiter.acquire()
+    limiter.release()
+    limiter.update({'X-Rate-Limit-Limit': '10', 'X-Rate-Limit-Remaining': '8', 'X-Rate-Limit-Reset': '60'})
+
+    # Two requests are still in flight and the local budget already counts all three.
+    assert limiter.remaining == 6
+
+
+def test_limiter_waits_for_the_window_after_a_429():
+    limiter = RateLimiter()
+    limiter.block(0.2)
+    start = time.monotonic()
+    limiter.acquire()
+
+    assert time.monotonic() - start >= 0.2
+
+
+def test_pages_are_released_once_consumed():
+    server = MockShipStation(generate_orders(n_orders=12000, n_skus=50, days=60), rate_limit=100000)
+    fetcher = PageFetcher(server.start(), {}, max_workers=4)
+    usage = []
+    tracemalloc.start()
+    try:
+        for page in fetcher.iter_pages('orders', {'pageSize': 200}, 'orders'):
+            del page
+            usage.append(tracemalloc.get_traced_memory()[0])
+    finally:
+        tracemalloc.stop()
+        fetcher.close()
+        server.stop()
+
+    assert len(usage) == 60
+    # Every page held would add ~0.3 MiB; only the read-ahead window may be live.
+    assert max(usage[40:]) - max(usage[:20]) < 1024 * 1024
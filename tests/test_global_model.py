@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+
+from demand import SparseDemand
+from global_model import GlobalForecastModel
+
+
+def ns(frame):
+    return frame.set_axis(frame.index.as_unit('ns'))
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    days = pd.date_range("2024-01-01", periods=90, freq="D", name="createDate")
+    levels = np.array([1.0, 5.0, 20.0, 100.0])
+    weekly = 1 + 0.3 * np.sin(2 * np.pi * np.arange(90) / 7)
+    frame = pd.DataFrame(rng.poisson(np.outer(weekly, levels)).astype(float), index=days,
+                         columns=pd.Index(["slow", "medium", "fast", "bulk"], name="sku"))
+    frame.loc[:"2024-01-20", "slow"] = 0.0
+    return frame
+
+
+@pytest.fixture(scope="module")
+def model(data):
+    torch.manual_seed(0)
+    model = GlobalForecastModel(hidden_size=16, num_layers=1)
+    history = model.fit(data, epochs=5, batch_size=64)
+    assert 1 <= history["epochs_run"] <= 5
+    return model
+
+
+def test_fit_learns_one_scale_per_sku(data, model):
+    assert model.skus == list(data.columns)
+    np.testing.assert_allclose(model.means, data.mean().to_numpy())
+    np.testing.assert_allclose(model.scales, data.std(ddof=0).to_numpy())
+    np.testing.assert_array_equal(model.last_window, data.to_numpy()[-7:].T)
+
+
+def test_predict_forecasts_every_sku(data, model):
+    forecast = model.predict(data, 14)
+
+    assert forecast.shape == (14, 4)
+    assert list(forecast.columns) == list(data.columns)
+    assert list(forecast.index) == list(pd.date_range("2024-03-31", periods=14, freq="D"))
+    assert np.isfinite(forecast.to_numpy()).all()
+    # Per-SKU scaling puts each forecast near its own SKU's level.
+    assert forecast["bulk"].mean() > forecast["fast"].mean() > forecast["medium"].mean()
+
+
+def test_batched_forecast_matches_per_sku_rollouts(data, model):
+    forecast = model.predict(data, 10)
+
+    for i, sku in enumerate(model.skus):
+        window = (data[sku].to_numpy()[-7:] - model.means[i]) / model.scales[i]
+        single = model.forecaster.predict(window[:, np.newaxis], 10) * model.scales[i] + model.means[i]
+        np.testing.assert_allclose(forecast[sku].to_numpy(), single, rtol=1e-5, atol=1e-4)
+
+
+def test_predict_variants_agree(data, model):
+    forecast = model.predict(data, 7)
+
+    pd.testing.assert_frame_equal(model.predict_latest(["fast", "unknown", "slow"], 7), forecast[["fast", "slow"]])
+    pd.testing.assert_frame_equal(ns(model.predict(SparseDemand.from_frame(data), 7)), ns(forecast), check_freq=False)
+    # Unknown SKUs in the data are ignored.
+    pd.testing.assert_frame_equal(model.predict(data.assign(new=1.0), 7), forecast)
+
+
+def test_save_and_load_round_trip(data, model, tmp_path):
+    path = str(tmp_path / "model.pt")
+    model.save(path)
+
+    loaded = GlobalForecastModel.load(path)
+    assert loaded.skus == model.skus and loaded.last_date == model.last_date
+    pd.testing.assert_frame_equal(loaded.predict(data, 7), model.predict(data, 7))
+
+
+def test_fit_needs_more_than_one_window(data):
+    with pytest.raises(ValueError):
+        GlobalForecastModel().fit(data.iloc[:7])
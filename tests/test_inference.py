@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+import pytest
+import torch
+
+import inference
+from inference import compile_model, load_runtime, parity_error
+from model import InventoryForecastModel
+
+
+@pytest.fixture(scope="module")
+def model():
+    torch.manual_seed(0)
+    series = np.sin(np.arange(200) / 7 * 2 * np.pi).astype(np.float32)
+    windows = np.lib.stride_tricks.sliding_window_view(series, 8)
+    model = InventoryForecastModel(hidden_size=16, num_layers=2)
+    model.fit(windows[:, :7, np.newaxis], windows[:, 7:], epochs=30, batch_size=32)
+    return model
+
+
+@pytest.fixture
+def windows():
+    return np.random.default_rng(1).standard_normal((16, 7, 1)).astype(np.float32)
+
+
+def eager_forecast(model, windows, steps=14):
+    runtime, model.runtime = model.runtime, None
+    try:
+        return model.predict(windows, steps)
+    finally:
+        model.runtime = runtime
+
+
+@pytest.mark.parametrize("backend, quantized, tolerance", [
+    ("torchscript", False, inference.PARITY_TOLERANCE),
+    ("torchscript", True, inference.QUANTIZED_PARITY_TOLERANCE),
+    ("onnx", False, inference.PARITY_TOLERANCE),
+])
+def test_exports_match_the_eager_model(model, windows, tmp_path, backend, quantized, tolerance):
+    if backend == "onnx":
+        pytest.importorskip("onnx")
+        pytest.importorskip("onnxruntime")
+    expected = eager_forecast(model, windows)
+
+    artifact = compile_model(model, str(tmp_path), backend=backend, quantized=quantized)
+    try:
+        assert artifact is not None
+        assert artifact["parity_error"] <= tolerance
+        assert os.listdir(tmp_path) == [inference.ARTIFACTS[backend]]
+        # A runtime loaded from the saved artifact agrees with the eager module.
+        runtime = load_runtime(str(tmp_path / artifact["path"]), backend)
+        assert parity_error(model.model, runtime) <= tolerance
+        # Recursive rollouts feed errors back, so allow them to grow with the steps.
+        np.testing.assert_allclose(model.predict(windows, 14), expected, atol=14 * tolerance)
+    finally:
+        model.runtime = None
+
+
+def test_export_outside_tolerance_is_not_served(model, tmp_path, monkeypatch):
+    monkeypatch.setattr(inference, "PARITY_TOLERANCE", -1.0)
+
+    assert compile_model(model, str(tmp_path)) is None
+    assert model.runtime is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_onnx_does_not_quantize(model, tmp_path):
+    with pytest.raises(ValueError):
+        inference.export_module(model.model, str(tmp_path / "model.onnx"), backend="onnx", quantized=True)
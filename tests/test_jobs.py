@@ -0,0 +1,84 @@
+import time
+
+import pytest
+
+from jobs import JobQueue
+
+
+def wait_for(queue, job_id, statuses=("done", "failed"), timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job['status'] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} still {queue.get(job_id)['status']}")
+
+
+def test_queued_and_running_jobs_survive_reopening(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path=path)
+    running = queue.submit(model='prophet', skus=['A', 'B'], days=30, workers=2, incremental=False)
+    queued = queue.submit(model='lstm')
+    # Claim the first job as a worker would, then "crash" before it finishes.
+    assert queue._claim()['id'] == running
+
+    reopened = JobQueue(path=path, runner=lambda job, report: {})
+    job = reopened.get(running)
+    assert job['status'] == 'running'
+    assert (job['model'], job['skus'], job['days'], job['workers'], job['incremental']) == \
+        ('prophet', ['A', 'B'], 30, 2, False)
+    assert reopened.get(queued)['status'] == 'queued'
+
+
+def test_start_requeues_and_runs_interrupted_jobs(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path=path)
+    job_id = queue.submit(skus=['A'])
+    queue._claim()
+    queue._update(job_id, progress_done=3, progress_total=10)
+
+    seen = []
+
+    def runner(job, report_progress):
+        seen.append(job['id'])
+        report_progress(1, 1)
+        return {"trained": 1}
+
+    reopened = JobQueue(path=path, runner=runner, poll_interval=0.01)
+    reopened.start()
+    try:
+        job = wait_for(reopened, job_id)
+    finally:
+        reopened.stop(timeout=5)
+
+    assert seen == [job_id]
+    assert job['status'] == 'done'
+    assert job['result'] == {"trained": 1}
+    assert (job['progress_done'], job['progress_total']) == (1, 1)
+    assert job['started_at'] is not None and job['finished_at'] is not None
+
+
+def test_failures_are_recorded(tmp_path):
+    def runner(job, report_progress):
+        report_progress(2, 5)
+        raise RuntimeError("no demand data")
+
+    queue = JobQueue(path=str(tmp_path / "jobs.db"), runner=runner, poll_interval=0.01)
+    queue.start()
+    try:
+        job = wait_for(queue, queue.submit(skus=['A']))
+    finally:
+        queue.stop(timeout=5)
+
+    assert job['status'] == 'failed'
+    assert job['error'] == "no demand data"
+    assert job['result'] is None
+    assert (job['progress_done'], job['progress_total']) == (2, 5)
+    assert job['finished_at'] is not None
+
+
+@pytest.mark.parametrize("kwargs", [{"model": "arima"}, {"workers": 0}])
+def test_invalid_jobs_are_rejected(tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        JobQueue(path=str(tmp_path / "jobs.db")).submit(**kwargs)
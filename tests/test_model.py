@@ -0,0 +1,93 @@
+import warnings
+
+import numpy as np
+import pytest
+import torch
+
+from model import InventoryForecastModel
+
+
+@pytest.fixture
+def windows():
+    rng = np.random.default_rng(0)
+    X = rng.standard_normal((200, 7, 1)).astype(np.float32)
+    # Pure noise targets: the validation loss bottoms out early.
+    y = rng.standard_normal((200, 1)).astype(np.float32)
+    return X, y
+
+
+def validation_loss(model, X, y):
+    model.model.eval()
+    with torch.no_grad():
+        return model.criterion(model.model(torch.from_numpy(X)), torch.from_numpy(y)).item()
+
+
+def test_early_stopping_restores_the_best_weights(windows):
+    torch.manual_seed(0)
+    X, y = windows
+    model = InventoryForecastModel(hidden_size=16, num_layers=1)
+
+    history = model.fit(X, y, epochs=500, batch_size=32, validation_split=0.2, patience=5)
+
+    assert history["epochs_run"] < 500
+    assert len(history["val_loss"]) == history["epochs_run"]
+    # Stopped exactly `patience` epochs after the best one...
+    assert history["epochs_run"] == history["best_epoch"] + 1 + 5
+    assert history["val_loss"][history["best_epoch"]] == min(history["val_loss"])
+    # ...and the weights are those of the best epoch, not the last.
+    assert validation_loss(model, X[-40:], y[-40:]) == pytest.approx(min(history["val_loss"]), rel=1e-5)
+
+
+def test_without_patience_every_epoch_runs(windows):
+    X, y = windows
+    model = InventoryForecastModel(hidden_size=8, num_layers=1)
+
+    history = model.fit(X, y, epochs=3, validation_split=0.2)
+
+    assert history["epochs_run"] == 3
+    assert history["best_epoch"] is None
+    assert len(history["train_loss"]) == len(history["val_loss"]) == 3
+
+
+def test_read_only_window_views_train_without_warnings():
+    series = np.sin(np.arange(60, dtype=np.float32))
+    view = np.lib.stride_tricks.sliding_window_view(series, 8)
+    assert not view.flags.writeable
+    model = InventoryForecastModel(hidden_size=8, num_layers=1)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        model.fit(view[:, :7, np.newaxis], view[:, 7:], epochs=1)
+
+
+@pytest.mark.parametrize("horizon, steps", [(1, 10), (4, 10), (12, 10)])
+def test_batched_predict_matches_per_series_rollouts(horizon, steps):
+    torch.manual_seed(0)
+    model = InventoryForecastModel(hidden_size=8, num_layers=2, output_size=horizon)
+    batch = np.random.default_rng(2).standard_normal((5, 7, 1)).astype(np.float32)
+
+    predictions = model.predict(batch, steps)
+
+    assert predictions.shape == (5, steps)
+    for window, prediction in zip(batch, predictions):
+        single = model.predict(window, steps)
+        assert single.shape == (steps,)
+        np.testing.assert_allclose(prediction, single, rtol=1e-5, atol=1e-6)
+
+
+def test_recursive_predict_feeds_outputs_back():
+    torch.manual_seed(0)
+    model = InventoryForecastModel(hidden_size=8, num_layers=1)
+    window = np.random.default_rng(3).standard_normal((7, 1)).astype(np.float32)
+
+    predictions = model.predict(window, 3)
+
+    # Each step is one forward pass over the previous step's window.
+    expected, current = [], window[:, 0].tolist()
+    model.model.eval()
+    with torch.no_grad():
+        for _ in range(3):
+            value = model.model(torch.tensor(current[-7:]).reshape(1, 7, 1)).item()
+            expected.append(value)
+            current.append(value)
+    np.testing.assert_allclose(predictions, expected, rtol=1e-5, atol=1e-6)
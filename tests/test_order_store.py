@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pytest
+
+from data_loader import DataLoader
+from mock_shipstation import MockShipStation
+from order_store import OrderStore
+from synthetic import generate_orders, DATE_FORMAT
+
+START = datetime(2023, 1, 1)
+END = datetime(2023, 3, 1)
+
+
+@pytest.fixture
+def shipstation():
+    server = MockShipStation(generate_orders(n_orders=300, n_skus=20, days=59, start_date=START), rate_limit=1000)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def loader(shipstation, tmp_path, monkeypatch):
+    monkeypatch.setenv('SHIPSTATION_API_KEY', 'key')
+    monkeypatch.setenv('SHIPSTATION_API_SECRET', 'secret')
+    monkeypatch.setenv('SHIPSTATION_BASE_URL', shipstation.base_url)
+    loader = DataLoader(store=OrderStore(str(tmp_path / "orders.db")))
+    yield loader
+    loader.store.close()
+
+
+def test_first_sync_copies_every_order(loader, shipstation):
+    df = loader.load_order_history(START, END)
+
+    assert len(df) == len(shipstation.orders)
+    assert loader.store.count() == len(shipstation.orders)
+    assert loader.store.get_covered_start() == START.strftime('%Y-%m-%dT%H:%M:%S')
+    assert loader.store.get_watermark() == max(order['modifyDate'] for order in shipstation.orders)[:19]
+
+
+def test_incremental_sync_fetches_only_modified_orders(loader, shipstation):
+    loader.load_order_history(START, END)
+    watermark = loader.store.get_watermark()
+    modified = datetime.strptime(watermark, '%Y-%m-%dT%H:%M:%S').replace(second=59).strftime(DATE_FORMAT)
+    shipstation.orders[0] = dict(shipstation.orders[0], orderStatus='cancelled', modifyDate=modified)
+    shipstation.orders.append(dict(shipstation.orders[1], orderId=10_000, modifyDate=modified))
+    requests_before = shipstation.request_count
+
+    df = loader.load_order_history(START, END)
+
+    assert shipstation.request_count - requests_before == 1
+    assert len(df) == len(shipstation.orders)
+    assert df.set_index('orderId').loc[shipstation.orders[0]['orderId'], 'orderStatus'] == 'cancelled'
+    assert loader.store.get_watermark() == modified[:19]
+
+
+def test_iter_orders_filters_by_create_date(tmp_path):
+    orders = generate_orders(n_orders=100, n_skus=5, days=10, start_date=START)
+    store = OrderStore(str(tmp_path / "orders.db"))
+    store.upsert_orders(orders)
+    store.upsert_orders(orders[:10])
+
+    window = [order for batch in store.iter_orders(datetime(2023, 1, 3), datetime(2023, 1, 5), batch_size=7)
+              for order in batch]
+
+    assert store.count() == len(orders)
+    assert [order['orderId'] for order in window] == [
+        order['orderId'] for order in orders
+        if '2023-01-03T00:00:00' <= order['createDate'][:19] <= '2023-01-05T00:00:00'
+    ]
+    store.close()
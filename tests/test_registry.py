@@ -0,0 +1,48 @@
+import os
+import shutil
+from datetime import datetime, timedelta
+
+import pytest
+
+from model import InventoryForecastModel
+from registry import ModelRegistry, GLOBAL_KEY
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path / "registry"), max_age=timedelta(hours=1))
+
+
+def save(registry, sku, **metadata):
+    return registry.save(sku, InventoryForecastModel(output_size=1), dict({"watermark": "w"}, **metadata))
+
+
+def test_skus_that_sanitize_alike_get_separate_entries(registry):
+    skus = ["A/B", "A_B", "A B", GLOBAL_KEY]
+    for i, sku in enumerate(skus):
+        save(registry, sku, n_samples=i)
+
+    reopened = ModelRegistry(registry.root)
+    assert [reopened.get(sku).metadata["n_samples"] for sku in skus] == list(range(len(skus)))
+    assert sorted(reopened.recent_skus()) == sorted(skus)
+    assert os.path.join(registry.root, GLOBAL_KEY) not in {registry._entry_dir(sku) for sku in skus}
+
+
+def test_entry_for_another_sku_is_not_loaded(registry):
+    save(registry, "A")
+    shutil.copytree(registry._entry_dir("A"), registry._entry_dir("B"))
+
+    assert ModelRegistry(registry.root).get("B") is None
+    assert ModelRegistry(registry.root).recent_skus() == ["A"]
+
+
+def test_touch_restarts_the_age_clock_without_changing_trained_at(registry):
+    trained_at = (datetime.now() - timedelta(hours=2)).isoformat()
+    save(registry, "A", trained_at=trained_at)
+    assert registry.get("A") is None
+
+    registry.touch("A")
+
+    entry = ModelRegistry(registry.root, max_age=timedelta(hours=1)).get("A")
+    assert entry is not None
+    assert entry.metadata["trained_at"] == trained_at
@@ -0,0 +1,59 @@
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from reorder import ForecastArrays, reorder_plan, INTERVAL_WIDTH
+
+Z = NormalDist().inv_cdf(0.5 + INTERVAL_WIDTH / 2)
+
+
+def forecasts(yhat, sigma):
+    yhat = np.asarray(yhat, dtype=float)
+    return ForecastArrays([f"SKU-{i}" for i in range(len(yhat))], yhat, yhat - Z * sigma, yhat + Z * sigma)
+
+
+def test_plan_matches_per_sku_formulas():
+    rng = np.random.default_rng(0)
+    yhat = rng.uniform(0, 20, (5, 30))
+    sigma = rng.uniform(0.5, 3, (5, 30))
+    lead = np.array([1, 3, 7, 10, 14])
+    review = np.array([7, 7, 0, 5, 14])
+    stock = pd.Series(rng.uniform(0, 200, 5), index=[f"SKU-{i}" for i in range(5)])
+    service_z = NormalDist().inv_cdf(0.95)
+
+    plan = reorder_plan(forecasts(yhat, sigma), stock, lead_time=lead, review_period=review)
+
+    for i, sku in enumerate(plan.index):
+        cover = lead[i] + review[i]
+        safety = service_z * np.sqrt((sigma[i, :lead[i]] ** 2).sum())
+        cover_safety = service_z * np.sqrt((sigma[i, :cover] ** 2).sum())
+        row = plan.loc[sku]
+        assert row['lead_time_demand'] == pytest.approx(yhat[i, :lead[i]].sum())
+        assert row['safety_stock'] == pytest.approx(safety)
+        assert row['reorder_point'] == pytest.approx(yhat[i, :lead[i]].sum() + safety)
+        assert row['cover_safety_stock'] == pytest.approx(cover_safety)
+        assert row['order_up_to'] == pytest.approx(yhat[i, :cover].sum() + cover_safety)
+        assert row['reorder'] == (stock[sku] <= row['reorder_point'])
+        expected = np.ceil(max(row['order_up_to'] - stock[sku], 0)) if row['reorder'] else 0
+        assert row['order_quantity'] == expected
+
+
+def test_point_forecasts_have_no_safety_stock():
+    plan = reorder_plan(ForecastArrays(['A', 'B'], np.ones((2, 14))), {'A': 3}, lead_time=7, review_period=7)
+
+    assert plan['safety_stock'].tolist() == [0, 0]
+    assert plan['order_quantity'].tolist() == [11, 14]
+
+
+def test_negative_forecasts_count_as_zero_demand():
+    plan = reorder_plan(forecasts([[-5.0] * 7 + [2.0] * 7], np.zeros((1, 14))), 0, lead_time=7, review_period=7)
+
+    assert plan['lead_time_demand'].iloc[0] == 0
+    assert plan['order_up_to'].iloc[0] == 14
+
+
+def test_cover_longer_than_the_horizon_is_rejected():
+    with pytest.raises(ValueError):
+        reorder_plan(ForecastArrays(['A'], np.ones((1, 10))), 0, lead_time=7, review_period=7)
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+from prophet import Prophet
+
+from scenarios import Scenario, simulate_model, simulate_scenarios
+
+PERIODS = 14
+
+
+@pytest.fixture(scope="module")
+def model():
+    rng = np.random.default_rng(0)
+    ds = pd.date_range('2023-01-01', periods=120)
+    promo = (rng.random(len(ds)) < 0.2).astype(float)
+    weekly = 3 * np.sin(2 * np.pi * ds.dayofweek / 7)
+    y = 20 + 0.05 * np.arange(len(ds)) + weekly + 8 * promo + rng.normal(0, 1, len(ds))
+    model = Prophet(daily_seasonality=False)
+    model.add_regressor('promo')
+    return model.fit(pd.DataFrame({'ds': ds, 'y': y, 'promo': promo}))
+
+
+def prophet_forecast(model, promo):
+    future = model.make_future_dataframe(periods=PERIODS, include_history=False)
+    future['promo'] = promo
+    return model.predict(future)
+
+
+def test_baseline_matches_prophet_predict(model):
+    ds, yhat, _, _ = simulate_model(model, [Scenario('baseline')], PERIODS)
+
+    expected = prophet_forecast(model, model.history['promo'].iloc[-1])
+    np.testing.assert_array_equal(ds, expected['ds'])
+    np.testing.assert_allclose(yhat[0], expected['yhat'], rtol=1e-9, atol=1e-9)
+
+
+def test_regressor_override_matches_prophet_predict(model):
+    promo = np.tile([1.0, 0.0], PERIODS // 2)
+    _, yhat, _, _ = simulate_model(model, [Scenario('promo', regressors={'promo': promo})], PERIODS)
+
+    np.testing.assert_allclose(yhat[0], prophet_forecast(model, promo)['yhat'], rtol=1e-9, atol=1e-9)
+
+
+def test_multiplier_and_trend_change_apply_inside_the_window(model):
+    ds, base, _, _ = simulate_model(model, [Scenario('baseline')], PERIODS)
+    start = ds[7]
+    scenarios = [Scenario('lift', multiplier=1.5, start=start), Scenario('ramp', trend_change=2.0, start=start)]
+
+    _, yhat, _, _ = simulate_model(model, scenarios, PERIODS)
+
+    np.testing.assert_allclose(yhat[0, :7], base[0, :7])
+    np.testing.assert_allclose(yhat[0, 7:], 1.5 * base[0, 7:])
+    np.testing.assert_allclose(yhat[1] - base[0], np.r_[np.zeros(7), 2.0 * np.arange(1, 8)])
+
+
+def test_shared_samples_give_intervals_around_yhat(model):
+    scenarios = [Scenario('baseline'), Scenario('lift', multiplier=1.2)]
+
+    _, yhat, lower, upper = simulate_model(model, scenarios, PERIODS, uncertainty_samples=200)
+
+    assert (lower < yhat).all() and (yhat < upper).all()
+    # The same draws serve every scenario, so a pure multiplier scales the bounds exactly.
+    np.testing.assert_allclose(lower[1], 1.2 * lower[0])
+
+
+def test_simulate_scenarios_returns_a_tidy_frame(model):
+    results, errors = simulate_scenarios({'A': model, 'B': model}, [Scenario('x'), Scenario('y', multiplier=2)],
+                                         periods=PERIODS)
+
+    assert errors == {}
+    assert len(results) == 2 * 2 * PERIODS
+    assert results[['scenario', 'sku']].drop_duplicates().values.tolist() == [
+        ['x', 'A'], ['x', 'B'], ['y', 'A'], ['y', 'B']]
@@ -0,0 +1,91 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from demand import SparseDemand
+from stat_engines import (ENGINES, croston, demand_array, forecast_frames, holt_winters, route_engines,
+                          seasonal_naive, simple_exponential_smoothing)
+
+
+@pytest.fixture
+def demand():
+    rng = np.random.default_rng(0)
+    days = np.arange(84)
+    weekly = 10 + 5 * np.sin(2 * np.pi * days / 7)
+    return np.vstack([
+        np.tile(weekly, (3, 1)),  # exact weekly pattern
+        rng.poisson(20, (3, 84)),  # stationary noise
+        np.where(rng.random((3, 84)) < 0.1, rng.integers(1, 6, (3, 84)), 0),  # intermittent
+    ]).astype(float)
+
+
+@pytest.mark.parametrize("name", list(ENGINES))
+def test_engines_return_ordered_non_negative_bands(demand, name):
+    yhat, lower, upper = ENGINES[name](demand, 14)
+
+    assert yhat.shape == lower.shape == upper.shape == (len(demand), 14)
+    assert (lower >= 0).all() and (yhat >= 0).all()
+    assert (lower <= yhat + 1e-9).all() and (yhat <= upper + 1e-9).all()
+
+
+def test_seasonal_naive_repeats_the_last_week(demand):
+    yhat, _, _ = seasonal_naive(demand, 10)
+
+    np.testing.assert_allclose(yhat, demand[:, [77, 78, 79, 80, 81, 82, 83, 77, 78, 79]])
+
+
+def test_vectorized_engines_match_single_sku_runs(demand):
+    for engine in (simple_exponential_smoothing, croston, holt_winters):
+        batch = engine(demand, 7)
+        for i in range(len(demand)):
+            single = engine(demand[i:i + 1], 7)
+            for together, alone in zip(batch, single):
+                np.testing.assert_allclose(together[i], alone[0])
+
+
+def test_ses_of_a_constant_series_is_that_constant():
+    yhat, lower, upper = simple_exponential_smoothing(np.full((2, 30), 4.0), 5)
+
+    np.testing.assert_allclose(yhat, 4.0)
+    np.testing.assert_allclose(upper - lower, 0.0)
+
+
+def test_routing_prefers_the_cheapest_engine_within_tolerance(demand):
+    choice, errors = route_engines(demand, 14)
+
+    assert errors.shape == (len(ENGINES), len(demand))
+    assert list(choice[:3]) == ['seasonal_naive'] * 3
+    best = errors.min(axis=0)
+    for i, name in enumerate(choice):
+        assert errors[list(ENGINES).index(name), i] <= best[i] * 1.1 + 1e-12
+
+
+def test_routing_falls_back_above_max_error(demand):
+    choice, _ = route_engines(demand, 14, max_error=1e-6)
+
+    assert list(choice[:3]) == ['seasonal_naive'] * 3
+    assert set(choice[3:]) == {'prophet'}
+
+
+def test_routing_needs_more_history_than_the_horizon(demand):
+    with pytest.raises(ValueError):
+        route_engines(demand[:, :14], 14)
+
+
+def test_demand_array_reads_dense_and_sparse_alike(demand):
+    frame = pd.DataFrame(demand.T, index=pd.date_range('2023-01-01', periods=84), columns=list('abcdefghi'))
+    frame.iloc[0, 0] = np.nan
+    skus = ['c', 'a', 'h']
+
+    dense = demand_array(frame, skus)
+    sparse = demand_array(SparseDemand.from_frame(frame.round()), skus)
+
+    assert dense.shape == (3, 84) and dense[1, 0] == 0
+    np.testing.assert_allclose(sparse, frame[skus].fillna(0).round().to_numpy().T)
+
+
+def test_forecast_frames_start_after_the_last_day():
+    frames = forecast_frames(['a'], '2023-03-31', np.ones((1, 3)), np.zeros((1, 3)), np.full((1, 3), 2.0))
+
+    assert frames['a']['ds'].tolist() == list(pd.date_range('2023-04-01', periods=3))
+    assert frames['a'].columns.tolist() == ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import forecaster
+from forecaster import SKUForecaster, _fit_prophet, warm_start_params
+from registry import RefitPolicy, RegistryEntry
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    index = pd.date_range("2024-01-01", periods=70, freq="D", name="createDate")
+    return pd.DataFrame({"A": rng.poisson(5 + 2 * np.sin(np.arange(70) / 7 * 2 * np.pi))},
+                        index=index).astype(float)
+
+
+@pytest.fixture(scope="module")
+def previous(data):
+    history = data.iloc[:63]
+    model = _fit_prophet(history.reset_index().set_axis(["ds", "y"], axis=1))
+    metadata = {"full_fit_at": datetime.now().isoformat(), "updates": 0,
+                "data_end": f"{history.index[-1]:%Y-%m-%d}"}
+    return RegistryEntry(model, metadata)
+
+
+@pytest.fixture
+def fits(monkeypatch):
+    """Record the init of every Prophet.fit call made by the forecaster."""
+    fits = []
+
+    class RecordingProphet(forecaster.Prophet):
+        def fit(self, df, **kwargs):
+            fits.append(kwargs.get("init"))
+            return super().fit(df, **kwargs)
+
+    monkeypatch.setattr(forecaster, "Prophet", RecordingProphet)
+    return fits
+
+
+def test_update_passes_the_previous_params_as_init(data, previous, fits):
+    model = SKUForecaster(data)
+    model.train_models(previous={"A": previous}, policy=RefitPolicy())
+
+    assert model.fit_modes == {"A": "update"}
+    [init] = fits
+    expected = warm_start_params(previous.model)
+    assert init.keys() == expected.keys()
+    for name, value in expected.items():
+        np.testing.assert_array_equal(init[name], value)
+    assert model.models["A"].history["ds"].max() == data.index[-1]
+
+
+def test_policy_refit_fits_cold(data, previous, fits):
+    stale = RegistryEntry(previous.model, dict(previous.metadata, updates=RefitPolicy().max_updates))
+    model = SKUForecaster(data)
+    model.train_models(previous={"A": stale}, policy=RefitPolicy())
+
+    assert model.fit_modes == {"A": "refit"}
+    assert fits == [None]
+
+
+def test_unusable_init_falls_back_to_a_cold_fit(data, previous, fits, caplog):
+    init = dict(warm_start_params(previous.model))
+    init["beta"] = init["beta"].tolist()
+    df = data.reset_index().set_axis(["ds", "y"], axis=1)
+
+    model = _fit_prophet(df, init)
+
+    assert fits == [init, None]
+    assert "fitting from scratch" in caplog.text
+    assert model.history["ds"].max() == data.index[-1]